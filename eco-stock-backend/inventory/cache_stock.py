@@ -0,0 +1,190 @@
+"""Caché de lectura del stock por producto (stock_actual / por_producto)
+
+Cada producto tiene en la caché un contador de versión y una entrada
+(version, datos), donde datos es el inventario serializado o None si el
+producto no tiene inventario. Una entrada solo es válida si su versión es la
+versión actual del producto.
+
+- Lectura: se lee la versión, y si la entrada no coincide se consulta la base
+  de datos y se guarda la entrada con la versión leída *antes* de la consulta.
+- Escritura: al confirmar la transacción se incrementa la versión y se vuelve
+  a leer el inventario (write-through). Toda entrada válida fue leída después
+  del último incremento, así que nunca refleja un estado anterior a una
+  escritura ya confirmada y publicada.
+
+El backend es cualquier caché de Django (alias STOCK_CACHE_ALIAS) compartida
+por todos los procesos. LocMemCache es por proceso: el write-through solo
+refresca la caché del proceso que escribió y los demás servirían stock viejo
+hasta STOCK_CACHE_TIMEOUT, así que con LocMem la caché queda desactivada
+(lecturas directas a la base de datos) salvo con DEBUG o con
+STOCK_CACHE_POR_PROCESO = True para un despliegue de un solo proceso.
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.core import checks
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+
+PREFIJO = 'stock'
+
+
+def cache():
+    return caches[getattr(settings, 'STOCK_CACHE_ALIAS', 'default')]
+
+
+def timeout():
+    return getattr(settings, 'STOCK_CACHE_TIMEOUT', 300)
+
+
+def activa():
+    """La caché solo se usa si la comparten todos los procesos (o se permite explícitamente)"""
+    if not isinstance(cache(), LocMemCache):
+        return True
+    return settings.DEBUG or getattr(settings, 'STOCK_CACHE_POR_PROCESO', False)
+
+
+@checks.register(checks.Tags.caches)
+def revisar_cache(app_configs, **kwargs):
+    if activa() or not isinstance(cache(), LocMemCache):
+        return []
+    return [checks.Warning(
+        'La caché de stock usa LocMemCache (por proceso) y queda desactivada: stock_actual y '
+        'por_producto leen siempre de la base de datos.',
+        hint='Configure un backend compartido (Redis, Memcached) en CACHES[STOCK_CACHE_ALIAS] o, '
+             'con un solo proceso, STOCK_CACHE_POR_PROCESO = True.',
+        id='inventory.W001',
+    )]
+
+
+def clave_version(producto_id):
+    return f'{PREFIJO}:version:{producto_id}'
+
+
+def clave_datos(producto_id):
+    return f'{PREFIJO}:datos:{producto_id}'
+
+
+class MetricasCache:
+    """Aciertos, fallos y escrituras de la caché en este proceso"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reiniciar()
+
+    def reiniciar(self):
+        with self.lock:
+            self.inicio = time.monotonic()
+            self.aciertos = 0
+            self.fallos = 0
+            self.escrituras = 0
+
+    def registrar(self, acierto):
+        with self.lock:
+            if acierto:
+                self.aciertos += 1
+            else:
+                self.fallos += 1
+
+    def registrar_escrituras(self, cantidad):
+        with self.lock:
+            self.escrituras += cantidad
+
+    def resumen(self):
+        with self.lock:
+            lecturas = self.aciertos + self.fallos
+            return {
+                'backend': cache().__class__.__name__,
+                'aciertos': self.aciertos,
+                'fallos': self.fallos,
+                'tasa_aciertos': round(self.aciertos / lecturas, 4) if lecturas else 0,
+                'escrituras': self.escrituras,
+                'segundos_medidos': round(time.monotonic() - self.inicio, 3)
+            }
+
+
+metricas = MetricasCache()
+
+
+def _version_inicial():
+    # Un valor inicial único evita que una versión reiniciada (desalojo de la
+    # clave) vuelva a validar una entrada antigua
+    return time.time_ns()
+
+
+def version(producto_id):
+    clave = clave_version(producto_id)
+    actual = cache().get(clave)
+    if actual is None:
+        cache().add(clave, _version_inicial(), timeout=None)
+        actual = cache().get(clave)
+    return actual
+
+
+def incrementar(producto_id):
+    clave = clave_version(producto_id)
+    try:
+        return cache().incr(clave)
+    except ValueError:
+        # La clave no existía (o fue desalojada)
+        cache().add(clave, _version_inicial(), timeout=None)
+        return cache().incr(clave)
+
+
+def cargar(producto_ids):
+    """Inventarios serializados por producto leídos de la base de datos; None si no hay inventario"""
+    from .models import Inventario
+    from .serializers import InventarioSerializer
+
+    datos = dict.fromkeys(producto_ids)
+    for inventario in Inventario.objects.select_related('producto').filter(producto_id__in=producto_ids):
+        datos[inventario.producto_id] = InventarioSerializer(inventario).data
+    return datos
+
+
+def obtener(producto_id):
+    """Inventario serializado del producto (None si no tiene), leyendo a través de la caché"""
+    producto_id = int(producto_id)
+    if not activa():
+        return cargar([producto_id])[producto_id]
+    valores = cache().get_many([clave_version(producto_id), clave_datos(producto_id)])
+    version_actual = valores.get(clave_version(producto_id))
+    entrada = valores.get(clave_datos(producto_id))
+    if version_actual is not None and entrada is not None and entrada[0] == version_actual:
+        metricas.registrar(acierto=True)
+        return entrada[1]
+
+    metricas.registrar(acierto=False)
+    if version_actual is None:
+        version_actual = version(producto_id)
+    datos = cargar([producto_id])[producto_id]
+    cache().set(clave_datos(producto_id), (version_actual, datos), timeout())
+    return datos
+
+
+def refrescar(producto_ids):
+    """Invalidar y volver a cargar los productos indicados (después del commit)"""
+    producto_ids = sorted({int(producto_id) for producto_id in producto_ids})
+    if not producto_ids:
+        return
+    versiones = {producto_id: incrementar(producto_id) for producto_id in producto_ids}
+    datos = cargar(producto_ids)
+    cache().set_many(
+        {clave_datos(producto_id): (versiones[producto_id], datos[producto_id]) for producto_id in producto_ids},
+        timeout()
+    )
+    metricas.registrar_escrituras(len(producto_ids))
+
+
+def al_confirmar(producto_ids):
+    """Programar el write-through para cuando se confirme la transacción en curso
+
+    robust=True: un error al refrescar (caché o base de datos caídas) se
+    registra en el log en lugar de propagarse; la escritura ya está confirmada
+    y no debe responderse como fallida ni reintentarse.
+    """
+    producto_ids = list(producto_ids)
+    if activa():
+        transaction.on_commit(lambda: refrescar(producto_ids), robust=True)
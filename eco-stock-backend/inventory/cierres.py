@@ -0,0 +1,204 @@
+"""Cierres periódicos de stock y stock a una fecha
+
+Los movimientos solo tienen fecha (sin hora), así que el stock de un día es
+el stock al terminar ese día. Un cierre guarda ese valor por producto
+(CierreStock) y se calcula hacia atrás desde el stock actual:
+
+    cierre(S) = Inventario.cantidad - neto de los movimientos con fecha > S
+
+Así cuadra con el stock actual aunque haya stock inicial sin movimientos.
+El stock a una fecha D parte de la base más cercana (el cierre anterior, el
+siguiente o el stock actual) y solo recorre los movimientos entre la base y
+D, con una sola consulta para todos los productos. Los netos se leen de
+movimiento_inventario, que ya tiene la cantidad y el producto copiados.
+
+Los servicios de stock cambian el stock actual y registran el movimiento con
+fecha de hoy, así que los cierres (días ya terminados) no cambian. Un
+movimiento agregado, editado o eliminado desde el CRUD (por ejemplo, con una
+fecha pasada) cambia el neto posterior a los cierres anteriores a su fecha
+sin tocar el stock actual: las señales los corrigen en el lugar con
+mover_movimiento(), para que las tres bases sigan dando el mismo stock.
+Un cambio de stock sin movimiento (el CRUD de inventario o un ajuste sin
+usuario) se trata como un movimiento de hoy que no queda en el historial:
+los cierres cambian igual que el stock actual. Las cargas masivas que no
+pasan por save() (bulk_create, update) requieren volver a construirlos.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Max, Min, Sum, When
+from django.utils import timezone
+
+from .models import CierreStock, Inventario, MovimientoInventario
+
+DIARIO = 'diario'
+MENSUAL = 'mensual'
+
+
+def periodo():
+    return getattr(settings, 'CIERRES_PERIODO', MENSUAL)
+
+
+def fin_de_periodo(fecha, periodo_=None):
+    """Último día del período que contiene la fecha"""
+    if (periodo_ or periodo()) == DIARIO:
+        return fecha
+    siguiente = (fecha.replace(day=1) + timedelta(days=32)).replace(day=1)
+    return siguiente - timedelta(days=1)
+
+
+def ultimo_cierre(hoy=None, periodo_=None):
+    """Fin del último período ya terminado"""
+    hoy = hoy or timezone.localdate()
+    if (periodo_ or periodo()) == DIARIO:
+        return hoy - timedelta(days=1)
+    return hoy.replace(day=1) - timedelta(days=1)
+
+
+def fechas_de_cierre(desde, hasta, periodo_=None):
+    """Fines de período entre desde y hasta, en orden"""
+    fechas = []
+    fecha = fin_de_periodo(desde, periodo_)
+    while fecha <= hasta:
+        fechas.append(fecha)
+        fecha = fin_de_periodo(fecha + timedelta(days=1), periodo_)
+    return fechas
+
+
+def neto(signo=1):
+    """Entradas menos salidas (o al revés con signo=-1) de los movimientos"""
+    return Sum(Case(
+        When(tipo_movimiento='SALIDA', then=F('cantidad') * -signo),
+        default=F('cantidad') * signo,
+        output_field=IntegerField()
+    ))
+
+
+def movimientos(desde=None, hasta=None, producto_ids=None):
+    """Movimientos con desde < fecha <= hasta (None = sin límite)"""
+    consulta = MovimientoInventario.objects.all()
+    if desde is not None:
+        consulta = consulta.filter(fecha__gt=desde)
+    if hasta is not None:
+        consulta = consulta.filter(fecha__lte=hasta)
+    if producto_ids is not None:
+        consulta = consulta.filter(producto_id__in=producto_ids)
+    return consulta
+
+
+def neto_por_producto(consulta, signo=1):
+    return consulta.values_list('producto_id').annotate(
+        valor=neto(signo)
+    ).order_by()
+
+
+def construir(fechas):
+    """Calcular y guardar los cierres de esas fechas; devuelve {fecha: productos guardados}
+
+    Se recorre de la fecha más reciente a la más antigua restando el neto de
+    cada intervalo, así que cada movimiento se lee una sola vez. Todo ocurre
+    en una transacción: en MySQL (REPEATABLE READ) el stock actual y los
+    movimientos se leen de la misma instantánea.
+    """
+    guardados = {}
+    with transaction.atomic():
+        stock = dict(Inventario.objects.values_list('producto_id', 'cantidad'))
+        posterior = None
+        for fecha in sorted(set(fechas), reverse=True):
+            for producto_id, valor in neto_por_producto(movimientos(desde=fecha, hasta=posterior)):
+                stock[producto_id] = stock.get(producto_id, 0) - (valor or 0)
+            posterior = fecha
+
+            CierreStock.objects.filter(fecha=fecha).delete()
+            CierreStock.objects.bulk_create([
+                CierreStock(fecha=fecha, producto_id=producto_id, cantidad=cantidad)
+                for producto_id, cantidad in sorted(stock.items()) if cantidad
+            ], batch_size=1000)
+            guardados[fecha] = sum(1 for cantidad in stock.values() if cantidad)
+    return guardados
+
+
+def base_para(fecha):
+    """(tipo, fecha_base) de la base más cercana: 'anterior', 'siguiente' o 'actual'"""
+    hoy = timezone.localdate()
+    if fecha >= hoy:
+        return 'actual', hoy
+    anterior = CierreStock.objects.filter(fecha__lte=fecha).aggregate(f=Max('fecha'))['f']
+    siguiente = CierreStock.objects.filter(fecha__gt=fecha).aggregate(f=Min('fecha'))['f'] or hoy
+    if anterior is not None and (fecha - anterior) <= (siguiente - fecha):
+        return 'anterior', anterior
+    if siguiente == hoy:
+        return 'actual', hoy
+    return 'siguiente', siguiente
+
+
+def stock_en_fecha(fecha, producto_ids=None):
+    """({producto_id: stock al final del día}, base) para todos o algunos productos"""
+    tipo, base = base_para(fecha)
+    if tipo == 'actual':
+        inicial = Inventario.objects.values_list('producto_id', 'cantidad')
+        if producto_ids is not None:
+            inicial = inicial.filter(producto_id__in=producto_ids)
+        # Deshacer lo posterior a la fecha
+        deltas = neto_por_producto(movimientos(desde=fecha, producto_ids=producto_ids), signo=-1)
+    else:
+        inicial = CierreStock.objects.filter(fecha=base).values_list('producto_id', 'cantidad')
+        if producto_ids is not None:
+            inicial = inicial.filter(producto_id__in=producto_ids)
+        if tipo == 'anterior':
+            deltas = neto_por_producto(movimientos(desde=base, hasta=fecha, producto_ids=producto_ids))
+        else:
+            deltas = neto_por_producto(movimientos(desde=fecha, hasta=base, producto_ids=producto_ids), signo=-1)
+
+    stock = {}
+    # Base y movimientos en una sola consulta (UNION ALL)
+    for producto_id, valor in inicial.order_by().union(deltas, all=True):
+        stock[producto_id] = stock.get(producto_id, 0) + (valor or 0)
+    return stock, {'tipo': tipo, 'fecha': base}
+
+
+def ajustar(producto_id, fecha, delta):
+    """El neto del producto en fecha cambió en delta sin cambiar su stock actual
+
+    Los cierres anteriores a la fecha bajan en delta. Un cierre sin fila para
+    el producto tenía stock 0 y recibe la suya; las filas que quedan en 0 se
+    eliminan, como en construir().
+    """
+    if not delta or producto_id is None:
+        return
+    anteriores = CierreStock.objects.filter(fecha__lt=fecha)
+    del_producto = anteriores.filter(producto_id=producto_id)
+    with transaction.atomic():
+        sin_fila = list(anteriores.exclude(
+            fecha__in=del_producto.values('fecha')
+        ).values_list('fecha', flat=True).order_by().distinct())
+        del_producto.update(cantidad=F('cantidad') - delta)
+        del_producto.filter(cantidad=0).delete()
+        CierreStock.objects.bulk_create([
+            CierreStock(fecha=dia, producto_id=producto_id, cantidad=-delta) for dia in sin_fila
+        ], batch_size=1000)
+
+
+def mover_movimiento(anterior, nuevo):
+    """Corregir los cierres por un movimiento escrito fuera de los servicios de stock
+
+    anterior y nuevo son MovimientoInventario.neto() antes y después del
+    cambio; None si el movimiento no existía o ya no existe.
+    """
+    if anterior == nuevo:
+        return
+    if anterior is not None:
+        ajustar(anterior[0], anterior[1], -anterior[2])
+    if nuevo is not None:
+        ajustar(nuevo[0], nuevo[1], nuevo[2])
+
+
+def netos(movimiento_ids):
+    """{movimiento_id: neto()} de los movimientos que existen"""
+    return {
+        movimiento.pk: movimiento.neto()
+        for movimiento in MovimientoInventario.objects.filter(pk__in=movimiento_ids).only(
+            'fecha', 'tipo_movimiento', 'cantidad', 'producto'
+        )
+    }
@@ -0,0 +1,33 @@
+"""Consultas independientes en paralelo desde las vistas asíncronas
+
+Cada función corre en un hilo del pool de asgiref (sync_to_async con
+thread_sensitive=False), con su propia conexión a la base de datos, así que
+la latencia del conjunto es la de la consulta más lenta y no la suma. Al
+terminar se cierra la conexión del hilo si ya caducó, igual que al final de
+una petición: con CONN_MAX_AGE = 0 cada función abre su propia conexión, con
+CONN_MAX_AGE > 0 los hilos del pool la reutilizan.
+"""
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections
+
+
+def _con_conexion(funcion):
+    def ejecutar():
+        close_old_connections()
+        try:
+            return funcion()
+        finally:
+            close_old_connections()
+    return ejecutar
+
+
+async def en_hilo(funcion):
+    """Ejecutar una función síncrona (ORM) sin bloquear el bucle de eventos"""
+    return await sync_to_async(_con_conexion(funcion), thread_sensitive=False)()
+
+
+async def en_paralelo(*funciones):
+    """Ejecutar funciones síncronas independientes a la vez; resultados en el mismo orden"""
+    return await asyncio.gather(*(en_hilo(funcion) for funcion in funciones))
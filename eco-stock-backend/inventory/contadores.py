@@ -0,0 +1,188 @@
+"""Contadores del dashboard mantenidos de forma incremental
+
+Los caminos de escritura (servicios de stock, señales de Inventario, Producto y
+ProductosVencimiento) suman deltas a ContadorDashboard dentro de su propia
+transacción, así que el dashboard se lee con una sola consulta en lugar de
+recorrer el inventario. Las cargas que no pasan por el ORM (seed_ecostock,
+importaciones) o cambios de configuración se corrigen con reconciliar().
+"""
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import Mod
+from django.utils import timezone
+
+TOTAL_PRODUCTOS = 'total_productos'
+VALOR_INVENTARIO = 'valor_inventario'
+PRODUCTOS_CRITICOS = 'productos_criticos'
+PREFIJO_VENCE = 'vence:'
+
+
+def ranuras():
+    return getattr(settings, 'DASHBOARD_RANURAS', 16)
+
+
+def umbral_critico():
+    return getattr(settings, 'DASHBOARD_UMBRAL_CRITICO', 10)
+
+
+def dias_vencimiento():
+    return getattr(settings, 'DASHBOARD_DIAS_VENCIMIENTO', 30)
+
+
+def ranura(producto_id):
+    return int(producto_id) % ranuras()
+
+
+def nombre_vence(fecha):
+    return f'{PREFIJO_VENCE}{fecha.isoformat()}'
+
+
+def critico(cantidad):
+    return int(cantidad is not None and cantidad <= umbral_critico())
+
+
+def sumar(nombre, ranura_, delta):
+    """Sumar delta a un contador, creando la fila si no existe"""
+    from .models import ContadorDashboard
+
+    if not delta:
+        return
+    contador = ContadorDashboard.objects.filter(nombre=nombre, ranura=ranura_)
+    if contador.update(valor=F('valor') + delta):
+        return
+    try:
+        with transaction.atomic():
+            ContadorDashboard.objects.create(nombre=nombre, ranura=ranura_, valor=delta)
+        return
+    except IntegrityError:
+        # Otra transacción creó la fila entre el UPDATE y el INSERT
+        pass
+    contador.update(valor=F('valor') + delta)
+
+
+def aplicar(deltas):
+    """Aplicar {(nombre, ranura): delta} siempre en el mismo orden, para no provocar interbloqueos"""
+    for (nombre, ranura_), delta in sorted(deltas.items()):
+        sumar(nombre, ranura_, delta)
+
+
+def ajustar_stock(cambios):
+    """cambios: (producto_id, cantidad_anterior, cantidad_nueva); None = sin fila de inventario"""
+    deltas = defaultdict(int)
+    for producto_id, anterior, nueva in cambios:
+        r = ranura(producto_id)
+        deltas[(VALOR_INVENTARIO, r)] += (nueva or 0) - (anterior or 0)
+        deltas[(PRODUCTOS_CRITICOS, r)] += critico(nueva) - critico(anterior)
+    aplicar(deltas)
+
+
+def ajustar_productos(producto_id, delta):
+    sumar(TOTAL_PRODUCTOS, ranura(producto_id), delta)
+
+
+def ajustar_vencimiento(anterior, nueva):
+    """Mover un vencimiento de fecha; None = la fila no existía o se eliminó"""
+    if anterior == nueva:
+        return
+    deltas = defaultdict(int)
+    if anterior is not None:
+        deltas[(nombre_vence(anterior), 0)] -= 1
+    if nueva is not None:
+        deltas[(nombre_vence(nueva), 0)] += 1
+    aplicar(deltas)
+
+
+def leer():
+    """Valores del dashboard con una sola consulta"""
+    from .models import ContadorDashboard
+
+    hoy = timezone.localdate()
+    dias = [nombre_vence(hoy + timedelta(days=i)) for i in range(dias_vencimiento() + 1)]
+    totales = dict(ContadorDashboard.objects.filter(
+        nombre__in=[TOTAL_PRODUCTOS, VALOR_INVENTARIO, PRODUCTOS_CRITICOS] + dias
+    ).values_list('nombre').annotate(total=Sum('valor')).order_by())
+    return {
+        'total_productos': totales.get(TOTAL_PRODUCTOS, 0),
+        'valor_inventario_total': totales.get(VALOR_INVENTARIO, 0),
+        'productos_criticos': totales.get(PRODUCTOS_CRITICOS, 0),
+        'productos_por_vencer': sum(totales.get(dia, 0) for dia in dias),
+    }
+
+
+def valores_reales():
+    """{(nombre, ranura): valor} calculado desde las tablas de origen"""
+    from productos.models import Producto
+
+    from .models import Inventario, ProductosVencimiento
+
+    n = ranuras()
+
+    reales = {}
+    for r in range(n):
+        for nombre in (TOTAL_PRODUCTOS, VALOR_INVENTARIO, PRODUCTOS_CRITICOS):
+            reales[(nombre, r)] = 0
+    for r, total in Producto.objects.values_list(Mod('idproducto', n)).annotate(total=Count('pk')).order_by():
+        reales[(TOTAL_PRODUCTOS, int(r))] = total
+    for r, valor, criticos in Inventario.objects.values_list(Mod('producto_id', n)).annotate(
+        valor=Sum('cantidad'),
+        criticos=Count('pk', filter=Q(cantidad__lte=umbral_critico()))
+    ).order_by():
+        reales[(VALOR_INVENTARIO, int(r))] = valor or 0
+        reales[(PRODUCTOS_CRITICOS, int(r))] = criticos
+    for fecha, total in ProductosVencimiento.objects.values_list('fecha_vencimiento').annotate(
+        total=Count('pk')
+    ).order_by():
+        reales[(nombre_vence(fecha), 0)] = total
+    return reales
+
+
+def reconciliar(reconstruir=False):
+    """Corregir la deriva de los contadores; devuelve {(nombre, ranura): (guardado, real)} de los corregidos
+
+    Se bloquean primero todas las filas de contadores y después se calculan los
+    valores reales: las escrituras que ya actualizaron un contador esperan al
+    bloqueo o ya están confirmadas, y las que aún no lo hicieron sumarán su
+    delta sobre el valor corregido. En MySQL (REPEATABLE READ) la instantánea
+    de lectura se toma en la primera lectura no bloqueante, es decir, después
+    de obtener los bloqueos.
+    """
+    from .models import ContadorDashboard
+
+    with transaction.atomic():
+        guardados = {
+            (contador.nombre, contador.ranura): contador
+            for contador in ContadorDashboard.objects.select_for_update().order_by('nombre', 'ranura')
+        }
+        reales = valores_reales()
+
+        if reconstruir:
+            ContadorDashboard.objects.all().delete()
+            ContadorDashboard.objects.bulk_create([
+                ContadorDashboard(nombre=nombre, ranura=r, valor=valor)
+                for (nombre, r), valor in sorted(reales.items()) if valor or not nombre.startswith(PREFIJO_VENCE)
+            ], batch_size=1000)
+            return {
+                clave: (guardados[clave].valor if clave in guardados else None, reales.get(clave, 0))
+                for clave in set(guardados) | set(reales)
+                if (guardados[clave].valor if clave in guardados else 0) != reales.get(clave, 0)
+            }
+
+        derivas = {}
+        nuevos = []
+        for clave in sorted(set(guardados) | set(reales)):
+            real = reales.get(clave, 0)
+            contador = guardados.get(clave)
+            if contador is None:
+                if real or not clave[0].startswith(PREFIJO_VENCE):
+                    nuevos.append(ContadorDashboard(nombre=clave[0], ranura=clave[1], valor=real))
+                    if real:
+                        derivas[clave] = (None, real)
+            elif contador.valor != real:
+                derivas[clave] = (contador.valor, real)
+                ContadorDashboard.objects.filter(pk=contador.pk).update(valor=real)
+        ContadorDashboard.objects.bulk_create(nuevos, batch_size=1000)
+    return derivas
@@ -0,0 +1,175 @@
+import asyncio
+import io
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.asgi import get_asgi_application
+from django.core.management.base import BaseCommand, CommandError
+from django.core.wsgi import get_wsgi_application
+from django.db import connection
+from django.db.backends.signals import connection_created
+
+from inventory.management.commands.benchmark_endpoints import parametros_de_prueba
+
+# Vista síncrona (WSGI) -> equivalente asíncrona (ASGI)
+PARES = {
+    'dashboard': ('/inventory/dashboard/', '/inventory/async/dashboard/'),
+    'reportes.stock_actual': ('/inventory/reportes/stock-actual/', '/inventory/async/reportes/stock-actual/'),
+    'reportes.movimientos_periodo': (
+        '/inventory/reportes/movimientos-periodo/?{rango}', '/inventory/async/reportes/movimientos-periodo/?{rango}'
+    ),
+}
+
+
+def get_wsgi(aplicacion, url):
+    """GET directo al WSGIHandler, como lo llamaría gunicorn; devuelve el estado"""
+    ruta, _, consulta = url.partition('?')
+    environ = {
+        'REQUEST_METHOD': 'GET', 'PATH_INFO': ruta, 'QUERY_STRING': consulta, 'SCRIPT_NAME': '',
+        'SERVER_NAME': 'localhost', 'SERVER_PORT': '80', 'SERVER_PROTOCOL': 'HTTP/1.1',
+        'HTTP_HOST': 'localhost', 'REMOTE_ADDR': '127.0.0.1',
+        'wsgi.version': (1, 0), 'wsgi.url_scheme': 'http', 'wsgi.input': io.BytesIO(), 'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True, 'wsgi.multiprocess': False, 'wsgi.run_once': False,
+    }
+    estado = []
+    respuesta = aplicacion(environ, lambda status, headers, exc_info=None: estado.append(status))
+    try:
+        for _ in respuesta:
+            pass
+    finally:
+        respuesta.close()
+    return int(estado[0].split()[0])
+
+
+async def get_asgi(aplicacion, url):
+    """GET directo al ASGIHandler, como lo llamaría uvicorn; devuelve el estado"""
+    ruta, _, consulta = url.partition('?')
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET', 'scheme': 'http',
+        'path': ruta, 'raw_path': ruta.encode(), 'query_string': consulta.encode(), 'root_path': '',
+        'headers': [(b'host', b'localhost')], 'server': ('localhost', 80), 'client': ('127.0.0.1', 0),
+    }
+    leido = False
+    estado = []
+
+    async def receive():
+        nonlocal leido
+        if not leido:
+            leido = True
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+        # Sin desconexión: Django cancela esta espera al terminar la respuesta
+        await asyncio.Future()
+
+    async def send(mensaje):
+        if mensaje['type'] == 'http.response.start':
+            estado.append(mensaje['status'])
+
+    await aplicacion(scope, receive, send)
+    return estado[0]
+
+
+def percentil(valores, p):
+    valores = sorted(valores)
+    return valores[min(len(valores) - 1, int(len(valores) * p / 100))]
+
+
+class Command(BaseCommand):
+    help = (
+        'Compara las vistas síncronas servidas por WSGI con sus versiones asíncronas servidas '
+        'por ASGI: latencia p50/p95 y peticiones por segundo con N peticiones simultáneas. '
+        '--latencia-ms simula el viaje de red hasta la base de datos en cada consulta'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeticiones', type=int, default=50, help='Peticiones por vista')
+        parser.add_argument('--concurrencia', type=int, default=1, help='Peticiones simultáneas')
+        parser.add_argument('--latencia-ms', type=float, default=0.0, help='Retardo añadido a cada consulta SQL')
+        parser.add_argument('--filtro', default='', help='Medir solo las vistas cuyo nombre contenga este texto')
+
+    def handle(self, *args, **opciones):
+        p = parametros_de_prueba()
+        rango = f"fecha_inicio={p['desde']}&fecha_fin={p['hasta']}"
+        pares = {
+            nombre: (sincrona.format(rango=rango), asincrona.format(rango=rango))
+            for nombre, (sincrona, asincrona) in PARES.items() if opciones['filtro'] in nombre
+        }
+        if not pares:
+            raise CommandError('Ninguna vista coincide con el filtro')
+
+        retardo = opciones['latencia_ms'] / 1000
+
+        def simular_red(execute, sql, params, many, context):
+            time.sleep(retardo)
+            return execute(sql, params, many, context)
+
+        def instalar(sender, connection, **kwargs):
+            # La señal se repite en cada reconexión del mismo objeto de conexión
+            if simular_red not in connection.execute_wrappers:
+                connection.execute_wrappers.append(simular_red)
+
+        if retardo:
+            # Las conexiones de los hilos del pool se crean después: instalar al conectar
+            connection_created.connect(instalar)
+            instalar(None, connection)
+        try:
+            for nombre, (sincrona, asincrona) in pares.items():
+                wsgi = self.medir_wsgi(sincrona, opciones['repeticiones'], opciones['concurrencia'])
+                asgi = asyncio.run(self.medir_asgi(asincrona, opciones['repeticiones'], opciones['concurrencia']))
+                for servidor, r in (('WSGI', wsgi), ('ASGI', asgi)):
+                    self.stdout.write(
+                        f"{nombre:32} {servidor} p50 {r['p50']:>9.2f} ms  p95 {r['p95']:>9.2f} ms  "
+                        f"{r['por_segundo']:>8.1f} pet/s"
+                    )
+                self.stdout.write(self.style.SUCCESS(
+                    f"{nombre:32} ASGI/WSGI p50: {asgi['p50'] / wsgi['p50']:.2f}x"
+                ))
+        finally:
+            if retardo:
+                connection_created.disconnect(instalar)
+                connection.execute_wrappers.remove(simular_red)
+
+    def resumen(self, latencias, duracion):
+        return {
+            'p50': statistics.median(latencias),
+            'p95': percentil(latencias, 95),
+            'por_segundo': len(latencias) / duracion,
+        }
+
+    def medir_wsgi(self, url, repeticiones, concurrencia):
+        aplicacion = get_wsgi_application()
+        self.verificar(get_wsgi(aplicacion, url), url)
+
+        def peticion(_):
+            inicio = time.perf_counter()
+            get_wsgi(aplicacion, url)
+            return (time.perf_counter() - inicio) * 1000
+
+        inicio = time.perf_counter()
+        if concurrencia > 1:
+            # Un servidor WSGI con hilos: una petición por hilo
+            with ThreadPoolExecutor(concurrencia) as pool:
+                latencias = list(pool.map(peticion, range(repeticiones)))
+        else:
+            latencias = [peticion(i) for i in range(repeticiones)]
+        return self.resumen(latencias, time.perf_counter() - inicio)
+
+    async def medir_asgi(self, url, repeticiones, concurrencia):
+        aplicacion = get_asgi_application()
+        self.verificar(await get_asgi(aplicacion, url), url)
+        limite = asyncio.Semaphore(concurrencia)
+
+        async def peticion():
+            async with limite:
+                inicio = time.perf_counter()
+                await get_asgi(aplicacion, url)
+                return (time.perf_counter() - inicio) * 1000
+
+        inicio = time.perf_counter()
+        latencias = await asyncio.gather(*(peticion() for _ in range(repeticiones)))
+        return self.resumen(latencias, time.perf_counter() - inicio)
+
+    def verificar(self, estado, url):
+        if estado >= 400:
+            raise CommandError(f'{url} respondió {estado}')
@@ -0,0 +1,209 @@
+import json
+import statistics
+import time
+import tracemalloc
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from inventory.models import Inventario, MovimientoInventario
+from productos.models import Categoria, Producto
+from suppliers.models import Proveedor
+from users.models import Rol, Usuario
+
+BASELINE_POR_DEFECTO = Path(settings.BASE_DIR) / 'benchmarks' / 'baseline.json'
+
+
+def parametros_de_prueba():
+    """Ids y rangos reales de la base de datos para armar las URLs"""
+    hoy = timezone.localdate()
+    producto = Inventario.objects.order_by('producto_id').values_list('producto_id', flat=True).first() \
+        or Producto.objects.order_by('idproducto').values_list('idproducto', flat=True).first()
+    return {
+        'producto': producto or 0,
+        'productos': ','.join(map(str, Producto.objects.order_by('idproducto').values_list('idproducto', flat=True)[:200])) or '0',
+        'usuario': Usuario.objects.order_by('idusuario').values_list('idusuario', flat=True).first() or 0,
+        'rol': Rol.objects.order_by('idrol').values_list('idrol', flat=True).first() or 0,
+        'categoria': Categoria.objects.order_by('idcategoria').values_list('idcategoria', flat=True).first() or 0,
+        'proveedor': Proveedor.objects.order_by('idproveedor').values_list('idproveedor', flat=True).first() or 0,
+        'movimiento': MovimientoInventario.objects.order_by('-idmovimientoinventario').values_list('idmovimientoinventario', flat=True).first() or 0,
+        'lote': Producto.objects.filter(idproducto=producto).values_list('lote', flat=True).first() or 'L',
+        'desde': (hoy - timedelta(days=30)).isoformat(),
+        'hasta': hoy.isoformat(),
+    }
+
+
+def endpoints(p):
+    """Endpoints de lectura a medir: nombre -> URL"""
+    rango = f"fecha_inicio={p['desde']}&fecha_fin={p['hasta']}"
+    return {
+        # inventory
+        'inventario.list': '/inventory/inventario/',
+        'inventario.por_producto': f"/inventory/inventario/por_producto/?producto_id={p['producto']}",
+        'inventario.stock_actual': f"/inventory/inventario/stock_actual/?producto_id={p['producto']}",
+        'inventario.stock_lote': f"/inventory/inventario/stock_lote/?producto_ids={p['productos']}",
+        'inventario.bajo_stock': '/inventory/inventario/bajo_stock/',
+        'inventario.sin_stock': '/inventory/inventario/sin_stock/',
+        'movimientos.list': '/inventory/movimientos/',
+        'movimientos.por_producto': f"/inventory/movimientos/por_producto/?producto_id={p['producto']}",
+        'movimientos.por_fecha': f'/inventory/movimientos/por_fecha/?{rango}',
+        'movimientos.por_usuario': f"/inventory/movimientos/por_usuario/?usuario_id={p['usuario']}",
+        'detalles.list': '/inventory/detalles/',
+        'detalles.por_movimiento': f"/inventory/detalles/por_movimiento/?movimiento_id={p['movimiento']}",
+        'vencimientos.list': '/inventory/vencimientos/',
+        'vencimientos.por_vencer': '/inventory/vencimientos/por_vencer/',
+        'vencimientos.vencidos': '/inventory/vencimientos/vencidos/',
+        'vencimientos.no_notificados': '/inventory/vencimientos/no_notificados/',
+        'vencimientos.por_producto': f"/inventory/vencimientos/por_producto/?producto_id={p['producto']}",
+        'reportes.stock_actual': '/inventory/reportes/stock-actual/',
+        'reportes.movimientos_periodo': f'/inventory/reportes/movimientos-periodo/?{rango}',
+        'reportes.productos_vencimiento': '/inventory/reportes/productos-vencimiento/',
+        'reportes.proveedores_activos': '/inventory/reportes/proveedores-activos/',
+        'dashboard': '/inventory/dashboard/',
+        # productos
+        'categorias.list': '/productos/categorias/',
+        'unidades_medida.list': '/productos/unidades-medida/',
+        'productos.list': '/productos/productos/',
+        'productos.buscar': '/productos/productos/buscar/?q=Urea',
+        'productos.por_categoria': f"/productos/productos/por_categoria/?categoria_id={p['categoria']}",
+        'productos.por_lote': f"/productos/productos/por_lote/?lote={p['lote']}",
+        'producto_proveedor.list': '/productos/producto-proveedor/',
+        'producto_proveedor.proveedores_producto': f"/productos/producto-proveedor/proveedores_producto/?producto_id={p['producto']}",
+        'producto_proveedor.productos_proveedor': f"/productos/producto-proveedor/productos_proveedor/?proveedor_id={p['proveedor']}",
+        # suppliers
+        'proveedores.list': '/suppliers/proveedores/',
+        'proveedores.activos': '/suppliers/proveedores/activos/',
+        'proveedores.buscar': '/suppliers/proveedores/buscar/?q=Agro',
+        # users
+        'usuarios.list': '/api/usuarios/',
+        'usuarios.por_rol': f"/api/usuarios/por_rol/?rol_id={p['rol']}",
+        'roles.list': '/api/roles/',
+    }
+
+
+def filas_en(contenido):
+    """Cantidad de registros en el cuerpo JSON de la respuesta"""
+    try:
+        datos = json.loads(contenido)
+    except ValueError:
+        return None
+    if isinstance(datos, dict):
+        datos = datos.get('results', datos.get('data', datos))
+    return len(datos) if isinstance(datos, list) else 1
+
+
+def filas_leidas_mysql():
+    """Filas leídas por el motor (contadores Handler_read_* de la sesión)"""
+    if connection.vendor != 'mysql':
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute("SHOW SESSION STATUS LIKE 'Handler_read%%'")
+        return sum(int(valor) for _, valor in cursor.fetchall())
+
+
+class Command(BaseCommand):
+    help = (
+        'Mide latencia, consultas SQL, filas y memoria pico de los endpoints de lectura '
+        'y los compara con una línea base en JSON'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--baseline', default=str(BASELINE_POR_DEFECTO), help='Archivo JSON de la línea base')
+        parser.add_argument('--guardar', action='store_true', help='Guardar los resultados como nueva línea base')
+        parser.add_argument('--repeticiones', type=int, default=5)
+        parser.add_argument('--tolerancia', type=float, default=20.0, help='Porcentaje de lentitud permitido frente a la línea base')
+        parser.add_argument('--filtro', default='', help='Medir solo los endpoints cuyo nombre contenga este texto')
+
+    def handle(self, *args, **opciones):
+        cliente = Client(HTTP_HOST='localhost')
+        objetivos = {
+            nombre: url for nombre, url in endpoints(parametros_de_prueba()).items()
+            if opciones['filtro'] in nombre
+        }
+        if not objetivos:
+            raise CommandError('Ningún endpoint coincide con el filtro')
+
+        resultados = {}
+        for nombre, url in objetivos.items():
+            resultados[nombre] = self.medir(cliente, url, opciones['repeticiones'])
+            r = resultados[nombre]
+            self.stdout.write(
+                f"{nombre:45} {r['latencia_ms']:>10.2f} ms {r['consultas']:>6} consultas "
+                f"{r['filas']!s:>8} filas {r['memoria_pico_kb']:>10.1f} KB"
+            )
+
+        ruta = Path(opciones['baseline'])
+        if opciones['guardar']:
+            ruta.parent.mkdir(parents=True, exist_ok=True)
+            ruta.write_text(json.dumps({
+                'backend': connection.vendor,
+                'fecha': timezone.now().isoformat(),
+                'endpoints': resultados
+            }, indent=2, sort_keys=True))
+            self.stdout.write(self.style.SUCCESS(f'Línea base guardada en {ruta}'))
+            return
+
+        if not ruta.exists():
+            self.stdout.write(self.style.WARNING(f'No hay línea base en {ruta}; use --guardar para crearla'))
+            return
+
+        regresiones = self.comparar(json.loads(ruta.read_text())['endpoints'], resultados, opciones['tolerancia'])
+        if regresiones:
+            for regresion in regresiones:
+                self.stdout.write(self.style.ERROR(regresion))
+            raise CommandError(f'{len(regresiones)} regresión(es) frente a la línea base')
+        self.stdout.write(self.style.SUCCESS('Sin regresiones frente a la línea base'))
+
+    def medir(self, cliente, url, repeticiones):
+        # Calentamiento: carga perezosa de módulos y cachés de la conexión
+        respuesta = cliente.get(url)
+        if respuesta.status_code >= 500:
+            raise CommandError(f'{url} respondió {respuesta.status_code}')
+
+        latencias = []
+        for _ in range(repeticiones):
+            inicio = time.perf_counter()
+            cliente.get(url)
+            latencias.append((time.perf_counter() - inicio) * 1000)
+
+        leidas_inicio = filas_leidas_mysql()
+        tracemalloc.start()
+        try:
+            with CaptureQueriesContext(connection) as consultas:
+                respuesta = cliente.get(url)
+            _, pico = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        leidas_fin = filas_leidas_mysql()
+
+        return {
+            'url': url,
+            'estado': respuesta.status_code,
+            'latencia_ms': round(statistics.median(latencias), 3),
+            'consultas': len(consultas),
+            'filas': filas_en(respuesta.content),
+            'filas_leidas': leidas_fin - leidas_inicio if leidas_inicio is not None else None,
+            'memoria_pico_kb': round(pico / 1024, 1),
+        }
+
+    def comparar(self, base, actual, tolerancia):
+        regresiones = []
+        for nombre, datos in actual.items():
+            previo = base.get(nombre)
+            if not previo:
+                continue
+            limite = previo['latencia_ms'] * (1 + tolerancia / 100)
+            if datos['latencia_ms'] > limite:
+                regresiones.append(
+                    f"{nombre}: {datos['latencia_ms']:.2f} ms vs {previo['latencia_ms']:.2f} ms "
+                    f"(+{(datos['latencia_ms'] / previo['latencia_ms'] - 1) * 100:.0f}%)"
+                )
+            if datos['consultas'] > previo['consultas']:
+                regresiones.append(f"{nombre}: {datos['consultas']} consultas vs {previo['consultas']}")
+        return regresiones
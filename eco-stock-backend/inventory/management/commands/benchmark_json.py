@@ -0,0 +1,83 @@
+import io
+import json
+import statistics
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from inventory import contadores
+from inventory.management.commands.benchmark_endpoints import parametros_de_prueba
+from inventory.serializers import MovimientoInventarioSerializer
+from inventory.reportes import preparar_reporte
+from inventory.views import MovimientoInventarioViewSet, movimientos_recientes
+from main_app.json_rapido import JSONRapidoParser, JSONRapidoRenderer, disponible
+
+
+def reporte(tipo, params):
+    """Datos de un reporte tal como los arma ReportesView para format=json"""
+    datos, columnas, filas = preparar_reporte(tipo, params)
+    datos['data'] = [dict(zip(columnas, fila)) for fila in filas]
+    return datos
+
+
+def cargas(filas):
+    """Respuestas reales de la base de datos: nombre -> datos antes de renderizar"""
+    p = parametros_de_prueba()
+    movimientos = MovimientoInventarioViewSet.queryset.order_by('-fecha', '-idmovimientoinventario')[:filas]
+    dashboard = contadores.leer()
+    dashboard['movimientos_recientes'] = movimientos_recientes()
+    return {
+        'movimientos.list': MovimientoInventarioSerializer(movimientos, many=True).data,
+        'reportes.stock_actual': reporte('stock-actual', {}),
+        'reportes.movimientos_periodo': reporte('movimientos-periodo', {'fecha_inicio': p['desde'], 'fecha_fin': p['hasta']}),
+        'dashboard': dashboard,
+    }
+
+
+def medir(funcion, repeticiones):
+    """Mediana en ms de repeticiones llamadas"""
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    return statistics.median(tiempos)
+
+
+class Command(BaseCommand):
+    help = (
+        'Compara el JSONRenderer/JSONParser de DRF con los de main_app.json_rapido sobre '
+        'respuestas reales (historial de movimientos, reportes, dashboard) y comprueba que '
+        'ambos producen el mismo JSON'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeticiones', type=int, default=50, help='Veces que se renderiza cada respuesta')
+        parser.add_argument(
+            '--filas', type=int, default=settings.MOVIMIENTOS_MAX_PAGE_SIZE,
+            help='Movimientos serializados en la página del historial'
+        )
+
+    def handle(self, *args, **opciones):
+        if not disponible():
+            self.stdout.write(self.style.WARNING('orjson no está instalado: se mide el camino estándar de DRF'))
+        estandar, rapido = JSONRenderer(), JSONRapidoRenderer()
+        repeticiones = opciones['repeticiones']
+
+        for nombre, datos in cargas(opciones['filas']).items():
+            salida = rapido.render(datos)
+            if json.loads(salida) != json.loads(estandar.render(datos)):
+                raise CommandError(f'{nombre}: el JSON rápido no coincide con el de DRF')
+
+            drf = medir(lambda: estandar.render(datos), repeticiones)
+            nuevo = medir(lambda: rapido.render(datos), repeticiones)
+            drf_lectura = medir(lambda: JSONParser().parse(io.BytesIO(salida)), repeticiones)
+            nuevo_lectura = medir(lambda: JSONRapidoParser().parse(io.BytesIO(salida)), repeticiones)
+            self.stdout.write(
+                f'{nombre:30} {len(salida) / 1024:>8.1f} KB  '
+                f'render DRF {drf:>8.3f} ms  rápido {nuevo:>8.3f} ms ({drf / nuevo:>5.1f}x)  '
+                f'parse DRF {drf_lectura:>8.3f} ms  rápido {nuevo_lectura:>8.3f} ms ({drf_lectura / nuevo_lectura:>5.1f}x)'
+            )
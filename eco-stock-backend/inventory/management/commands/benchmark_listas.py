@@ -0,0 +1,69 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from inventory.views import InventarioViewSet, MovimientoInventarioViewSet, ProductosVencimientoViewSet
+from main_app.campos import filas, mapear
+from productos.views import ProductoProveedorViewSet, ProductoViewSet
+
+# Listados a medir: nombre -> (ViewSet, campos de ejemplo para ?fields=)
+LISTADOS = {
+    'productos': (ProductoViewSet, ['idproducto', 'nombre', 'categoria_nombre']),
+    'inventario': (InventarioViewSet, ['producto', 'producto_nombre', 'cantidad']),
+    'movimientos': (MovimientoInventarioViewSet, ['fecha', 'tipo_movimiento', 'producto_nombre']),
+    'vencimientos': (ProductosVencimientoViewSet, ['producto_id', 'fecha_vencimiento']),
+    'producto_proveedor': (ProductoProveedorViewSet, ['producto', 'proveedor']),
+}
+
+
+def medir(funcion, repeticiones):
+    """(mediana en segundos, filas) de repeticiones llamadas"""
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        datos = funcion()
+        tiempos.append(time.perf_counter() - inicio)
+    return statistics.median(tiempos), len(datos)
+
+
+class Command(BaseCommand):
+    help = (
+        'Filas por segundo de los listados con el serializador de DRF frente al camino '
+        'values_list() de main_app.campos, con todos los campos y con ?fields=. '
+        'Comprueba que ambos caminos devuelven los mismos datos'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeticiones', type=int, default=5, help='Veces que se arma cada listado')
+        parser.add_argument('--limite', type=int, default=0, help='Máximo de filas por listado (0 = todas)')
+        parser.add_argument('--filtro', default='', help='Medir solo los listados cuyo nombre contenga este texto')
+
+    def handle(self, *args, **opciones):
+        listados = {nombre: valor for nombre, valor in LISTADOS.items() if opciones['filtro'] in nombre}
+        if not listados:
+            raise CommandError('Ningún listado coincide con el filtro')
+
+        for nombre, (vista, campos) in listados.items():
+            mapeo = mapear(vista.serializer_class)
+            if mapeo is None:
+                self.stdout.write(self.style.WARNING(f'{nombre}: el serializador no admite values_list()'))
+                continue
+            queryset = vista.queryset.all()
+            if opciones['limite']:
+                queryset = queryset[:opciones['limite']]
+            if [dict(fila) for fila in vista.serializer_class(queryset, many=True).data] != filas(queryset, mapeo):
+                raise CommandError(f'{nombre}: values_list() no coincide con el serializador')
+
+            parcial = [campo for campo in mapeo if campo[0] in campos]
+            serializador, total = medir(lambda: vista.serializer_class(queryset, many=True).data, opciones['repeticiones'])
+            rapido, _ = medir(lambda: filas(queryset, mapeo), opciones['repeticiones'])
+            disperso, _ = medir(lambda: filas(queryset, parcial), opciones['repeticiones'])
+            if not total:
+                self.stdout.write(self.style.WARNING(f'{nombre}: sin filas'))
+                continue
+            self.stdout.write(
+                f'{nombre:20} {total:>7} filas  serializador {total / serializador:>10,.0f} filas/s  '
+                f'values_list {total / rapido:>10,.0f} filas/s ({serializador / rapido:>4.1f}x)  '
+                f'?fields={",".join(campos)} {total / disperso:>10,.0f} filas/s ({serializador / disperso:>4.1f}x)'
+            )
@@ -0,0 +1,47 @@
+import time
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Min
+from django.utils import timezone
+
+from inventory import cierres
+from inventory.models import MovimientoInventario
+
+
+def fecha(valor):
+    return datetime.strptime(valor, '%Y-%m-%d').date()
+
+
+class Command(BaseCommand):
+    help = (
+        'Guarda el cierre de stock del último período terminado (programar con cron después de '
+        'medianoche). Con --desde/--hasta construye retroactivamente todos los cierres del rango; '
+        'volver a ejecutarlo reemplaza los cierres de esas fechas'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--desde', type=fecha, help='Primera fecha del rango (AAAA-MM-DD)')
+        parser.add_argument('--hasta', type=fecha, help='Última fecha del rango; por defecto el último período terminado')
+        parser.add_argument('--periodo', choices=[cierres.DIARIO, cierres.MENSUAL], help='Por defecto CIERRES_PERIODO')
+        parser.add_argument('--inicio', action='store_true', help='Desde la fecha del primer movimiento')
+
+    def handle(self, *args, **opciones):
+        periodo = opciones['periodo'] or cierres.periodo()
+        hasta = opciones['hasta'] or cierres.ultimo_cierre(periodo_=periodo)
+        if hasta >= timezone.localdate():
+            raise CommandError('Solo se pueden cerrar días ya terminados')
+
+        desde = opciones['desde']
+        if opciones['inicio']:
+            desde = MovimientoInventario.objects.aggregate(primera=Min('fecha'))['primera'] or hasta
+        fechas = cierres.fechas_de_cierre(desde, hasta, periodo) if desde else [hasta]
+        if not fechas:
+            raise CommandError('No hay fechas de cierre en el rango')
+
+        inicio = time.perf_counter()
+        guardados = cierres.construir(fechas)
+        duracion = time.perf_counter() - inicio
+        for dia, productos in sorted(guardados.items()):
+            self.stdout.write(f'  {dia.isoformat()}: {productos} producto(s) con stock')
+        self.stdout.write(self.style.SUCCESS(f'{len(guardados)} cierre(s) guardado(s) en {duracion:.2f} s (período {periodo})'))
@@ -0,0 +1,119 @@
+import re
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+
+from inventory.management.commands.benchmark_endpoints import endpoints, parametros_de_prueba
+
+
+def capturar_consultas(cliente, url):
+    """Ejecutar la petición y devolver las sentencias SELECT con sus parámetros"""
+    consultas = []
+
+    def registrar(execute, sql, params, many, context):
+        if sql.lstrip().upper().startswith('SELECT'):
+            consultas.append((sql, tuple(params or ())))
+        return execute(sql, params, many, context)
+
+    with connection.execute_wrapper(registrar):
+        respuesta = cliente.get(url)
+    return respuesta.status_code, consultas
+
+
+def plan_mysql(cursor, sql, params):
+    """(tabla, detalle, escaneo_completo) por cada fila del EXPLAIN de MySQL"""
+    cursor.execute('EXPLAIN ' + sql, params)
+    columnas = [columna[0] for columna in cursor.description]
+    for fila in cursor.fetchall():
+        plan = dict(zip(columnas, fila))
+        detalle = f"type={plan['type']} key={plan['key']} rows={plan['rows']} {plan.get('Extra') or ''}".strip()
+        # <derivedN>, <subqueryN> y <unionN> son tablas temporales, no de la base
+        tabla = plan['table'] or ''
+        yield tabla, detalle, plan['type'] == 'ALL' and not tabla.startswith('<')
+
+
+def tablas_sqlite(cursor, sql):
+    """Nombre o alias que usa el plan de SQLite -> tabla real de la consulta"""
+    tablas = set(connection.introspection.table_names(cursor))
+    nombres = {tabla: tabla for tabla in tablas}
+    # Django escribe los alias sin comillas: FROM "tabla" U0, INNER JOIN "tabla" T3
+    for tabla, alias in re.findall(r'"(\w+)"\s+(?:AS\s+)?"?(\w+)"?', sql):
+        if tabla in tablas:
+            nombres[alias] = tabla
+    return nombres
+
+
+def plan_sqlite(cursor, sql, params):
+    """(tabla, detalle, escaneo_completo) por cada fila del EXPLAIN QUERY PLAN de SQLite"""
+    nombres = tablas_sqlite(cursor, sql)
+    cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+    for fila in cursor.fetchall():
+        detalle = fila[-1]
+        coincidencia = re.match(r'SCAN (\S+)(.*)', detalle)
+        # Subconsultas, CTE materializadas y CONSTANT ROW no son tablas de la base
+        tabla = nombres.get(coincidencia.group(1)) if coincidencia else None
+        if tabla is None:
+            yield '', detalle, False
+            continue
+        # "SCAN tabla USING [COVERING] INDEX" recorre un índice, no la tabla
+        yield tabla, detalle, 'USING' not in coincidencia.group(2)
+
+
+PLANES = {
+    'mysql': plan_mysql,
+    'sqlite': plan_sqlite,
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Ejecuta EXPLAIN sobre las consultas de cada endpoint de lectura y marca los escaneos '
+        'completos de tabla. Use una base con datos realistas (seed_ecostock): con pocas filas '
+        'el optimizador puede preferir recorrer la tabla'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--filtro', default='', help='Analizar solo los endpoints cuyo nombre contenga este texto')
+        parser.add_argument('--detalle', action='store_true', help='Mostrar también los planes sin escaneos completos')
+
+    def handle(self, *args, **opciones):
+        plan = PLANES.get(connection.vendor)
+        if plan is None:
+            raise CommandError(f'EXPLAIN no está soportado para {connection.vendor}')
+
+        cliente = Client(HTTP_HOST='localhost')
+        objetivos = {
+            nombre: url for nombre, url in endpoints(parametros_de_prueba()).items()
+            if opciones['filtro'] in nombre
+        }
+        if not objetivos:
+            raise CommandError('Ningún endpoint coincide con el filtro')
+
+        escaneos = 0
+        for nombre, url in objetivos.items():
+            estado, consultas = capturar_consultas(cliente, url)
+            self.stdout.write(self.style.MIGRATE_HEADING(f'{nombre} ({estado}) {url}'))
+            vistas = set()
+            for sql, params in consultas:
+                if (sql, params) in vistas:
+                    continue
+                vistas.add((sql, params))
+                with connection.cursor() as cursor:
+                    filas = list(plan(cursor, sql, params))
+                completos = [tabla for tabla, _, completo in filas if completo]
+                # Sin WHERE el recorrido completo es lo esperado (listados sin filtro)
+                filtrada = ' WHERE ' in sql.upper()
+                if completos and filtrada:
+                    escaneos += 1
+                    self.stdout.write(self.style.ERROR(f"  ESCANEO COMPLETO en {', '.join(completos)}"))
+                elif completos:
+                    self.stdout.write(self.style.WARNING(f"  Lectura completa sin filtro de {', '.join(completos)}"))
+                if (completos and filtrada) or opciones['detalle']:
+                    self.stdout.write(f'    {sql % tuple(repr(p) for p in params)}')
+                    for _, detalle, _ in filas:
+                        self.stdout.write(f'      {detalle}')
+
+        if escaneos:
+            raise CommandError(f'{escaneos} consulta(s) filtrada(s) recorren la tabla completa')
+        self.stdout.write(self.style.SUCCESS('Ninguna consulta filtrada recorre una tabla completa'))
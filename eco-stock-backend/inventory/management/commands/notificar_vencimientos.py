@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from inventory.notificaciones import procesar_vencimientos
+
+
+class Command(BaseCommand):
+    help = (
+        'Envía resúmenes por correo de los productos por vencer o vencidos y los marca como '
+        'notificados por bloques. Se puede programar con cron; si se interrumpe, la siguiente '
+        'ejecución continúa con los pendientes'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dias', type=int, default=30, help='Incluir vencimientos hasta hoy + N días')
+        parser.add_argument('--bloque', type=int, default=500, help='Productos por correo y por UPDATE')
+        parser.add_argument('--destinatario', action='append', dest='destinatarios',
+                            help='Correo destino (repetible); por defecto VENCIMIENTOS_DESTINATARIOS o los administradores')
+        parser.add_argument('--simular', action='store_true', help='Recorrer sin enviar correos ni marcar filas')
+
+    def handle(self, *args, **opciones):
+        def avance(resultado):
+            if opciones['verbosity'] > 1:
+                self.stdout.write(
+                    f'Bloque {resultado.bloques}: {resultado.filas} filas '
+                    f'({resultado.filas_por_segundo:,.0f} filas/s)'
+                )
+
+        try:
+            resultado = procesar_vencimientos(
+                dias=opciones['dias'],
+                tamano_bloque=opciones['bloque'],
+                destinatarios=opciones['destinatarios'],
+                simular=opciones['simular'],
+                al_procesar_bloque=avance
+            )
+        except ValueError as error:
+            raise CommandError(str(error))
+
+        accion = 'recorridas (simulación)' if resultado.simulado else 'notificadas'
+        self.stdout.write(self.style.SUCCESS(
+            f'{resultado.filas} filas {accion} en {resultado.bloques} bloque(s), {resultado.correos} correo(s), '
+            f'{resultado.segundos:.2f} s ({resultado.filas_por_segundo:,.0f} filas/s)'
+        ))
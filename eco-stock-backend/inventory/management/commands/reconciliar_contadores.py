@@ -0,0 +1,28 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from inventory.contadores import reconciliar
+
+
+class Command(BaseCommand):
+    help = (
+        'Compara los contadores del dashboard con las tablas de origen y corrige la deriva. '
+        'Se puede programar con cron; --reconstruir los vuelve a crear desde cero (después de '
+        'cargas masivas o de cambiar DASHBOARD_RANURAS / DASHBOARD_UMBRAL_CRITICO)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reconstruir', action='store_true', help='Borrar y recalcular todos los contadores')
+
+    def handle(self, *args, **opciones):
+        inicio = time.perf_counter()
+        derivas = reconciliar(reconstruir=opciones['reconstruir'])
+        duracion = time.perf_counter() - inicio
+
+        for (nombre, ranura), (guardado, real) in sorted(derivas.items()):
+            self.stdout.write(self.style.WARNING(f'  {nombre}[{ranura}]: {guardado} -> {real}'))
+        accion = 'reconstruidos' if opciones['reconstruir'] else 'reconciliados'
+        self.stdout.write(self.style.SUCCESS(
+            f'Contadores {accion} en {duracion:.2f} s, {len(derivas)} con diferencias'
+        ))
@@ -0,0 +1,27 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from inventory.relleno import TAMANO_RANGO, rellenar
+
+
+class Command(BaseCommand):
+    help = (
+        'Completa la cantidad y el producto copiados en los movimientos a los que les faltan '
+        '(filas escritas por una versión anterior o cargadas sin el ORM), por rangos de llave '
+        'primaria con una transacción corta por rango. --todos los recalcula en todas las filas'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--todos', action='store_true', help='Recalcular también los movimientos ya completos')
+        parser.add_argument('--tamano', type=int, default=TAMANO_RANGO, help='Llaves primarias por rango')
+
+    def handle(self, *args, **opciones):
+        def avanzar(hasta, actualizadas):
+            if opciones['verbosity'] > 1:
+                self.stdout.write(f'  hasta {hasta}: {actualizadas} fila(s)')
+
+        inicio = time.perf_counter()
+        actualizadas = rellenar(todos=opciones['todos'], tamano=opciones['tamano'], al_avanzar=avanzar)
+        duracion = time.perf_counter() - inicio
+        self.stdout.write(self.style.SUCCESS(f'{actualizadas} movimiento(s) actualizado(s) en {duracion:.2f} s'))
@@ -0,0 +1,319 @@
+import random
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import timedelta
+from itertools import islice
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from inventory import contadores
+from main_app import condicional
+from inventory.models import DetalleEntradaSalida, Inventario, MovimientoInventario, ProductosVencimiento
+from productos import busqueda
+from productos.models import Categoria, Producto, ProductoProveedor, TerminoProducto, UnidadesMedida
+from suppliers.busqueda import claves as claves_proveedor
+from suppliers.models import Proveedor
+from users.models import Rol, Usuario
+
+TIPOS_PROVEEDOR = ['Fertilizantes', 'Semillas', 'Herramientas', 'Agroquímicos', 'Riego', 'Maquinaria']
+PRESENTACIONES = ['Bulto', 'Caja', 'Bolsa', 'Galón', 'Unidad', 'Saco']
+NOMBRES = ['Urea', 'Abono', 'Semilla', 'Pala', 'Machete', 'Fungicida', 'Herbicida', 'Manguera', 'Compost', 'Cal']
+UNIDADES = [('Kilogramo', 'kg'), ('Gramo', 'g'), ('Litro', 'L'), ('Mililitro', 'mL'), ('Unidad', 'und'), ('Bulto', 'bto')]
+
+
+def siguiente_id(modelo):
+    """Primer id libre, para asignar llaves explícitas y no depender de RETURNING"""
+    return (modelo.objects.aggregate(maximo=Max(modelo._meta.pk.attname))['maximo'] or 0) + 1
+
+
+@contextmanager
+def carga_rapida():
+    """Diferir restricciones mientras dura la carga masiva"""
+    with connection.constraint_checks_disabled():
+        with connection.cursor() as cursor:
+            if connection.vendor == 'mysql':
+                cursor.execute('SET UNIQUE_CHECKS=0')
+            elif connection.vendor == 'sqlite':
+                cursor.execute('PRAGMA synchronous=OFF')
+        try:
+            yield
+        finally:
+            with connection.cursor() as cursor:
+                if connection.vendor == 'mysql':
+                    cursor.execute('SET UNIQUE_CHECKS=1')
+                elif connection.vendor == 'sqlite':
+                    cursor.execute('PRAGMA synchronous=FULL')
+
+
+class Command(BaseCommand):
+    help = 'Genera un conjunto de datos sintético y reproducible para pruebas de rendimiento'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--productos', type=int, default=50000)
+        parser.add_argument('--proveedores', type=int, default=500)
+        parser.add_argument('--movimientos', type=int, default=5000000)
+        parser.add_argument('--categorias', type=int, default=40)
+        parser.add_argument('--usuarios', type=int, default=25)
+        parser.add_argument('--dias', type=int, default=365, help='Días de historial de movimientos')
+        parser.add_argument('--vencimientos', type=float, default=0.3, help='Fracción de productos con fecha de vencimiento')
+        parser.add_argument('--lote', type=int, default=10000, help='Filas por lote (una transacción por lote)')
+        parser.add_argument('--seed', type=int, default=2025)
+
+    def handle(self, *args, **opciones):
+        self.rng = random.Random(opciones['seed'])
+        self.tamano_lote = opciones['lote']
+        self.hoy = timezone.localdate()
+        self.cargado = defaultdict(lambda: [0, 0.0])
+        inicio = time.perf_counter()
+
+        with carga_rapida():
+            roles = self.crear_roles()
+            usuarios = self.crear_usuarios(opciones['usuarios'], roles)
+            categorias = self.crear_categorias(opciones['categorias'])
+            unidades = self.crear_unidades()
+            proveedores = self.crear_proveedores(opciones['proveedores'])
+            productos = self.crear_productos(opciones['productos'], categorias, unidades)
+            self.indexar_productos(productos)
+            self.crear_asignaciones(productos, proveedores)
+            self.crear_vencimientos(productos, opciones['vencimientos'])
+            self.crear_movimientos(opciones['movimientos'], productos, usuarios, opciones['dias'])
+        self.reconstruir_contadores()
+        # Las filas crudas no pasan por las señales: invalidar los ETag de los catálogos
+        for modelo in (Rol, Categoria, UnidadesMedida, Proveedor):
+            condicional.incrementar(modelo)
+
+        duracion = time.perf_counter() - inicio
+        for tabla, (filas, segundos) in self.cargado.items():
+            self.stdout.write(f'{tabla}: {filas} filas en {segundos:.1f} s ({filas / max(segundos, 1e-9):,.0f} filas/s)')
+        total = sum(filas for filas, _ in self.cargado.values())
+        self.stdout.write(self.style.SUCCESS(
+            f'{total} filas en {duracion:.1f} s ({total / duracion:,.0f} filas/s)'
+        ))
+
+    def insertar(self, modelo, campos, filas):
+        """Insertar tuplas en lotes, una transacción por lote
+
+        Se usa executemany en lugar de bulk_create: con millones de filas el
+        costo de instanciar modelos y compilar cada INSERT domina la carga.
+        Los valores ya deben venir listos para la base de datos.
+        """
+        opts = modelo._meta
+        columnas = ', '.join(connection.ops.quote_name(opts.get_field(campo).column) for campo in campos)
+        marcadores = ', '.join(['%s'] * len(campos))
+        sql = f'INSERT INTO {connection.ops.quote_name(opts.db_table)} ({columnas}) VALUES ({marcadores})'
+
+        inicio = time.perf_counter()
+        total = 0
+        filas = iter(filas)
+        while True:
+            lote = list(islice(filas, self.tamano_lote))
+            if not lote:
+                break
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.executemany(sql, lote)
+            total += len(lote)
+
+        estadistica = self.cargado[opts.db_table]
+        estadistica[0] += total
+        estadistica[1] += time.perf_counter() - inicio
+        return total
+
+    def fecha(self, valor):
+        return connection.ops.adapt_datefield_value(valor)
+
+    def crear_roles(self):
+        roles = list(Rol.objects.order_by('idrol').values_list('idrol', flat=True))
+        if len(roles) >= 2:
+            return roles
+        inicio = siguiente_id(Rol)
+        nuevos = ['Administrador', 'Empleado'][len(roles):]
+        self.insertar(Rol, ['idrol', 'nombre'], ((inicio + i, nombre) for i, nombre in enumerate(nuevos)))
+        return roles + [inicio + i for i in range(len(nuevos))]
+
+    def crear_usuarios(self, cantidad, roles):
+        inicio = siguiente_id(Usuario)
+        contraseña = make_password('ecostock')
+        self.insertar(
+            Usuario,
+            ['idusuario', 'nombre', 'correo_electronico', 'contraseña', 'idrol'],
+            (
+                (inicio + i, f'Usuario {inicio + i}', f'usuario{inicio + i}@ecostock.test', contraseña,
+                 roles[0] if i == 0 else roles[1])
+                for i in range(cantidad)
+            )
+        )
+        return list(range(inicio, inicio + cantidad))
+
+    def crear_categorias(self, cantidad):
+        inicio = siguiente_id(Categoria)
+        self.insertar(
+            Categoria,
+            ['idcategoria', 'nombre', 'descripcion', 'tipo', 'vida_util', 'presentacion'],
+            (
+                (inicio + i, f'{self.rng.choice(TIPOS_PROVEEDOR)} {inicio + i}', 'Categoría generada',
+                 self.rng.choice(TIPOS_PROVEEDOR), f'{self.rng.randint(1, 36)} meses', self.rng.choice(PRESENTACIONES))
+                for i in range(cantidad)
+            )
+        )
+        return list(range(inicio, inicio + cantidad))
+
+    def crear_unidades(self):
+        existentes = list(UnidadesMedida.objects.values_list('id', flat=True))
+        if existentes:
+            return existentes
+        inicio = siguiente_id(UnidadesMedida)
+        self.insertar(
+            UnidadesMedida,
+            ['id', 'nombre', 'abreviatura'],
+            ((inicio + i, nombre, abreviatura) for i, (nombre, abreviatura) in enumerate(UNIDADES))
+        )
+        return list(range(inicio, inicio + len(UNIDADES)))
+
+    def crear_proveedores(self, cantidad):
+        inicio = siguiente_id(Proveedor)
+
+        def proveedores():
+            for i in range(cantidad):
+                nombre = f'Agro Proveedor {inicio + i}'
+                correo = f'ventas{inicio + i}@proveedor.test'
+                telefono = f'3{self.rng.randint(100000000, 199999999)}'
+                yield (
+                    inicio + i, self.rng.choice(TIPOS_PROVEEDOR), nombre,
+                    f'Calle {self.rng.randint(1, 200)} # {self.rng.randint(1, 99)}-{self.rng.randint(1, 99)}',
+                    self.rng.random() < 0.9, correo, telefono,
+                    *claves_proveedor(nombre, correo, telefono)
+                )
+
+        self.insertar(
+            Proveedor,
+            ['idproveedor', 'tipo', 'nombre', 'direccion', 'estado', 'correo', 'telefono',
+             'nombre_busqueda', 'correo_busqueda', 'telefono_busqueda'],
+            proveedores()
+        )
+        return list(range(inicio, inicio + cantidad))
+
+    def crear_productos(self, cantidad, categorias, unidades):
+        inicio = siguiente_id(Producto)
+        self.insertar(
+            Producto,
+            ['idproducto', 'nombre', 'descripcion', 'lote', 'idcategoria', 'unidad_medida_id'],
+            (
+                (inicio + i, f'{self.rng.choice(NOMBRES)} {inicio + i}', f'Producto agrícola {inicio + i}',
+                 f'L{self.rng.randint(1000, 9999)}-{(inicio + i) % 997}',
+                 self.rng.choice(categorias), self.rng.choice(unidades))
+                for i in range(cantidad)
+            )
+        )
+        return list(range(inicio, inicio + cantidad))
+
+    def indexar_productos(self, productos):
+        """Índice invertido de búsqueda; las filas crudas no disparan la señal post_save"""
+        if busqueda.usa_fulltext() or not productos:
+            return
+        filas = Producto.objects.filter(idproducto__gte=productos[0]).order_by('idproducto').values_list(
+            'idproducto', 'nombre', 'descripcion', 'lote'
+        )
+        self.insertar(TerminoProducto, ['termino', 'producto', 'peso'], busqueda.filas_indice(filas.iterator(self.tamano_lote)))
+
+    def reconstruir_contadores(self):
+        """Contadores del dashboard; las filas crudas tampoco pasan por las señales"""
+        inicio = time.perf_counter()
+        contadores.reconciliar(reconstruir=True)
+        self.stdout.write(f'Contadores del dashboard reconstruidos en {time.perf_counter() - inicio:.1f} s')
+
+    def crear_asignaciones(self, productos, proveedores):
+        if not proveedores:
+            return
+        inicio = siguiente_id(ProductoProveedor)
+
+        def asignaciones():
+            siguiente = inicio
+            for producto_id in productos:
+                for proveedor_id in self.rng.sample(proveedores, min(len(proveedores), self.rng.randint(1, 3))):
+                    yield siguiente, producto_id, proveedor_id
+                    siguiente += 1
+
+        self.insertar(ProductoProveedor, ['id', 'producto', 'proveedor'], asignaciones())
+
+    def crear_vencimientos(self, productos, fraccion):
+        def vencimientos():
+            for producto_id in productos:
+                if self.rng.random() >= fraccion:
+                    continue
+                fecha = self.hoy + timedelta(days=self.rng.randint(-60, 365))
+                yield producto_id, self.fecha(fecha), fecha < self.hoy and self.rng.random() < 0.7
+
+        self.insertar(ProductosVencimiento, ['producto_id', 'fecha_vencimiento', 'notificado'], vencimientos())
+
+    def crear_movimientos(self, cantidad, productos, usuarios, dias):
+        """Movimientos en orden cronológico; el inventario final cuadra con los detalles
+
+        Las salidas nunca superan el stock acumulado del producto. Las filas de
+        inventario se insertan al final con el stock resultante y llaves
+        asignadas de antemano, por eso la carga corre con restricciones diferidas.
+        """
+        if not productos:
+            return
+        inventario_inicio = siguiente_id(Inventario)
+        inventario_de = {producto_id: inventario_inicio + i for i, producto_id in enumerate(productos)}
+        stock = dict.fromkeys(productos, 0)
+        movimiento_inicio = siguiente_id(MovimientoInventario)
+        detalle_inicio = siguiente_id(DetalleEntradaSalida)
+        fechas = [self.fecha(self.hoy - timedelta(days=dias - dia)) for dia in range(dias + 1)]
+        cantidades = []
+
+        def movimientos():
+            aleatorio = self.rng.random
+            for inicio in range(0, cantidad, self.tamano_lote):
+                # Elegir productos y usuarios por bloque es mucho más rápido que fila por fila
+                n = min(self.tamano_lote, cantidad - inicio)
+                elegidos = self.rng.choices(productos, k=n)
+                responsables = self.rng.choices(usuarios, k=n)
+                for j in range(n):
+                    i = inicio + j
+                    producto_id = elegidos[j]
+                    unidades = int(aleatorio() * 50) + 1
+                    if stock[producto_id] >= unidades and aleatorio() < 0.45:
+                        tipo = 'SALIDA'
+                        stock[producto_id] -= unidades
+                    else:
+                        tipo = 'ENTRADA'
+                        stock[producto_id] += unidades
+                    cantidades.append(unidades)
+                    yield (
+                        movimiento_inicio + i, fechas[i * dias // cantidad], tipo,
+                        responsables[j], inventario_de[producto_id], unidades, producto_id
+                    )
+
+        # Por porciones para no acumular millones de cantidades en memoria
+        generados = movimientos()
+        insertados = 0
+        while insertados < cantidad:
+            porcion = min(cantidad - insertados, self.tamano_lote * 10)
+            self.insertar(
+                MovimientoInventario,
+                ['idmovimientoinventario', 'fecha', 'tipo_movimiento', 'idusuario', 'inventario_id', 'cantidad', 'producto'],
+                islice(generados, porcion)
+            )
+            self.insertar(
+                DetalleEntradaSalida,
+                ['iddetalleentrada', 'cantidad', 'identradainventario'],
+                (
+                    (detalle_inicio + insertados + i, unidades, movimiento_inicio + insertados + i)
+                    for i, unidades in enumerate(cantidades)
+                )
+            )
+            insertados += porcion
+            cantidades.clear()
+
+        hoy = self.fecha(self.hoy)
+        self.insertar(
+            Inventario,
+            ['id', 'producto', 'cantidad', 'fecha_actualizacion'],
+            ((inventario_de[producto_id], producto_id, stock[producto_id], hoy) for producto_id in productos)
+        )
@@ -0,0 +1,240 @@
+import json
+import multiprocessing
+import random
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import Counter, defaultdict
+
+import django
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.db.models import Case, F, IntegerField, Sum, When
+
+RUTA_ENTRADA = '/inventory/movimientos/registrar_entrada/'
+RUTA_SALIDA = '/inventory/movimientos/registrar_salida/'
+
+
+def percentil(valores, p):
+    """Percentil p (0-100) por el método del rango más cercano"""
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    indice = max(0, min(len(ordenados) - 1, int(round(p / 100 * len(ordenados) + 0.5)) - 1))
+    return ordenados[indice]
+
+
+def trabajador(indice, opciones):
+    """Ejecutar las operaciones de un hilo o proceso y devolver (ruta, estado, segundos)"""
+    if not apps.ready:
+        django.setup()
+    from django.test import Client
+
+    rng = random.Random(opciones['seed'] + indice)
+    cliente = None if opciones['url'] else Client(HTTP_HOST='localhost')
+    resultados = []
+    try:
+        for _ in range(opciones['operaciones']):
+            ruta = RUTA_SALIDA if rng.random() < opciones['proporcion_salidas'] else RUTA_ENTRADA
+            cuerpo = {
+                'producto_id': rng.choice(opciones['productos']),
+                'cantidad': rng.randint(1, opciones['cantidad_max']),
+                'usuario_id': opciones['usuario'],
+            }
+            inicio = time.perf_counter()
+            if cliente is not None:
+                estado = cliente.post(ruta, cuerpo, content_type='application/json').status_code
+            else:
+                estado = enviar_http(opciones['url'] + ruta, cuerpo)
+            resultados.append((ruta, estado, time.perf_counter() - inicio))
+    finally:
+        connections.close_all()
+    return resultados
+
+
+def trabajador_proceso(argumentos):
+    return trabajador(*argumentos)
+
+
+def enviar_http(url, cuerpo):
+    peticion = urllib.request.Request(
+        url,
+        data=json.dumps(cuerpo).encode('utf-8'),
+        headers={'Content-Type': 'application/json'},
+        method='POST'
+    )
+    try:
+        with urllib.request.urlopen(peticion, timeout=30) as respuesta:
+            respuesta.read()
+            return respuesta.status
+    except urllib.error.HTTPError as error:
+        return error.code
+    except urllib.error.URLError:
+        return 0
+
+
+def espera_bloqueos():
+    """Tiempo total (ms) y número de esperas por bloqueos de fila de InnoDB"""
+    if connection.vendor != 'mysql':
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SHOW GLOBAL STATUS WHERE Variable_name IN ('Innodb_row_lock_time', 'Innodb_row_lock_waits')"
+        )
+        valores = {nombre: int(valor) for nombre, valor in cursor.fetchall()}
+    return valores.get('Innodb_row_lock_time', 0), valores.get('Innodb_row_lock_waits', 0)
+
+
+class Command(BaseCommand):
+    help = (
+        'Genera carga concurrente sobre registrar_entrada/registrar_salida y verifica '
+        'que Inventario.cantidad cuadre con DetalleEntradaSalida por producto'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--trabajadores', type=int, default=8, help='Hilos o procesos concurrentes')
+        parser.add_argument('--procesos', action='store_true', help='Usar procesos en lugar de hilos')
+        parser.add_argument('--operaciones', type=int, default=200, help='Operaciones por trabajador')
+        parser.add_argument('--productos', type=int, default=5, help='Productos distintos a golpear (menos = más contención)')
+        parser.add_argument('--usuario', type=int, help='ID del usuario que registra los movimientos')
+        parser.add_argument('--proporcion-salidas', type=float, default=0.4)
+        parser.add_argument('--cantidad-max', type=int, default=5)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--url', default='', help='Servidor a usar (p. ej. http://localhost:8000); por defecto en proceso')
+        parser.add_argument('--json', action='store_true', help='Imprimir el resultado como JSON')
+
+    def handle(self, *args, **opciones):
+        from inventory.models import Inventario
+        from productos.models import Producto
+        from users.models import Usuario
+
+        producto_ids = list(Producto.objects.order_by('idproducto').values_list('idproducto', flat=True)[:opciones['productos']])
+        usuario = opciones['usuario'] or Usuario.objects.order_by('idusuario').values_list('idusuario', flat=True).first()
+        if not producto_ids or not usuario:
+            raise CommandError('Se necesitan productos y al menos un usuario en la base de datos')
+
+        config = {
+            'seed': opciones['seed'],
+            'operaciones': opciones['operaciones'],
+            'productos': producto_ids,
+            'usuario': usuario,
+            'proporcion_salidas': opciones['proporcion_salidas'],
+            'cantidad_max': opciones['cantidad_max'],
+            'url': opciones['url'].rstrip('/'),
+        }
+
+        stock_inicial, neto_inicial = self.balance(producto_ids)
+        bloqueos_inicial = espera_bloqueos()
+        n = opciones['trabajadores']
+
+        inicio = time.perf_counter()
+        if opciones['procesos']:
+            connections.close_all()
+            with multiprocessing.Pool(n) as pool:
+                partes = pool.map(trabajador_proceso, [(i, config) for i in range(n)])
+        else:
+            partes = [None] * n
+
+            def ejecutar(i):
+                partes[i] = trabajador(i, config)
+
+            hilos = [threading.Thread(target=ejecutar, args=(i,)) for i in range(n)]
+            for hilo in hilos:
+                hilo.start()
+            for hilo in hilos:
+                hilo.join()
+        duracion = time.perf_counter() - inicio
+
+        bloqueos_final = espera_bloqueos()
+        stock_final, neto_final = self.balance(producto_ids)
+        resultados = [r for parte in partes for r in (parte or [])]
+
+        descuadres = []
+        for producto_id in producto_ids:
+            delta_stock = stock_final.get(producto_id, 0) - stock_inicial.get(producto_id, 0)
+            delta_neto = neto_final.get(producto_id, 0) - neto_inicial.get(producto_id, 0)
+            if delta_stock != delta_neto:
+                descuadres.append({'producto_id': producto_id, 'delta_stock': delta_stock, 'delta_detalles': delta_neto})
+        if Inventario.objects.filter(producto_id__in=producto_ids, cantidad__lt=0).exists():
+            descuadres.append({'error': 'Stock negativo'})
+
+        reporte = self.resumen(resultados, duracion, n, opciones['procesos'])
+        if bloqueos_inicial and bloqueos_final:
+            reporte['espera_bloqueos_ms'] = bloqueos_final[0] - bloqueos_inicial[0]
+            reporte['esperas_bloqueo'] = bloqueos_final[1] - bloqueos_inicial[1]
+        reporte['descuadres'] = descuadres
+
+        if opciones['json']:
+            self.stdout.write(json.dumps(reporte, indent=2))
+        else:
+            self.imprimir(reporte)
+
+        if descuadres:
+            raise CommandError(f'El stock no cuadra con los movimientos en {len(descuadres)} producto(s)')
+
+    def balance(self, producto_ids):
+        """Stock y saldo neto (entradas - salidas) de los detalles por producto"""
+        from inventory.models import DetalleEntradaSalida, Inventario
+
+        stock = dict(Inventario.objects.filter(producto_id__in=producto_ids).values_list('producto_id', 'cantidad'))
+        filas = DetalleEntradaSalida.objects.filter(
+            identradainventario__inventario_id__producto_id__in=producto_ids
+        ).values_list('identradainventario__inventario_id__producto_id').annotate(
+            neto=Sum(Case(
+                When(identradainventario__tipo_movimiento='SALIDA', then=-F('cantidad')),
+                default=F('cantidad'),
+                output_field=IntegerField()
+            ))
+        )
+        return stock, dict(filas)
+
+    def resumen(self, resultados, duracion, trabajadores, procesos):
+        por_ruta = defaultdict(list)
+        estados = Counter()
+        for ruta, estado, segundos in resultados:
+            por_ruta[ruta].append(segundos * 1000)
+            estados[estado] += 1
+        todas = [ms for latencias in por_ruta.values() for ms in latencias]
+
+        def latencias(valores):
+            return {
+                'p50_ms': round(percentil(valores, 50), 2),
+                'p95_ms': round(percentil(valores, 95), 2),
+                'p99_ms': round(percentil(valores, 99), 2),
+                'max_ms': round(max(valores), 2) if valores else 0,
+            }
+
+        return {
+            'backend': connection.vendor,
+            'modo': 'procesos' if procesos else 'hilos',
+            'trabajadores': trabajadores,
+            'operaciones': len(resultados),
+            'duracion_s': round(duracion, 3),
+            'operaciones_por_segundo': round(len(resultados) / duracion, 2) if duracion else 0,
+            'estados': {str(estado): total for estado, total in sorted(estados.items())},
+            'latencia': latencias(todas),
+            'por_ruta': {ruta: dict(latencias(valores), operaciones=len(valores)) for ruta, valores in por_ruta.items()},
+        }
+
+    def imprimir(self, reporte):
+        self.stdout.write(
+            f"{reporte['operaciones']} operaciones en {reporte['duracion_s']} s con "
+            f"{reporte['trabajadores']} {reporte['modo']} ({reporte['backend']}): "
+            f"{reporte['operaciones_por_segundo']} op/s"
+        )
+        lat = reporte['latencia']
+        self.stdout.write(f"Latencia p50 {lat['p50_ms']} ms, p95 {lat['p95_ms']} ms, p99 {lat['p99_ms']} ms, max {lat['max_ms']} ms")
+        for ruta, datos in reporte['por_ruta'].items():
+            self.stdout.write(f"  {ruta}: {datos['operaciones']} op, p50 {datos['p50_ms']} ms, p99 {datos['p99_ms']} ms")
+        self.stdout.write(f"Estados HTTP: {reporte['estados']}")
+        if 'espera_bloqueos_ms' in reporte:
+            self.stdout.write(f"Espera por bloqueos: {reporte['espera_bloqueos_ms']} ms en {reporte['esperas_bloqueo']} esperas")
+        else:
+            self.stdout.write('Espera por bloqueos: solo disponible en MySQL')
+        if reporte['descuadres']:
+            for descuadre in reporte['descuadres']:
+                self.stdout.write(self.style.ERROR(f'Descuadre: {descuadre}'))
+        else:
+            self.stdout.write(self.style.SUCCESS('Stock cuadra con los movimientos en todos los productos'))
@@ -0,0 +1,18 @@
+# Generated by Django 5.2 on 2026-10-18 08:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0001_initial'),
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='movimientoinventario',
+            index=models.Index(fields=['fecha', 'idmovimientoinventario'], name='mov_fecha_id_idx'),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2 on 2026-10-18 09:02
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def fusionar_duplicados(apps, schema_editor):
+    """Fusionar inventarios duplicados de un mismo producto antes de crear la restricción"""
+    Inventario = apps.get_model('inventory', 'Inventario')
+    MovimientoInventario = apps.get_model('inventory', 'MovimientoInventario')
+
+    duplicados = Inventario.objects.values('producto_id').annotate(total=Count('id')).filter(total__gt=1)
+    for fila in duplicados:
+        inventarios = Inventario.objects.filter(producto_id=fila['producto_id']).order_by('id')
+        conservado = inventarios.first()
+        sobrantes = inventarios.exclude(id=conservado.id)
+        conservado.cantidad = inventarios.aggregate(total=Sum('cantidad'))['total'] or 0
+        conservado.save(update_fields=['cantidad'])
+        MovimientoInventario.objects.filter(inventario_id__in=sobrantes).update(inventario_id=conservado)
+        sobrantes.delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0002_movimiento_fecha_index'),
+        ('productos', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(fusionar_duplicados, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='inventario',
+            constraint=models.UniqueConstraint(fields=('producto',), name='inventario_producto_unico'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2 on 2026-10-18 09:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0003_inventario_producto_unico'),
+        ('productos', '0002_producto_lote_idx'),
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='inventario',
+            index=models.Index(fields=['cantidad'], name='inv_cantidad_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='movimientoinventario',
+            index=models.Index(fields=['inventario_id', 'fecha', 'idmovimientoinventario'], name='mov_inv_fecha_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='movimientoinventario',
+            index=models.Index(fields=['idusuario', 'fecha', 'idmovimientoinventario'], name='mov_usuario_fecha_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='productosvencimiento',
+            index=models.Index(fields=['notificado', 'fecha_vencimiento'], name='venc_notif_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='productosvencimiento',
+            index=models.Index(fields=['fecha_vencimiento'], name='venc_fecha_idx'),
+        ),
+    ]
@@ -0,0 +1,69 @@
+# Generated by Django 5.2 on 2026-10-18 09:22
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import Mod
+
+
+def poblar_contadores(apps, schema_editor):
+    """Calcular los contadores del dashboard a partir de los datos existentes
+
+    Mismos nombres y ranuras que inventory.contadores en esta versión; la tabla
+    recién creada está vacía, así que basta con insertar los valores reales.
+    """
+    Producto = apps.get_model('productos', 'Producto')
+    Inventario = apps.get_model('inventory', 'Inventario')
+    ProductosVencimiento = apps.get_model('inventory', 'ProductosVencimiento')
+    ContadorDashboard = apps.get_model('inventory', 'ContadorDashboard')
+    n = getattr(settings, 'DASHBOARD_RANURAS', 16)
+    umbral = getattr(settings, 'DASHBOARD_UMBRAL_CRITICO', 10)
+
+    valores = {}
+    for r in range(n):
+        for nombre in ('total_productos', 'valor_inventario', 'productos_criticos'):
+            valores[(nombre, r)] = 0
+    for r, total in Producto.objects.values_list(Mod('idproducto', n)).annotate(total=Count('pk')).order_by():
+        valores[('total_productos', int(r))] = total
+    for r, valor, criticos in Inventario.objects.values_list(Mod('producto_id', n)).annotate(
+        valor=Sum('cantidad'),
+        criticos=Count('pk', filter=Q(cantidad__lte=umbral))
+    ).order_by():
+        valores[('valor_inventario', int(r))] = valor or 0
+        valores[('productos_criticos', int(r))] = criticos
+    for fecha, total in ProductosVencimiento.objects.values_list('fecha_vencimiento').annotate(
+        total=Count('pk')
+    ).order_by():
+        valores[(f'vence:{fecha.isoformat()}', 0)] = total
+
+    ContadorDashboard.objects.bulk_create([
+        ContadorDashboard(nombre=nombre, ranura=r, valor=valor)
+        for (nombre, r), valor in sorted(valores.items())
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0004_indices_compuestos'),
+        ('productos', '0003_busqueda_productos'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ContadorDashboard',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('nombre', models.CharField(max_length=32)),
+                ('ranura', models.PositiveSmallIntegerField(default=0)),
+                ('valor', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Contador del Dashboard',
+                'verbose_name_plural': 'Contadores del Dashboard',
+                'db_table': 'contador_dashboard',
+                'constraints': [models.UniqueConstraint(fields=('nombre', 'ranura'), name='contador_nombre_ranura_unico')],
+            },
+        ),
+        migrations.RunPython(poblar_contadores, migrations.RunPython.noop),
+    ]
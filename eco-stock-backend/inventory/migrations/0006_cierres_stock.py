@@ -0,0 +1,30 @@
+# Generated by Django 5.2 on 2026-10-18 09:41
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0005_contadores_dashboard'),
+        ('productos', '0004_versiones_catalogo'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CierreStock',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('fecha', models.DateField()),
+                ('cantidad', models.IntegerField()),
+                ('producto', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='productos.producto')),
+            ],
+            options={
+                'verbose_name': 'Cierre de Stock',
+                'verbose_name_plural': 'Cierres de Stock',
+                'db_table': 'cierre_stock',
+                'constraints': [models.UniqueConstraint(fields=('fecha', 'producto'), name='cierre_fecha_producto_unico')],
+            },
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2 on 2026-10-18 09:46
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    """Columnas nulas, sin llave foránea ni índice: en MySQL 8 se agregan sin copiar la tabla"""
+
+    dependencies = [
+        ('inventory', '0006_cierres_stock'),
+        ('productos', '0004_versiones_catalogo'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='movimientoinventario',
+            name='cantidad',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='movimientoinventario',
+            name='producto',
+            field=models.ForeignKey(blank=True, db_constraint=False, db_index=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='productos.producto'),
+        ),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 5.2 on 2026-10-18 09:46
+
+from django.db import migrations, models, transaction
+from django.db.models import Max, Min, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+TAMANO_RANGO = 5000
+
+
+def rellenar_movimientos(apps, schema_editor):
+    """Copiar cantidad y producto en los movimientos existentes, un rango de llaves por transacción"""
+    MovimientoInventario = apps.get_model('inventory', 'MovimientoInventario')
+    Inventario = apps.get_model('inventory', 'Inventario')
+    DetalleEntradaSalida = apps.get_model('inventory', 'DetalleEntradaSalida')
+    producto = Subquery(Inventario.objects.filter(pk=OuterRef('inventario_id')).values('producto_id')[:1])
+    total = DetalleEntradaSalida.objects.filter(
+        identradainventario=OuterRef('pk')
+    ).order_by().values('identradainventario').annotate(total=Sum('cantidad')).values('total')[:1]
+
+    limites = MovimientoInventario.objects.aggregate(primero=Min('pk'), ultimo=Max('pk'))
+    if limites['primero'] is None:
+        return
+    for inicio in range(limites['primero'], limites['ultimo'] + 1, TAMANO_RANGO):
+        with transaction.atomic():
+            MovimientoInventario.objects.filter(pk__gte=inicio, pk__lt=inicio + TAMANO_RANGO).update(
+                producto_id=producto,
+                cantidad=Coalesce(Subquery(total), 0)
+            )
+
+
+class Migration(migrations.Migration):
+    # Sin transacción envolvente: cada rango confirma por separado y no se
+    # mantienen bloqueadas las filas ya rellenadas
+    atomic = False
+
+    dependencies = [
+        ('inventory', '0007_movimiento_cantidad_producto'),
+    ]
+
+    operations = [
+        migrations.RunPython(rellenar_movimientos, migrations.RunPython.noop),
+        # Los índices después del relleno: se construyen una vez sobre los datos completos
+        migrations.AddIndex(
+            model_name='movimientoinventario',
+            index=models.Index(fields=['producto', 'fecha', 'idmovimientoinventario'], name='mov_producto_fecha_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='movimientoinventario',
+            index=models.Index(fields=['fecha', 'tipo_movimiento', 'producto', 'cantidad'], name='mov_fecha_tipo_prod_cant_idx'),
+        ),
+    ]
@@ -21,6 +21,21 @@ class Inventario(models.Model):
         db_table = 'inventario'
         verbose_name = 'Inventario'
         verbose_name_plural = 'Inventarios'
+        constraints = [
+            # Un solo registro de inventario por producto
+            models.UniqueConstraint(fields=['producto'], name='inventario_producto_unico'),
+        ]
+        indexes = [
+            # bajo_stock / sin_stock y conteo de productos críticos del dashboard
+            models.Index(fields=['cantidad'], name='inv_cantidad_idx'),
+        ]
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instancia = super().from_db(db, field_names, values)
+        # Cantidad tal como está en la base, para los contadores del dashboard
+        instancia._cantidad_guardada = instancia.__dict__.get('cantidad')
+        return instancia
     
     def __str__(self):
         return f"{self.producto.nombre} - Stock: {self.cantidad}"
@@ -31,11 +46,52 @@ class MovimientoInventario(models.Model):
     tipo_movimiento = models.CharField(max_length=255, null=False)
     idusuario = models.ForeignKey(Usuario, on_delete=models.CASCADE)
     inventario_id = models.ForeignKey(Inventario, on_delete=models.CASCADE)
+    # Copias del detalle y del inventario para que reportes y series lean una
+    # sola tabla; las mantienen los servicios y las señales (ver relleno.py)
+    cantidad = models.IntegerField(null=True, blank=True)
+    producto = models.ForeignKey(
+        Producto,
+        on_delete=models.DO_NOTHING,
+        null=True,
+        blank=True,
+        db_constraint=False,
+        db_index=False,
+        related_name='+'
+    )
     
     class Meta:
         db_table = 'movimiento_inventario'
         verbose_name = 'Movimiento de Inventario'
         verbose_name_plural = 'Movimientos de Inventario'
+        indexes = [
+            # Paginación por cursor sobre (fecha, idmovimientoinventario)
+            models.Index(fields=['fecha', 'idmovimientoinventario'], name='mov_fecha_id_idx'),
+            # Movimientos de un producto ordenados por fecha sin ordenar en memoria
+            models.Index(fields=['inventario_id', 'fecha', 'idmovimientoinventario'], name='mov_inv_fecha_id_idx'),
+            models.Index(fields=['idusuario', 'fecha', 'idmovimientoinventario'], name='mov_usuario_fecha_id_idx'),
+            # Stock a una fecha de algunos productos
+            models.Index(fields=['producto', 'fecha', 'idmovimientoinventario'], name='mov_producto_fecha_id_idx'),
+            # Cubre series y cierres por rango de fechas: no se lee la fila
+            models.Index(fields=['fecha', 'tipo_movimiento', 'producto', 'cantidad'], name='mov_fecha_tipo_prod_cant_idx'),
+        ]
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instancia = super().from_db(db, field_names, values)
+        # Inventario tal como está en la base, para recalcular el producto si cambia
+        instancia._inventario_guardado = instancia.__dict__.get('inventario_id_id')
+        # Neto tal como está en la base, para corregir los cierres de stock si cambia
+        instancia._neto_guardado = instancia.neto()
+        return instancia
+    
+    def neto(self):
+        """(producto_id, fecha, entradas - salidas) del movimiento; None si hay campos diferidos"""
+        valores = self.__dict__
+        if not {'producto_id', 'fecha', 'tipo_movimiento', 'cantidad'} <= valores.keys():
+            return None
+        cantidad = valores['cantidad'] or 0
+        fecha = self._meta.get_field('fecha').to_python(valores['fecha'])
+        return valores['producto_id'], fecha, -cantidad if valores['tipo_movimiento'] == 'SALIDA' else cantidad
     
     def __str__(self):
         return f"{self.tipo_movimiento} - {self.fecha}"
@@ -50,6 +106,13 @@ class DetalleEntradaSalida(models.Model):
         verbose_name = 'Detalle Entrada/Salida'
         verbose_name_plural = 'Detalles Entrada/Salida'
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instancia = super().from_db(db, field_names, values)
+        # Movimiento tal como está en la base, para recalcular también el anterior si cambia
+        instancia._movimiento_guardado = instancia.__dict__.get('identradainventario_id')
+        return instancia
+    
     def __str__(self):
         return f"Detalle {self.iddetalleentrada} - Cantidad: {self.cantidad}"
 
@@ -67,6 +130,66 @@ class ProductosVencimiento(models.Model):
         verbose_name = 'Producto Vencimiento'
         verbose_name_plural = 'Productos Vencimiento'
         unique_together = [['producto_id', 'fecha_vencimiento']]
+        indexes = [
+            # no_notificados y el escaneo de vencimientos pendientes por fecha
+            models.Index(fields=['notificado', 'fecha_vencimiento'], name='venc_notif_fecha_idx'),
+            # por_vencer / vencidos filtran solo por rango de fecha
+            models.Index(fields=['fecha_vencimiento'], name='venc_fecha_idx'),
+        ]
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instancia = super().from_db(db, field_names, values)
+        # Fecha tal como está en la base, para los contadores del dashboard
+        instancia._fecha_guardada = instancia.__dict__.get('fecha_vencimiento')
+        return instancia
     
     def __str__(self):
         return f"{self.producto_id.nombre} - Vence: {self.fecha_vencimiento}"
+
+
+class ContadorDashboard(models.Model):
+    """Contadores del dashboard mantenidos en las mismas transacciones que las escrituras
+
+    Cada contador se reparte en varias ranuras (producto_id % ranuras) para que
+    las escrituras concurrentes de productos distintos no compitan por la misma
+    fila. Los vencimientos se cuentan por día con el nombre 'vence:AAAA-MM-DD'.
+    """
+    id = models.BigAutoField(primary_key=True)
+    nombre = models.CharField(max_length=32)
+    ranura = models.PositiveSmallIntegerField(default=0)
+    valor = models.BigIntegerField(default=0)
+    
+    class Meta:
+        db_table = 'contador_dashboard'
+        verbose_name = 'Contador del Dashboard'
+        verbose_name_plural = 'Contadores del Dashboard'
+        constraints = [
+            models.UniqueConstraint(fields=['nombre', 'ranura'], name='contador_nombre_ranura_unico'),
+        ]
+    
+    def __str__(self):
+        return f"{self.nombre}[{self.ranura}] = {self.valor}"
+
+
+class CierreStock(models.Model):
+    """Stock de cada producto al final de un día de cierre (inventory.cierres)
+
+    Solo se guardan los productos con stock distinto de cero: un producto sin
+    fila en un cierre tenía stock 0 ese día.
+    """
+    id = models.BigAutoField(primary_key=True)
+    fecha = models.DateField()
+    producto = models.ForeignKey(Producto, on_delete=models.CASCADE)
+    cantidad = models.IntegerField()
+    
+    class Meta:
+        db_table = 'cierre_stock'
+        verbose_name = 'Cierre de Stock'
+        verbose_name_plural = 'Cierres de Stock'
+        constraints = [
+            models.UniqueConstraint(fields=['fecha', 'producto'], name='cierre_fecha_producto_unico'),
+        ]
+    
+    def __str__(self):
+        return f"{self.producto_id} @ {self.fecha}: {self.cantidad}"
@@ -0,0 +1,133 @@
+"""Avisos de vencimiento por correo, en lotes
+
+Los vencimientos pendientes (notificado=False) se recorren por bloques en orden
+(fecha_vencimiento, producto_id) sobre el índice venc_notif_fecha_idx. Cada
+bloque se marca con un único UPDATE y se envía como un solo correo resumen
+después de confirmar, para no retener los bloqueos durante el envío SMTP. Si
+el envío falla se desmarca el bloque y queda pendiente; si el proceso se cae,
+volver a ejecutarlo continúa con lo que no se marcó.
+"""
+import time
+from dataclasses import dataclass, field
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import ProductosVencimiento
+
+
+@dataclass
+class ResultadoNotificacion:
+    filas: int = 0
+    bloques: int = 0
+    correos: int = 0
+    segundos: float = 0.0
+    simulado: bool = False
+    resumenes: list = field(default_factory=list)
+
+    @property
+    def filas_por_segundo(self):
+        return self.filas / self.segundos if self.segundos else 0.0
+
+
+def destinatarios_por_defecto():
+    """Correos configurados o, si no hay, los de los usuarios administradores"""
+    from users.models import Usuario
+
+    configurados = list(getattr(settings, 'VENCIMIENTOS_DESTINATARIOS', []))
+    if configurados:
+        return configurados
+    return list(Usuario.objects.filter(
+        idrol__nombre__iexact='Administrador'
+    ).exclude(correo_electronico__isnull=True).exclude(correo_electronico='').values_list('correo_electronico', flat=True))
+
+
+def redactar(filas, hoy):
+    """Asunto y cuerpo del resumen, agrupado por urgencia"""
+    grupos = {'Vencidos': [], 'Vencen en 7 días o menos': [], 'Vencen más adelante': []}
+    for producto_id, nombre, fecha in filas:
+        if fecha < hoy:
+            grupo = 'Vencidos'
+        elif fecha <= hoy + timedelta(days=7):
+            grupo = 'Vencen en 7 días o menos'
+        else:
+            grupo = 'Vencen más adelante'
+        grupos[grupo].append(f'  - {nombre} (ID {producto_id}): {fecha.isoformat()}')
+
+    lineas = []
+    for titulo, productos in grupos.items():
+        if productos:
+            lineas.append(f'{titulo} ({len(productos)}):')
+            lineas.extend(productos)
+            lineas.append('')
+    asunto = f'EcoStock: {len(filas)} producto(s) por vencer o vencidos'
+    return asunto, '\n'.join(lineas)
+
+
+def procesar_vencimientos(dias=30, tamano_bloque=500, destinatarios=None, simular=False, al_procesar_bloque=None):
+    """Notificar los vencimientos pendientes hasta hoy + dias
+
+    Devuelve un ResultadoNotificacion. al_procesar_bloque(resultado) se llama
+    después de cada bloque, para informar el avance.
+    """
+    hoy = timezone.localdate()
+    limite = hoy + timedelta(days=dias)
+    destinatarios = destinatarios or destinatarios_por_defecto()
+    if not destinatarios and not simular:
+        raise ValueError('No hay destinatarios para los avisos de vencimiento')
+
+    resultado = ResultadoNotificacion(simulado=simular)
+    pendientes = ProductosVencimiento.objects.filter(
+        notificado=False, fecha_vencimiento__lte=limite
+    ).order_by('fecha_vencimiento', 'producto_id')
+    ultimo = None
+    conexion = None if simular else get_connection()
+    inicio = time.perf_counter()
+    try:
+        while True:
+            bloque = pendientes
+            if ultimo is not None:
+                # Posición (fecha, producto) del último procesado: en modo simulación
+                # las filas no se marcan y el filtro notificado=False no avanza solo
+                bloque = bloque.filter(
+                    Q(fecha_vencimiento__gt=ultimo[0]) |
+                    Q(fecha_vencimiento=ultimo[0], producto_id__gt=ultimo[1])
+                )
+            with transaction.atomic():
+                if not simular:
+                    # Bloquear solo los vencimientos, no los productos del JOIN
+                    bloque = bloque.select_for_update(of=('self',) if connection.features.has_select_for_update_of else ())
+                filas = list(bloque.values_list('producto_id', 'producto_id__nombre', 'fecha_vencimiento')[:tamano_bloque])
+                if not filas:
+                    break
+                asunto, cuerpo = redactar(filas, hoy)
+                producto_ids = [producto_id for producto_id, _, _ in filas]
+                if simular:
+                    resultado.resumenes.append(asunto)
+                else:
+                    ProductosVencimiento.objects.filter(
+                        producto_id__in=producto_ids, notificado=False
+                    ).update(notificado=True)
+            if not simular:
+                try:
+                    EmailMessage(asunto, cuerpo, to=destinatarios, connection=conexion).send()
+                except Exception:
+                    # El bloque vuelve a quedar pendiente para la próxima ejecución
+                    ProductosVencimiento.objects.filter(producto_id__in=producto_ids).update(notificado=False)
+                    raise
+                resultado.correos += 1
+            ultimo = (filas[-1][2], filas[-1][0])
+            resultado.filas += len(filas)
+            resultado.bloques += 1
+            resultado.segundos = time.perf_counter() - inicio
+            if al_procesar_bloque:
+                al_procesar_bloque(resultado)
+    finally:
+        if conexion is not None:
+            conexion.close()
+    resultado.segundos = time.perf_counter() - inicio
+    return resultado
@@ -0,0 +1,105 @@
+import base64
+from datetime import date
+
+from django.conf import settings
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class MovimientoCursorPagination(BasePagination):
+    """Paginación por cursor (keyset) sobre (fecha, idmovimientoinventario)
+
+    Cada página filtra con la posición del último elemento en lugar de usar
+    OFFSET, por lo que la página N cuesta lo mismo que la primera. Como
+    `fecha` es un DateField, el desempate se hace por la llave primaria.
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    ordering = ('-fecha', '-idmovimientoinventario')
+    invalid_cursor_message = 'Cursor inválido'
+
+    def get_page_size(self, request):
+        page_size = getattr(settings, 'MOVIMIENTOS_PAGE_SIZE', 50)
+        max_page_size = getattr(settings, 'MOVIMIENTOS_MAX_PAGE_SIZE', 500)
+        try:
+            solicitado = int(request.query_params[self.page_size_query_param])
+            if solicitado > 0:
+                page_size = min(solicitado, max_page_size)
+        except (KeyError, ValueError):
+            pass
+        return page_size
+
+    def encode_cursor(self, fecha, pk):
+        posicion = f"{fecha.isoformat()}|{pk}".encode('ascii')
+        return base64.urlsafe_b64encode(posicion).decode('ascii').rstrip('=')
+
+    def decode_cursor(self, request):
+        cursor = request.query_params.get(self.cursor_query_param)
+        if not cursor:
+            return None
+        try:
+            relleno = '=' * (-len(cursor) % 4)
+            posicion = base64.urlsafe_b64decode(cursor + relleno).decode('ascii')
+            fecha, pk = posicion.split('|')
+            fecha, pk = date.fromisoformat(fecha), int(pk)
+            # Fuera del rango de BigAutoField no puede venir de encode_cursor()
+            if not 0 < pk < 2 ** 63:
+                raise ValueError(pk)
+            return fecha, pk
+        except (TypeError, ValueError, UnicodeDecodeError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.next_position = None
+
+        queryset = queryset.order_by(*self.ordering)
+        posicion = self.decode_cursor(request)
+        if posicion is not None:
+            fecha, pk = posicion
+            # El filtro redundante fecha <= x permite un rango sobre el índice
+            queryset = queryset.filter(
+                Q(fecha__lt=fecha) | Q(fecha=fecha, idmovimientoinventario__lt=pk),
+                fecha__lte=fecha
+            )
+
+        results = list(queryset[:self.page_size + 1])
+        if len(results) > self.page_size:
+            results = results[:self.page_size]
+            ultimo = results[-1]
+            self.next_position = (ultimo.fecha, ultimo.pk)
+        return results
+
+    def get_next_link(self):
+        if self.next_position is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(*self.next_position))
+
+    def get_first_link(self):
+        url = self.request.build_absolute_uri()
+        return remove_query_param(url, self.cursor_query_param)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'first': self.get_first_link(),
+            'page_size': self.page_size,
+            'results': data
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'first': {'type': 'string', 'format': 'uri'},
+                'page_size': {'type': 'integer'},
+                'results': schema,
+            },
+        }
@@ -0,0 +1,66 @@
+"""Cantidad y producto copiados en MovimientoInventario
+
+MovimientoInventario.cantidad es la suma de los detalles del movimiento y
+MovimientoInventario.producto el producto de su inventario. Con esas copias
+las series, los cierres y el reporte de movimientos recorren una sola tabla
+(y un índice que los cubre) en lugar de unir detalle, inventario y producto.
+
+Los servicios de stock las escriben junto con el movimiento; el CRUD de
+movimientos y detalles las mantiene con señales. Las filas anteriores (o las
+cargadas sin pasar por el ORM) se completan con rellenar(), por rangos de
+llave primaria y una transacción corta por rango: en MySQL cada UPDATE solo
+bloquea las filas de su rango y la tabla sigue aceptando escrituras.
+"""
+from django.db import transaction
+from django.db.models import Max, Min, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+from .models import DetalleEntradaSalida, Inventario, MovimientoInventario
+
+TAMANO_RANGO = 5000
+
+
+def producto_del_inventario():
+    """Subconsulta con el producto del inventario del movimiento"""
+    return Subquery(Inventario.objects.filter(pk=OuterRef('inventario_id')).values('producto_id')[:1])
+
+
+def cantidad_de_detalles():
+    """Subconsulta con la suma de los detalles del movimiento (0 si no tiene)"""
+    total = DetalleEntradaSalida.objects.filter(
+        identradainventario=OuterRef('pk')
+    ).order_by().values('identradainventario').annotate(total=Sum('cantidad')).values('total')[:1]
+    return Coalesce(Subquery(total), 0)
+
+
+def rellenar(todos=False, tamano=TAMANO_RANGO, al_avanzar=None):
+    """Completar cantidad y producto de los movimientos; devuelve las filas actualizadas
+
+    Sin todos=True solo se tocan los movimientos a los que les falta alguno de
+    los dos valores, así que se puede repetir sin costo (por ejemplo después de
+    desplegar, para las filas que escribió la versión anterior). al_avanzar
+    recibe (hasta, actualizadas) después de cada rango.
+    """
+    movimientos = MovimientoInventario.objects.all()
+    if not todos:
+        movimientos = movimientos.filter(Q(producto__isnull=True) | Q(cantidad__isnull=True))
+
+    limites = movimientos.aggregate(primero=Min('pk'), ultimo=Max('pk'))
+    if limites['primero'] is None:
+        return 0
+
+    actualizadas = 0
+    for inicio in range(limites['primero'], limites['ultimo'] + 1, tamano):
+        with transaction.atomic():
+            actualizadas += movimientos.filter(pk__gte=inicio, pk__lt=inicio + tamano).update(
+                producto_id=producto_del_inventario(),
+                cantidad=cantidad_de_detalles()
+            )
+        if al_avanzar is not None:
+            al_avanzar(min(inicio + tamano - 1, limites['ultimo']), actualizadas)
+    return actualizadas
+
+
+def actualizar_cantidad(movimiento_id):
+    """Recalcular la cantidad de un movimiento después de cambiar sus detalles"""
+    MovimientoInventario.objects.filter(pk=movimiento_id).update(cantidad=cantidad_de_detalles())
@@ -0,0 +1,41 @@
+import csv
+import io
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from rest_framework.renderers import BaseRenderer
+
+
+def filas_de(data):
+    """Extraer las filas tabulares de la respuesta de un reporte"""
+    if isinstance(data, dict):
+        data = data.get('data', [data])
+    return data or []
+
+
+class CSVRenderer(BaseRenderer):
+    """Renderizar reportes como CSV (las exportaciones grandes usan streaming)"""
+    media_type = 'text/csv'
+    format = 'csv'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        filas = filas_de(data)
+        if not filas:
+            return b''
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=list(filas[0].keys()))
+        writer.writeheader()
+        writer.writerows(filas)
+        return buffer.getvalue().encode(self.charset)
+
+
+class NDJSONRenderer(BaseRenderer):
+    """Renderizar reportes como JSON delimitado por saltos de línea"""
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        lineas = (json.dumps(fila, cls=DjangoJSONEncoder, ensure_ascii=False) + '\n' for fila in filas_de(data))
+        return ''.join(lineas).encode(self.charset)
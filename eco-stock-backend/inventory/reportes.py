@@ -0,0 +1,67 @@
+"""Consultas de los reportes de inventario
+
+Las comparten las vistas de reportes (síncrona y asíncrona), la cola de
+reportes en segundo plano (reports.trabajos) y benchmark_json.
+"""
+from datetime import datetime
+
+from .models import Inventario, MovimientoInventario, ProductosVencimiento
+
+
+def preparar_reporte(tipo_reporte, params):
+    """(reporte, columnas, filas) del reporte pedido; filas es un values_list() sin evaluar
+
+    Lanza ValueError con el mensaje de error si el tipo o los parámetros no son válidos.
+    """
+    if tipo_reporte == 'stock-actual':
+        reporte = {'reporte': 'Stock Actual'}
+        columnas = ['producto_id', 'producto_nombre', 'stock_actual', 'fecha_actualizacion']
+        filas = Inventario.objects.values_list(
+            'producto_id', 'producto__nombre', 'cantidad', 'fecha_actualizacion'
+        )
+
+    elif tipo_reporte == 'movimientos-periodo':
+        fecha_inicio = params.get('fecha_inicio')
+        fecha_fin = params.get('fecha_fin')
+
+        if not fecha_inicio or not fecha_fin:
+            raise ValueError('Fechas de inicio y fin requeridas')
+
+        try:
+            fecha_inicio = datetime.strptime(fecha_inicio, '%Y-%m-%d').date()
+            fecha_fin = datetime.strptime(fecha_fin, '%Y-%m-%d').date()
+        except ValueError:
+            raise ValueError('Formato de fecha inválido')
+
+        reporte = {
+            'reporte': 'Movimientos por Período',
+            'fecha_inicio': fecha_inicio,
+            'fecha_fin': fecha_fin,
+        }
+        columnas = ['fecha', 'tipo_movimiento', 'producto', 'cantidad', 'usuario']
+        # Ordenado por (fecha, pk): la exportación recorre el índice mov_fecha_id_idx
+        filas = MovimientoInventario.objects.filter(
+            fecha__range=[fecha_inicio, fecha_fin]
+        ).order_by('fecha', 'pk').values_list(
+            'fecha', 'tipo_movimiento', 'producto__nombre', 'cantidad', 'idusuario__nombre'
+        )
+
+    elif tipo_reporte == 'productos-vencimiento':
+        reporte = {'reporte': 'Productos Vencimiento'}
+        columnas = ['producto_nombre', 'fecha_vencimiento', 'notificado']
+        filas = ProductosVencimiento.objects.values_list(
+            'producto_id__nombre', 'fecha_vencimiento', 'notificado'
+        )
+
+    elif tipo_reporte == 'proveedores-activos':
+        from suppliers.models import Proveedor
+        reporte = {'reporte': 'Proveedores Activos'}
+        columnas = ['id', 'nombre', 'tipo', 'correo', 'telefono']
+        filas = Proveedor.objects.filter(estado=True).values_list(
+            'idproveedor', 'nombre', 'tipo', 'correo', 'telefono'
+        )
+
+    else:
+        raise ValueError('Tipo de reporte no válido')
+
+    return reporte, columnas, filas
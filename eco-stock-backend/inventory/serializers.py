@@ -15,6 +15,8 @@ class MovimientoInventarioSerializer(serializers.ModelSerializer):
     class Meta:
         model = MovimientoInventario
         fields = '__all__'
+        # Copias del detalle y del inventario, mantenidas por las señales
+        read_only_fields = ['cantidad', 'producto']
 
 class DetalleEntradaSalidaSerializer(serializers.ModelSerializer):
     movimiento_tipo = serializers.CharField(source='identradainventario.tipo_movimiento', read_only=True)
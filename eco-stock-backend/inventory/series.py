@@ -0,0 +1,103 @@
+"""Totales de ENTRADA y SALIDA por período, agregados en la base de datos
+
+Los movimientos se agrupan por fecha truncada (día, semana o mes) y por tipo,
+producto o categoría con un solo GROUP BY sobre movimiento_inventario, que
+ya tiene la cantidad y el producto (solo la categoría une producto); al
+cliente solo llegan las filas agregadas. Con rellenar=True se agregan en Python los períodos sin
+movimientos (total 0) de cada serie que aparece en el resultado.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncMonth, TruncWeek
+
+from .models import MovimientoInventario
+from .services import TIPOS_MOVIMIENTO
+
+PERIODOS = ('dia', 'semana', 'mes')
+# Agrupación pedida -> (nombre en la respuesta, ruta desde el movimiento)
+AGRUPACIONES = {
+    'tipo': ('tipo_movimiento', 'tipo_movimiento'),
+    'producto': ('producto_id', 'producto_id'),
+    'categoria': ('categoria_id', 'producto__idcategoria_id'),
+}
+
+
+def truncar(periodo):
+    fecha = F('fecha')
+    if periodo == 'mes':
+        return TruncMonth(fecha)
+    if periodo == 'semana':
+        return TruncWeek(fecha)
+    # fecha ya es un DateField: el día no necesita truncarse
+    return fecha
+
+
+def inicio_de_periodo(fecha, periodo):
+    if periodo == 'mes':
+        return fecha.replace(day=1)
+    if periodo == 'semana':
+        # Igual que TruncWeek: las semanas empiezan el lunes
+        return fecha - timedelta(days=fecha.weekday())
+    return fecha
+
+
+def periodos_entre(desde, hasta, periodo):
+    """Inicio de cada período entre desde y hasta"""
+    fecha = inicio_de_periodo(desde, periodo)
+    while fecha <= hasta:
+        yield fecha
+        if periodo == 'mes':
+            fecha = (fecha + timedelta(days=32)).replace(day=1)
+        elif periodo == 'semana':
+            fecha += timedelta(days=7)
+        else:
+            fecha += timedelta(days=1)
+
+
+def serie(desde, hasta, periodo='mes', agrupar=('tipo',), producto_id=None, categoria_id=None, rellenar=False):
+    """Filas {'periodo', <agrupaciones>, 'total', 'movimientos'} ordenadas por período y serie
+
+    Lanza ValueError si el relleno con ceros superaría SERIES_MAX_PUNTOS filas.
+    """
+    nombres = [AGRUPACIONES[clave][0] for clave in agrupar]
+    rutas = [AGRUPACIONES[clave][1] for clave in agrupar]
+
+    movimientos = MovimientoInventario.objects.filter(fecha__range=(desde, hasta))
+    if producto_id is not None:
+        movimientos = movimientos.filter(producto_id=producto_id)
+    if categoria_id is not None:
+        movimientos = movimientos.filter(producto__idcategoria_id=categoria_id)
+
+    filas = movimientos.annotate(periodo_=truncar(periodo)).values_list('periodo_', *rutas).annotate(
+        total=Sum('cantidad'), movimientos=Count('pk')
+    ).order_by('periodo_', *rutas)
+    columnas = ['periodo', *nombres, 'total', 'movimientos']
+    resultado = [dict(zip(columnas, fila)) for fila in filas]
+    if not rellenar:
+        return resultado
+
+    existentes = {tuple(fila[columna] for columna in columnas[:-2]): fila for fila in resultado}
+    series = sorted({clave[1:] for clave in existentes})
+    if 'tipo' in agrupar:
+        # Las dos series de tipo aunque una no tenga movimientos en el rango
+        posicion = list(agrupar).index('tipo')
+        otros = sorted({grupo[:posicion] + grupo[posicion + 1:] for grupo in series}) or ([()] if len(agrupar) == 1 else [])
+        series = [otro[:posicion] + (tipo,) + otro[posicion:] for otro in otros for tipo in TIPOS_MOVIMIENTO]
+    elif not agrupar:
+        series = [()]
+
+    inicios = list(periodos_entre(desde, hasta, periodo))
+    maximo = getattr(settings, 'SERIES_MAX_PUNTOS', 100000)
+    if len(inicios) * len(series) > maximo:
+        raise ValueError(f'Demasiados puntos para rellenar (máximo {maximo}); filtre por producto o categoría')
+
+    completo = []
+    for inicio in inicios:
+        for grupo in series:
+            fila = existentes.get((inicio, *grupo))
+            if fila is None:
+                fila = dict(zip(columnas, (inicio, *grupo, 0, 0)))
+            completo.append(fila)
+    return completo
@@ -0,0 +1,388 @@
+import threading
+import time
+
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from productos.models import Producto
+from . import cache_stock, contadores
+from .models import Inventario, MovimientoInventario, DetalleEntradaSalida
+
+TIPOS_MOVIMIENTO = ('ENTRADA', 'SALIDA')
+
+
+class StockError(Exception):
+    """Error base de las operaciones de stock"""
+
+
+class InventarioNoEncontrado(StockError):
+    pass
+
+
+class ProductoNoEncontrado(StockError):
+    pass
+
+
+class StockInsuficiente(StockError):
+    pass
+
+
+class ConflictoStock(StockError):
+    """La cantidad cambió desde que el cliente la leyó"""
+
+
+class EstadisticasStock:
+    """Contadores en memoria (por proceso) de las escrituras de stock
+
+    Permiten medir el rendimiento del camino de escritura bajo contención:
+    operaciones por segundo, rechazos por stock insuficiente y colisiones
+    (inserciones concurrentes del mismo inventario o conflictos de versión).
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reiniciar()
+
+    def reiniciar(self):
+        with self.lock:
+            self.inicio = time.monotonic()
+            self.operaciones = 0
+            self.rechazadas = 0
+            self.colisiones = 0
+            self.tiempo_total = 0.0
+
+    def registrar(self, duracion, rechazada=False):
+        with self.lock:
+            self.operaciones += 1
+            self.tiempo_total += duracion
+            if rechazada:
+                self.rechazadas += 1
+
+    def registrar_colision(self):
+        with self.lock:
+            self.colisiones += 1
+
+    def resumen(self):
+        with self.lock:
+            transcurrido = max(time.monotonic() - self.inicio, 1e-9)
+            return {
+                'operaciones': self.operaciones,
+                'rechazadas': self.rechazadas,
+                'colisiones': self.colisiones,
+                'operaciones_por_segundo': round(self.operaciones / transcurrido, 2),
+                'latencia_promedio_ms': round(self.tiempo_total / self.operaciones * 1000, 3) if self.operaciones else 0,
+                'segundos_medidos': round(transcurrido, 3)
+            }
+
+
+estadisticas = EstadisticasStock()
+
+
+def medir(funcion):
+    """Registrar duración y resultado de una operación de stock"""
+    def envoltura(*args, **kwargs):
+        inicio = time.perf_counter()
+        try:
+            resultado = funcion(*args, **kwargs)
+        except StockError:
+            estadisticas.registrar(time.perf_counter() - inicio, rechazada=True)
+            raise
+        estadisticas.registrar(time.perf_counter() - inicio)
+        return resultado
+    envoltura.__name__ = funcion.__name__
+    envoltura.__doc__ = funcion.__doc__
+    return envoltura
+
+
+def crear_movimiento(inventario_id, tipo, cantidad, usuario_id, fecha, producto_id=None):
+    """Crear el movimiento y su detalle
+
+    La cantidad y el producto se copian en el movimiento; sin producto_id lo
+    busca la señal pre_save a partir del inventario.
+    """
+    movimiento = MovimientoInventario(
+        fecha=fecha,
+        tipo_movimiento=tipo,
+        idusuario_id=usuario_id,
+        inventario_id_id=inventario_id,
+        cantidad=cantidad,
+        producto_id=producto_id
+    )
+    # El stock actual ya incluye el movimiento: los cierres no cambian
+    movimiento._stock_aplicado = True
+    movimiento.save()
+    detalle = DetalleEntradaSalida(cantidad=cantidad, identradainventario=movimiento)
+    # El movimiento ya tiene la cantidad: la señal no necesita recalcularla
+    detalle._cantidad_copiada = True
+    detalle.save()
+    return movimiento
+
+
+def sumar_stock(producto_id, cantidad, fecha):
+    """Sumar al inventario del producto, creándolo si no existe (upsert)
+
+    Devuelve True si creó la fila de inventario.
+    """
+    actualizadas = Inventario.objects.filter(producto_id=producto_id).update(
+        cantidad=F('cantidad') + cantidad, fecha_actualizacion=fecha
+    )
+    if actualizadas:
+        return False
+    try:
+        with transaction.atomic():
+            inventario = Inventario(producto_id=producto_id, cantidad=cantidad, fecha_actualizacion=fecha)
+            # El movimiento que registra la cantidad se crea a continuación
+            inventario._movimiento_registrado = True
+            inventario.save(force_insert=True)
+        return True
+    except IntegrityError:
+        # Otra transacción creó el inventario entre el UPDATE y el INSERT,
+        # o el producto no existe
+        estadisticas.registrar_colision()
+    actualizadas = Inventario.objects.filter(producto_id=producto_id).update(
+        cantidad=F('cantidad') + cantidad, fecha_actualizacion=fecha
+    )
+    if not actualizadas:
+        raise ProductoNoEncontrado(producto_id)
+    return False
+
+
+@medir
+def registrar_entrada(producto_id, cantidad, usuario_id):
+    """Registrar una entrada con un UPDATE atómico sobre el inventario
+
+    Devuelve una tupla (movimiento, stock_resultante).
+    """
+    hoy = timezone.localdate()
+    with transaction.atomic():
+        creado = sumar_stock(producto_id, cantidad, hoy)
+        inventario_id, stock = Inventario.objects.filter(producto_id=producto_id).values_list('id', 'cantidad').get()
+        movimiento = crear_movimiento(inventario_id, 'ENTRADA', cantidad, usuario_id, hoy, producto_id)
+        if not creado:
+            # Una fila nueva ya quedó contada por la señal post_save
+            contadores.ajustar_stock([(producto_id, stock - cantidad, stock)])
+        cache_stock.al_confirmar([producto_id])
+    return movimiento, stock
+
+
+@medir
+def registrar_salida(producto_id, cantidad, usuario_id):
+    """Registrar una salida sin sobreventa
+
+    El descuento se hace con un UPDATE condicionado a cantidad >= n, así que
+    dos salidas concurrentes nunca pueden dejar el stock negativo.
+    Devuelve una tupla (movimiento, stock_resultante).
+    """
+    hoy = timezone.localdate()
+    with transaction.atomic():
+        actualizadas = Inventario.objects.filter(
+            producto_id=producto_id, cantidad__gte=cantidad
+        ).update(cantidad=F('cantidad') - cantidad, fecha_actualizacion=hoy)
+        if not actualizadas:
+            if Inventario.objects.filter(producto_id=producto_id).exists():
+                raise StockInsuficiente(producto_id)
+            raise InventarioNoEncontrado(producto_id)
+        inventario_id, stock = Inventario.objects.filter(producto_id=producto_id).values_list('id', 'cantidad').get()
+        movimiento = crear_movimiento(inventario_id, 'SALIDA', cantidad, usuario_id, hoy, producto_id)
+        contadores.ajustar_stock([(producto_id, stock + cantidad, stock)])
+        cache_stock.al_confirmar([producto_id])
+    return movimiento, stock
+
+
+@medir
+def actualizar_cantidad(inventario_id, cantidad, usuario_id=None, cantidad_esperada=None):
+    """Fijar la cantidad de un inventario (ajuste de conteo físico)
+
+    La fila se bloquea mientras se ajusta. Si se indica cantidad_esperada, el
+    ajuste solo se aplica si nadie modificó el stock desde que el cliente lo
+    leyó. Con usuario_id la diferencia queda registrada como un movimiento de
+    ENTRADA o SALIDA, para que el historial siga cuadrando con el stock.
+    """
+    hoy = timezone.localdate()
+    with transaction.atomic():
+        try:
+            inventario = Inventario.objects.select_for_update().get(id=inventario_id)
+        except (Inventario.DoesNotExist, TypeError, ValueError):
+            # El id viene de la URL: uno que no es un número tampoco existe
+            raise InventarioNoEncontrado(inventario_id)
+        if cantidad_esperada is not None and inventario.cantidad != cantidad_esperada:
+            estadisticas.registrar_colision()
+            raise ConflictoStock(inventario_id)
+
+        diferencia = cantidad - inventario.cantidad
+        inventario.cantidad = cantidad
+        inventario.fecha_actualizacion = hoy
+        registrar = bool(usuario_id and diferencia)
+        # Sin movimiento, la señal corrige los cierres de stock
+        inventario._movimiento_registrado = registrar
+        # save() dispara las señales que ajustan los contadores del dashboard
+        # y refrescan la caché de stock al confirmar
+        inventario.save(update_fields=['cantidad', 'fecha_actualizacion'])
+
+        if registrar:
+            tipo = 'ENTRADA' if diferencia > 0 else 'SALIDA'
+            crear_movimiento(inventario.id, tipo, abs(diferencia), usuario_id, hoy, inventario.producto_id)
+    return inventario
+
+
+def validar_lineas(lineas):
+    """Normalizar las líneas del lote y separar las que no son válidas"""
+    validas = []
+    errores = []
+    for indice, linea in enumerate(lineas):
+        if not isinstance(linea, dict):
+            errores.append({'linea': indice, 'error': 'Formato de línea inválido'})
+            continue
+        try:
+            producto_id = int(linea.get('producto_id'))
+            cantidad = int(linea.get('cantidad'))
+        except (TypeError, ValueError):
+            errores.append({'linea': indice, 'error': 'Producto y cantidad deben ser números'})
+            continue
+        tipo = str(linea.get('tipo', '')).upper()
+        if tipo not in TIPOS_MOVIMIENTO:
+            errores.append({'linea': indice, 'producto_id': producto_id, 'error': 'Tipo debe ser ENTRADA o SALIDA'})
+        elif cantidad <= 0:
+            errores.append({'linea': indice, 'producto_id': producto_id, 'error': 'Cantidad debe ser mayor a cero'})
+        else:
+            validas.append((indice, producto_id, cantidad, tipo))
+    return validas, errores
+
+
+def crear_movimientos(movimientos, inventario_ids):
+    """Insertar los movimientos con un solo INSERT y devolverlos con su llave primaria
+
+    En backends sin RETURNING para inserciones múltiples (MySQL) las llaves se
+    recuperan leyendo los movimientos de esos inventarios posteriores al último
+    existente. Mientras las filas de inventario están bloqueadas ninguna otra
+    transacción puede registrar movimientos para ellos, así que los únicos
+    movimientos nuevos son los de este lote.
+    """
+    if connection.features.can_return_rows_from_bulk_insert:
+        return MovimientoInventario.objects.bulk_create(movimientos)
+
+    ultimo = MovimientoInventario.objects.filter(
+        inventario_id__in=inventario_ids
+    ).order_by('-idmovimientoinventario').values_list('idmovimientoinventario', flat=True).first() or 0
+    MovimientoInventario.objects.bulk_create(movimientos)
+    creados = list(MovimientoInventario.objects.filter(
+        inventario_id__in=inventario_ids,
+        idmovimientoinventario__gt=ultimo
+    ).order_by('idmovimientoinventario'))
+    if len(creados) != len(movimientos):
+        raise RuntimeError('No se pudieron recuperar los movimientos del lote')
+    return creados
+
+
+@medir
+def registrar_lote(lineas, usuario_id, estricto=False):
+    """Registrar un lote de entradas y salidas en una sola transacción
+
+    Los inventarios afectados se bloquean una sola vez y en orden de producto,
+    para que dos lotes concurrentes no se bloqueen mutuamente. Las líneas con
+    error se devuelven sin abortar el lote, salvo en modo estricto, donde
+    cualquier error deja el lote sin aplicar.
+
+    Devuelve una tupla (resultados, errores).
+    """
+    validas, errores = validar_lineas(lineas)
+    producto_ids = sorted({producto_id for _, producto_id, _, _ in validas})
+
+    with transaction.atomic():
+        existentes = set(Producto.objects.filter(idproducto__in=producto_ids).values_list('idproducto', flat=True))
+        inventarios = {
+            inventario.producto_id: inventario
+            for inventario in Inventario.objects.select_for_update().filter(
+                producto_id__in=existentes
+            ).order_by('producto_id')
+        }
+
+        # Aplicar las líneas en memoria, en el orden recibido
+        stock = {producto_id: inv.cantidad for producto_id, inv in inventarios.items()}
+        anteriores = dict(stock)
+        aceptadas = []
+        for indice, producto_id, cantidad, tipo in validas:
+            if producto_id not in existentes:
+                errores.append({'linea': indice, 'producto_id': producto_id, 'error': 'Producto no encontrado'})
+                continue
+            disponible = stock.get(producto_id, 0)
+            if tipo == 'SALIDA':
+                if producto_id not in stock:
+                    errores.append({'linea': indice, 'producto_id': producto_id, 'error': 'Producto no encontrado en inventario'})
+                    continue
+                if disponible < cantidad:
+                    errores.append({'linea': indice, 'producto_id': producto_id, 'error': 'Stock insuficiente'})
+                    continue
+                stock[producto_id] = disponible - cantidad
+            else:
+                stock[producto_id] = disponible + cantidad
+            aceptadas.append((indice, producto_id, cantidad, tipo, stock[producto_id]))
+
+        errores.sort(key=lambda error: error['linea'])
+        if not aceptadas or (estricto and errores):
+            return [], errores
+
+        hoy = timezone.localdate()
+        previo = {}
+        nuevos = sorted({linea[1] for linea in aceptadas} - inventarios.keys())
+        if nuevos:
+            for producto_id in nuevos:
+                try:
+                    # create() dispara post_save, que cuenta la fila con cantidad 0
+                    with transaction.atomic():
+                        Inventario.objects.create(producto_id=producto_id, cantidad=0, fecha_actualizacion=hoy)
+                except IntegrityError:
+                    # La creó otra transacción, que ya la contó con su cantidad
+                    estadisticas.registrar_colision()
+            # Bloquear las filas nuevas; su cantidad es el stock previo al lote
+            # y es lo que ya reflejan los contadores, sea quien sea que las creó
+            for inventario in Inventario.objects.select_for_update().filter(producto_id__in=nuevos):
+                inventarios[inventario.producto_id] = inventario
+                # Sumar lo que la otra transacción haya registrado mientras tanto
+                previo[inventario.producto_id] = inventario.cantidad
+                stock[inventario.producto_id] += inventario.cantidad
+                anteriores[inventario.producto_id] = inventario.cantidad
+
+        movimientos = crear_movimientos([
+            MovimientoInventario(
+                fecha=hoy,
+                tipo_movimiento=tipo,
+                idusuario_id=usuario_id,
+                inventario_id=inventarios[producto_id],
+                cantidad=cantidad,
+                producto_id=producto_id
+            )
+            for _, producto_id, cantidad, tipo, _ in aceptadas
+        ], [inv.id for inv in inventarios.values()])
+
+        DetalleEntradaSalida.objects.bulk_create([
+            DetalleEntradaSalida(cantidad=cantidad, identradainventario=movimiento)
+            for (_, _, cantidad, _, _), movimiento in zip(aceptadas, movimientos)
+        ])
+
+        afectados = []
+        for producto_id in {linea[1] for linea in aceptadas}:
+            inventario = inventarios[producto_id]
+            inventario.cantidad = stock[producto_id]
+            inventario.fecha_actualizacion = hoy
+            afectados.append(inventario)
+        Inventario.objects.bulk_update(afectados, ['cantidad', 'fecha_actualizacion'])
+        contadores.ajustar_stock(
+            (inventario.producto_id, anteriores.get(inventario.producto_id), inventario.cantidad)
+            for inventario in afectados
+        )
+        cache_stock.al_confirmar(inventario.producto_id for inventario in afectados)
+
+    resultados = [
+        {
+            'linea': indice,
+            'producto_id': producto_id,
+            'tipo_movimiento': tipo,
+            'cantidad': cantidad,
+            'idmovimientoinventario': movimiento.idmovimientoinventario,
+            'stock_resultante': stock_resultante + previo.get(producto_id, 0)
+        }
+        for (indice, producto_id, cantidad, tipo, stock_resultante), movimiento in zip(aceptadas, movimientos)
+    ]
+    return resultados, errores
@@ -0,0 +1,152 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from productos.models import Producto
+
+from . import cache_stock, cierres, contadores, relleno
+from .models import DetalleEntradaSalida, Inventario, MovimientoInventario, ProductosVencimiento
+
+
+@receiver(post_save, sender=Inventario)
+@receiver(post_delete, sender=Inventario)
+def refrescar_stock(sender, instance, **kwargs):
+    """Escrituras de inventario fuera de los servicios de stock (CRUD, ajustes)"""
+    cache_stock.al_confirmar([instance.producto_id])
+
+
+@receiver(post_save, sender=Producto)
+def refrescar_nombre_producto(sender, instance, created=False, **kwargs):
+    """El inventario en caché incluye el nombre del producto"""
+    if not created:
+        cache_stock.al_confirmar([instance.pk])
+
+
+@receiver(post_save, sender=Inventario)
+def ajustar_cierres_inventario(sender, instance, created=False, raw=False, **kwargs):
+    """Stock cambiado sin movimiento (CRUD, ajuste sin usuario)
+
+    Va antes de contar_inventario_guardado, que actualiza _cantidad_guardada.
+    """
+    if raw or getattr(instance, '_movimiento_registrado', False):
+        return
+    if created:
+        anterior = 0
+    elif hasattr(instance, '_cantidad_guardada'):
+        anterior = instance._cantidad_guardada
+    else:
+        return
+    # Como un movimiento con fecha de hoy que no queda en el historial
+    cierres.ajustar(instance.producto_id, timezone.localdate(), -(instance.cantidad - anterior))
+
+
+@receiver(post_save, sender=Inventario)
+def contar_inventario_guardado(sender, instance, created=False, **kwargs):
+    """Ajustar valor y productos críticos con la cantidad anterior y la nueva"""
+    if created:
+        anterior = None
+    elif hasattr(instance, '_cantidad_guardada'):
+        anterior = instance._cantidad_guardada
+    else:
+        # Instancia construida a mano: no se conoce la cantidad anterior,
+        # la diferencia la corrige reconciliar_contadores
+        return
+    contadores.ajustar_stock([(instance.producto_id, anterior, instance.cantidad)])
+    instance._cantidad_guardada = instance.cantidad
+
+
+@receiver(post_delete, sender=Inventario)
+def contar_inventario_eliminado(sender, instance, **kwargs):
+    anterior = getattr(instance, '_cantidad_guardada', instance.cantidad)
+    contadores.ajustar_stock([(instance.producto_id, anterior, None)])
+
+
+@receiver(post_save, sender=Producto)
+def contar_producto_creado(sender, instance, created=False, **kwargs):
+    if created:
+        contadores.ajustar_productos(instance.pk, 1)
+
+
+@receiver(post_delete, sender=Producto)
+def contar_producto_eliminado(sender, instance, **kwargs):
+    contadores.ajustar_productos(instance.pk, -1)
+
+
+@receiver(post_save, sender=ProductosVencimiento)
+def contar_vencimiento_guardado(sender, instance, created=False, **kwargs):
+    if created:
+        anterior = None
+    elif hasattr(instance, '_fecha_guardada'):
+        anterior = instance._fecha_guardada
+    else:
+        return
+    contadores.ajustar_vencimiento(anterior, instance.fecha_vencimiento)
+    instance._fecha_guardada = instance.fecha_vencimiento
+
+
+@receiver(post_delete, sender=ProductosVencimiento)
+def contar_vencimiento_eliminado(sender, instance, **kwargs):
+    contadores.ajustar_vencimiento(getattr(instance, '_fecha_guardada', instance.fecha_vencimiento), None)
+
+
+@receiver(pre_save, sender=MovimientoInventario)
+def copiar_producto_movimiento(sender, instance, raw=False, **kwargs):
+    """Producto del inventario del movimiento (los servicios ya lo traen)"""
+    if raw:
+        return
+    guardado = getattr(instance, '_inventario_guardado', instance.inventario_id_id)
+    if instance.producto_id is None or instance.inventario_id_id != guardado:
+        instance.producto_id = Inventario.objects.filter(
+            pk=instance.inventario_id_id
+        ).values_list('producto_id', flat=True).first()
+    instance._inventario_guardado = instance.inventario_id_id
+
+
+def iniciada_por(origin, modelo):
+    """La eliminación empezó en ese modelo (instancia o queryset) y no es una cascada"""
+    return origin is None or isinstance(origin, modelo) or getattr(origin, 'model', None) is modelo
+
+
+@receiver(pre_save, sender=MovimientoInventario)
+def recordar_neto_movimiento(sender, instance, raw=False, **kwargs):
+    """Neto guardado en la base, si la instancia no lo trae (campos diferidos)"""
+    if raw or instance._state.adding or getattr(instance, '_neto_guardado', None) is not None:
+        return
+    instance._neto_guardado = cierres.netos([instance.pk]).get(instance.pk)
+
+
+@receiver(post_save, sender=MovimientoInventario)
+def ajustar_cierres_movimiento(sender, instance, created=False, raw=False, **kwargs):
+    """Movimientos escritos fuera de los servicios de stock (CRUD, fechas pasadas)"""
+    if raw or getattr(instance, '_stock_aplicado', False):
+        return
+    nuevo = instance.neto()
+    cierres.mover_movimiento(None if created else getattr(instance, '_neto_guardado', None), nuevo)
+    instance._neto_guardado = nuevo
+
+
+@receiver(post_delete, sender=MovimientoInventario)
+def ajustar_cierres_movimiento_eliminado(sender, instance, origin=None, **kwargs):
+    # En cascada desde el inventario o el producto no hay stock que cuadrar
+    if iniciada_por(origin, MovimientoInventario):
+        cierres.mover_movimiento(getattr(instance, '_neto_guardado', None) or instance.neto(), None)
+
+
+@receiver(post_save, sender=DetalleEntradaSalida)
+@receiver(post_delete, sender=DetalleEntradaSalida)
+def copiar_cantidad_movimiento(sender, instance, raw=False, origin=None, **kwargs):
+    """Detalles escritos fuera de los servicios de stock (CRUD)"""
+    if raw or getattr(instance, '_cantidad_copiada', False):
+        return
+    if not iniciada_por(origin, DetalleEntradaSalida):
+        # Se elimina el movimiento, que corrige los cierres por su cuenta
+        return
+    # Si el detalle pasó a otro movimiento, el anterior también pierde su cantidad
+    movimiento_ids = {instance.identradainventario_id, getattr(instance, '_movimiento_guardado', None)} - {None}
+    antes = cierres.netos(movimiento_ids)
+    for movimiento_id in movimiento_ids:
+        relleno.actualizar_cantidad(movimiento_id)
+    despues = cierres.netos(movimiento_ids)
+    for movimiento_id in movimiento_ids:
+        cierres.mover_movimiento(antes.get(movimiento_id), despues.get(movimiento_id))
+    instance._movimiento_guardado = instance.identradainventario_id
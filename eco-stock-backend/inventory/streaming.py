@@ -0,0 +1,172 @@
+import csv
+import logging
+import time
+
+from asgiref.sync import sync_to_async
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import F, Q
+from django.http import StreamingHttpResponse
+from django.utils.cache import patch_vary_headers
+from django.utils.text import compress_sequence
+
+logger = logging.getLogger(__name__)
+
+# Filas leídas de la base de datos por cada consulta
+TAMANO_CHUNK = 2000
+
+
+class Eco:
+    """Objeto tipo archivo que devuelve lo escrito en vez de guardarlo"""
+
+    def write(self, valor):
+        return valor
+
+
+def por_llave(queryset, tamano=TAMANO_CHUNK):
+    """Recorrer un values_list() en bloques por llave (keyset) y devolver sus filas
+
+    iterator() no transmite con MySQL: mysqlclient trae el resultado completo a
+    la memoria del cliente. Aquí cada bloque es una consulta independiente
+    `WHERE llave > última ORDER BY llave LIMIT n`, así que en memoria solo hay
+    un bloque y no queda un cursor abierto mientras se envía la respuesta.
+
+    La llave es la llave primaria o, si el queryset se ordenó con
+    order_by(campo, 'pk'), el par (campo, pk): un reporte por rango de fechas
+    recorre así el índice (fecha, pk). Cada bloque lee su propia instantánea:
+    las filas escritas durante la exportación pueden aparecer o no.
+    """
+    campos = queryset._fields
+    orden = list(queryset.query.order_by)
+    campo = orden[0] if len(orden) == 2 else None
+    # Alias propios: values_list() descarta las columnas repetidas
+    llave = {'llave_pk': F('pk')}
+    if campo:
+        llave = {'llave_campo': F(campo), **llave}
+    consulta = queryset.annotate(**llave).values_list(*llave, *campos).order_by(*llave)
+    ultima = None
+    while True:
+        bloque = consulta
+        if ultima is not None and campo:
+            valor, pk = ultima
+            # El filtro redundante campo >= valor permite un rango sobre el índice
+            bloque = bloque.filter(
+                Q(**{f'{campo}__gt': valor}) | Q(**{campo: valor, 'pk__gt': pk}),
+                **{f'{campo}__gte': valor}
+            )
+        elif ultima is not None:
+            bloque = bloque.filter(pk__gt=ultima[0])
+        filas = list(bloque[:tamano])
+        for fila in filas:
+            yield fila[len(llave):]
+        if len(filas) < tamano:
+            return
+        ultima = filas[-1][:len(llave)]
+
+
+def lineas_csv(columnas, filas):
+    """Generar el CSV línea por línea"""
+    writer = csv.writer(Eco())
+    yield writer.writerow(columnas)
+    for fila in filas:
+        yield writer.writerow(fila)
+
+
+def lineas_ndjson(columnas, filas):
+    """Generar un objeto JSON por línea"""
+    encoder = DjangoJSONEncoder(ensure_ascii=False)
+    for fila in filas:
+        yield encoder.encode(dict(zip(columnas, fila))) + '\n'
+
+
+def en_bloques(lineas, tamano=64 * 1024):
+    """Agrupar líneas pequeñas en bloques para no escribir fila por fila al socket"""
+    bloque = []
+    acumulado = 0
+    for linea in lineas:
+        bloque.append(linea)
+        acumulado += len(linea)
+        if acumulado >= tamano:
+            yield ''.join(bloque).encode('utf-8')
+            bloque = []
+            acumulado = 0
+    if bloque:
+        yield ''.join(bloque).encode('utf-8')
+
+
+def con_metricas(contenido, nombre, inicio):
+    """Registrar el tiempo al primer byte y el tiempo total de la exportación"""
+    primer_byte = None
+    total_bytes = 0
+    for parte in contenido:
+        if primer_byte is None:
+            primer_byte = time.perf_counter() - inicio
+        total_bytes += len(parte)
+        yield parte
+    total = time.perf_counter() - inicio
+    logger.info(
+        'Exportación %s: primer byte %.1f ms, total %.1f ms, %d bytes',
+        nombre, (primer_byte or total) * 1000, total * 1000, total_bytes
+    )
+
+
+async def iterar_async(contenido):
+    """Recorrer un generador síncrono (con consultas) desde una vista asíncrona
+
+    Cada bloque se pide en el hilo síncrono de la petición, donde vive el cursor;
+    ASGI con un iterador síncrono cargaría la respuesta completa en memoria.
+    """
+    siguiente = sync_to_async(next, thread_sensitive=True)
+    fin = object()
+    while (parte := await siguiente(contenido, fin)) is not fin:
+        yield parte
+
+
+def acepta_gzip(request):
+    """El cliente acepta gzip: aparece (o aparece *) en Accept-Encoding sin q=0"""
+    calidades = {}
+    for parte in request.META.get('HTTP_ACCEPT_ENCODING', '').split(','):
+        codificacion, *parametros = [valor.strip() for valor in parte.split(';')]
+        calidad = 1.0
+        for parametro in parametros:
+            nombre, _, valor = parametro.partition('=')
+            if nombre.strip().lower() == 'q':
+                try:
+                    calidad = float(valor)
+                except ValueError:
+                    calidad = 0.0
+        calidades[codificacion.lower()] = calidad
+    return calidades.get('gzip', calidades.get('*', 0.0)) > 0
+
+
+def respuesta_streaming(request, nombre, columnas, queryset, formato, inicio=None, asincrono=False):
+    """Construir un StreamingHttpResponse CSV/NDJSON a partir de un values_list()
+
+    El queryset se recorre con por_llave() en bloques de TAMANO_CHUNK filas, por
+    lo que la memoria se mantiene constante sin importar el tamaño del reporte
+    (también con MySQL, que no transmite resultados con iterator()).
+    Con asincrono=True el contenido es un iterador asíncrono, para vistas async.
+    """
+    inicio = inicio or time.perf_counter()
+    filas = por_llave(queryset)
+
+    if formato == 'csv':
+        lineas = lineas_csv(columnas, filas)
+        content_type = 'text/csv; charset=utf-8'
+    else:
+        lineas = lineas_ndjson(columnas, filas)
+        content_type = 'application/x-ndjson; charset=utf-8'
+
+    contenido = en_bloques(lineas)
+    usar_gzip = acepta_gzip(request)
+    if usar_gzip:
+        contenido = compress_sequence(contenido)
+
+    contenido = con_metricas(contenido, nombre, inicio)
+    if asincrono:
+        contenido = iterar_async(contenido)
+    response = StreamingHttpResponse(contenido, content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="{nombre}.{formato}"'
+    if usar_gzip:
+        response['Content-Encoding'] = 'gzip'
+    patch_vary_headers(response, ('Accept-Encoding',))
+    return response
@@ -1,3 +1,912 @@
-from django.test import TestCase
+import base64
+import gzip
+import json
+import tempfile
+import threading
+import time
+import uuid
+from datetime import timedelta
+from decimal import Decimal
+from io import BytesIO, StringIO
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from django.core import mail
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.management import call_command
+from django.db import OperationalError, close_old_connections, connection
+from django.http import HttpResponse
+from django.test import AsyncClient, RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from rest_framework.exceptions import ParseError
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+from rest_framework.views import APIView
+
+from main_app.json_rapido import JSONRapidoParser, JSONRapidoRenderer
+from main_app.perfilado import PerfiladoSQLMiddleware
+from main_app.pruebas import ConsultasMixin, crear_producto, crear_productos, crear_usuario
+from productos.models import Producto
+
+from . import cache_stock, cierres, contadores, relleno, services, streaming
+from .management.commands import explain_consultas
+from .models import CierreStock, DetalleEntradaSalida, Inventario, MovimientoInventario, ProductosVencimiento
+
+
+class ConsultasPorEndpointTest(ConsultasMixin, TestCase):
+    """El número de consultas de cada endpoint no debe crecer con las filas"""
+
+    @classmethod
+    def setUpTestData(cls):
+        hoy = timezone.localdate()
+        cls.usuario = crear_usuario()
+        for i, producto in enumerate(crear_productos(5)):
+            inventario = Inventario.objects.create(producto=producto, cantidad=i * 3, fecha_actualizacion=hoy)
+            for dia in range(3):
+                movimiento = MovimientoInventario.objects.create(
+                    fecha=hoy - timedelta(days=dia), tipo_movimiento='ENTRADA',
+                    idusuario=cls.usuario, inventario_id=inventario
+                )
+                DetalleEntradaSalida.objects.create(cantidad=i, identradainventario=movimiento)
+            ProductosVencimiento.objects.create(
+                producto_id=producto, fecha_vencimiento=hoy + timedelta(days=i * 10 - 5)
+            )
+        cls.producto = producto
+        cls.movimiento = movimiento
+        cls.rango = f'fecha_inicio={hoy - timedelta(days=30)}&fecha_fin={hoy}'
+
+    def setUp(self):
+        self.client = APIClient()
+        cache_stock.cache().clear()
+
+    def test_inventario(self):
+        self.assertConsultas(1, '/inventory/inventario/')
+        self.assertConsultas(1, f'/inventory/inventario/por_producto/?producto_id={self.producto.pk}')
+        self.assertConsultas(1, f'/inventory/inventario/stock_lote/?producto_ids={self.producto.pk},0')
+        self.assertConsultas(1, '/inventory/inventario/bajo_stock/')
+        self.assertConsultas(1, '/inventory/inventario/sin_stock/')
+
+    def test_movimientos(self):
+        self.assertConsultas(1, '/inventory/movimientos/')
+        self.assertConsultas(2, f'/inventory/movimientos/por_producto/?producto_id={self.producto.pk}')
+        self.assertConsultas(1, f'/inventory/movimientos/por_fecha/?{self.rango}')
+        self.assertConsultas(1, f'/inventory/movimientos/por_usuario/?usuario_id={self.usuario.pk}')
+
+    def test_detalles(self):
+        self.assertConsultas(1, '/inventory/detalles/')
+        self.assertConsultas(1, f'/inventory/detalles/por_movimiento/?movimiento_id={self.movimiento.pk}')
+
+    def test_vencimientos(self):
+        self.assertConsultas(1, '/inventory/vencimientos/')
+        self.assertConsultas(1, '/inventory/vencimientos/por_vencer/')
+        self.assertConsultas(1, '/inventory/vencimientos/vencidos/')
+        self.assertConsultas(1, '/inventory/vencimientos/no_notificados/')
+        self.assertConsultas(1, f'/inventory/vencimientos/por_producto/?producto_id={self.producto.pk}')
+
+    def test_dashboard(self):
+        self.assertConsultas(2, '/inventory/dashboard/')
+
+
+class MovimientoCursorPaginationTest(TestCase):
+    """Paginación por cursor: recorrido completo, empates de fecha y cursores inválidos"""
+
+    @classmethod
+    def setUpTestData(cls):
+        usuario = crear_usuario()
+        inventario = Inventario.objects.create(producto=crear_producto(), cantidad=0)
+        hoy = timezone.localdate()
+        # Tres movimientos el mismo día: el orden lo decide la llave primaria
+        for dias in (0, 1, 1, 1, 2):
+            services.crear_movimiento(inventario.id, 'ENTRADA', 1, usuario.pk, hoy - timedelta(days=dias))
+        cls.esperado = list(MovimientoInventario.objects.order_by('-fecha', '-pk').values_list('pk', flat=True))
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_recorrido_completo(self):
+        vistos = []
+        url = '/inventory/movimientos/?page_size=2'
+        while url:
+            datos = self.client.get(url).json()
+            self.assertLessEqual(len(datos['results']), 2)
+            vistos += [movimiento['idmovimientoinventario'] for movimiento in datos['results']]
+            url = datos['next']
+        self.assertEqual(vistos, self.esperado)
+
+    def test_cursor_invalido(self):
+        cursores = ['no-es-base64!'] + [
+            base64.urlsafe_b64encode(posicion.encode()).decode()
+            for posicion in ('fecha|1', '2026-01-01', '2026-13-01|1', '2026-01-01|x|2', f'2026-01-01|{2 ** 70}')
+        ]
+        for cursor in cursores:
+            respuesta = self.client.get('/inventory/movimientos/', {'cursor': cursor})
+            self.assertEqual(respuesta.status_code, 404, cursor)
+            self.assertEqual(respuesta.json(), {'detail': 'Cursor inválido'})
+
+
+class ReportesStreamingTest(TestCase):
+    """Reportes CSV/NDJSON transmitidos por bloques de llave, con o sin gzip"""
+
+    @classmethod
+    def setUpTestData(cls):
+        usuario = crear_usuario()
+        hoy = timezone.localdate()
+        for i, producto in enumerate(crear_productos(3)):
+            inventario = Inventario.objects.create(producto=producto, cantidad=0)
+            for dias in (i, 1):
+                services.crear_movimiento(inventario.id, 'ENTRADA', i + 1, usuario.pk, hoy - timedelta(days=dias))
+        cls.rango = {'fecha_inicio': (hoy - timedelta(days=5)).isoformat(), 'fecha_fin': hoy.isoformat()}
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def contenido(self, respuesta):
+        return b''.join(respuesta.streaming_content)
+
+    def test_csv(self):
+        respuesta = self.client.get('/inventory/reportes/stock-actual/', {'format': 'csv'})
+        self.assertEqual(respuesta['Content-Type'], 'text/csv; charset=utf-8')
+        self.assertEqual(respuesta['Content-Disposition'], 'attachment; filename="stock-actual.csv"')
+        self.assertIn('Accept-Encoding', respuesta['Vary'])
+        lineas = self.contenido(respuesta).decode().splitlines()
+        self.assertEqual(lineas[0], 'producto_id,producto_nombre,stock_actual,fecha_actualizacion')
+        self.assertEqual(len(lineas), 4)
+
+    def test_ndjson_y_gzip(self):
+        parametros = {**self.rango, 'format': 'ndjson'}
+        plano = self.client.get('/inventory/reportes/movimientos-periodo/', parametros)
+        self.assertEqual(plano['Content-Type'], 'application/x-ndjson; charset=utf-8')
+        self.assertNotIn('Content-Encoding', plano)
+        texto = self.contenido(plano)
+        filas = [json.loads(linea) for linea in texto.decode().splitlines()]
+        self.assertEqual(len(filas), 6)
+        self.assertEqual(set(filas[0]), {'fecha', 'tipo_movimiento', 'producto', 'cantidad', 'usuario'})
+        self.assertEqual([fila['fecha'] for fila in filas], sorted(fila['fecha'] for fila in filas))
+
+        comprimido = self.client.get('/inventory/reportes/movimientos-periodo/', parametros, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(comprimido['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(self.contenido(comprimido)), texto)
+        self.assertIn('Accept-Encoding', comprimido['Vary'])
+
+    def test_gzip_rechazado(self):
+        for cabecera, usar_gzip in (
+            ('gzip;q=0', False), ('br, gzip; q=0.0', False), ('*;q=0', False), ('deflate', False),
+            ('gzip;q=0.5', True), ('br, *', True), ('*, gzip;q=0', False),
+        ):
+            respuesta = self.client.get('/inventory/reportes/stock-actual/', {'format': 'csv'}, HTTP_ACCEPT_ENCODING=cabecera)
+            self.assertEqual(respuesta.get('Content-Encoding') == 'gzip', usar_gzip, cabecera)
+            self.contenido(respuesta)
+
+    def test_por_llave_recorre_bloques(self):
+        movimientos = MovimientoInventario.objects.order_by('fecha', 'pk').values_list('pk', 'fecha')
+        # Bloques de 2 con empates de fecha entre bloques: 6 filas, 4 consultas
+        with self.assertNumQueries(4):
+            filas = list(streaming.por_llave(movimientos, tamano=2))
+        self.assertEqual(filas, list(movimientos))
+        productos = Inventario.objects.values_list('producto__nombre')
+        self.assertEqual(list(streaming.por_llave(productos, tamano=2)), list(productos.order_by('pk')))
+
+
+class RegistrarLoteTest(TestCase):
+    """Lote parcial, lote estricto y recuperación de llaves sin RETURNING"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = crear_usuario()
+        cls.urea, cls.cal = crear_productos(2)
+        Inventario.objects.create(producto=cls.urea, cantidad=5)
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def lote(self, estricto=False):
+        return self.client.post('/inventory/movimientos/registrar_lote/', {
+            'usuario_id': self.usuario.pk,
+            'estricto': estricto,
+            'lineas': [
+                {'producto_id': self.urea.pk, 'tipo': 'SALIDA', 'cantidad': 3},
+                {'producto_id': self.urea.pk, 'tipo': 'SALIDA', 'cantidad': 10},
+                {'producto_id': self.cal.pk, 'tipo': 'ENTRADA', 'cantidad': 7},
+                {'producto_id': self.cal.pk, 'tipo': 'TRASLADO', 'cantidad': 1},
+                {'producto_id': 0, 'tipo': 'ENTRADA', 'cantidad': 1},
+            ],
+        }, format='json')
+
+    def stock(self):
+        return dict(Inventario.objects.values_list('producto_id', 'cantidad'))
+
+    def test_parcial(self):
+        respuesta = self.lote()
+        self.assertEqual(respuesta.status_code, 201)
+        datos = respuesta.json()
+        self.assertEqual((datos['procesadas'], datos['con_error']), (2, 3))
+        self.assertEqual([error['linea'] for error in datos['errores']], [1, 3, 4])
+        self.assertEqual(self.stock(), {self.urea.pk: 2, self.cal.pk: 7})
+        self.assertEqual([m['stock_resultante'] for m in datos['movimientos']], [2, 7])
+        self.assertEqual(contadores.reconciliar(), {})
+        self.assertEqual(
+            [m['idmovimientoinventario'] for m in datos['movimientos']],
+            list(MovimientoInventario.objects.order_by('pk').values_list('pk', flat=True))
+        )
+
+    def test_estricto_no_aplica_nada(self):
+        respuesta = self.lote(estricto=True)
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertEqual(respuesta.json()['con_error'], 3)
+        self.assertEqual(self.stock(), {self.urea.pk: 5})
+        self.assertFalse(MovimientoInventario.objects.exists())
+
+    def test_llaves_sin_returning(self):
+        # MySQL: bulk_create no devuelve las llaves y se leen después del INSERT
+        with mock.patch.object(type(connection.features), 'can_return_rows_from_bulk_insert', False):
+            resultados, errores = services.registrar_lote([
+                {'producto_id': self.urea.pk, 'tipo': 'ENTRADA', 'cantidad': 1},
+                {'producto_id': self.cal.pk, 'tipo': 'ENTRADA', 'cantidad': 2},
+                {'producto_id': self.urea.pk, 'tipo': 'SALIDA', 'cantidad': 4},
+            ], self.usuario.pk)
+        self.assertEqual(errores, [])
+        detalles = dict(DetalleEntradaSalida.objects.values_list('identradainventario_id', 'cantidad'))
+        self.assertEqual([detalles[r['idmovimientoinventario']] for r in resultados], [1, 2, 4])
+        self.assertEqual(self.stock(), {self.urea.pk: 2, self.cal.pk: 2})
+
+    def test_inventario_creado_por_otra_transaccion(self):
+        # Otra transacción crea el inventario con 0 (contado como crítico)
+        # después de que el lote leyó los inventarios existentes
+        Inventario.objects.create(producto=self.cal, cantidad=0)
+        bloquear = Inventario.objects.select_for_update
+        lecturas = iter([lambda: Inventario.objects.none()])
+        with mock.patch.object(Inventario.objects, 'select_for_update', lambda: next(lecturas, bloquear)()):
+            resultados, errores = services.registrar_lote([
+                {'producto_id': self.cal.pk, 'tipo': 'ENTRADA', 'cantidad': 20},
+                {'producto_id': self.urea.pk, 'tipo': 'ENTRADA', 'cantidad': 1},
+            ], self.usuario.pk)
+        self.assertEqual(errores, [])
+        self.assertEqual(self.stock(), {self.urea.pk: 6, self.cal.pk: 20})
+        self.assertEqual(contadores.reconciliar(), {})
+
+
+class ServiciosStockConcurrenciaTest(TransactionTestCase):
+    """Salidas y entradas simultáneas: sin sobreventa ni actualizaciones perdidas
+
+    TransactionTestCase: cada hilo usa su propia conexión y debe ver los datos
+    confirmados.
+    """
+
+    def setUp(self):
+        self.usuario = crear_usuario()
+        self.producto = crear_producto()
+        self.inventario = Inventario.objects.create(producto=self.producto, cantidad=1)
+
+    def en_paralelo(self, operacion, veces):
+        barrera = threading.Barrier(veces)
+        resultados = []
+
+        def ejecutar():
+            barrera.wait()
+            try:
+                # SQLite en memoria no espera los bloqueos como MySQL: la
+                # transacción se revierte completa y se vuelve a intentar
+                for _ in range(500):
+                    try:
+                        resultados.append(operacion())
+                        return
+                    except OperationalError:
+                        time.sleep(0.002)
+            except services.StockError as error:
+                resultados.append(error)
+            finally:
+                close_old_connections()
+
+        hilos = [threading.Thread(target=ejecutar) for _ in range(veces)]
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+        return resultados
+
+    def test_dos_salidas_para_una_unidad(self):
+        resultados = self.en_paralelo(lambda: services.registrar_salida(self.producto.pk, 1, self.usuario.pk), 2)
+        errores = [resultado for resultado in resultados if isinstance(resultado, Exception)]
+        self.assertEqual(len(errores), 1)
+        self.assertIsInstance(errores[0], services.StockInsuficiente)
+        self.inventario.refresh_from_db()
+        self.assertEqual(self.inventario.cantidad, 0)
+        self.assertEqual(MovimientoInventario.objects.count(), 1)
+
+    def test_entradas_no_se_pierden(self):
+        self.en_paralelo(lambda: services.registrar_entrada(self.producto.pk, 2, self.usuario.pk), 4)
+        self.inventario.refresh_from_db()
+        self.assertEqual(self.inventario.cantidad, 9)
+
+    def test_ajuste_con_usuario_inexistente(self):
+        respuesta = APIClient().patch(
+            f'/inventory/inventario/{self.inventario.pk}/actualizar_cantidad/',
+            {'cantidad': 5, 'usuario_id': 999999}, format='json'
+        )
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertEqual(respuesta.json(), {'error': 'Usuario no encontrado'})
+        self.inventario.refresh_from_db()
+        self.assertEqual(self.inventario.cantidad, 1)
+
+    def test_ajuste_con_id_no_numerico(self):
+        respuesta = APIClient().patch('/inventory/inventario/abc/actualizar_cantidad/', {'cantidad': 5}, format='json')
+        self.assertEqual(respuesta.status_code, 404)
+        self.assertEqual(respuesta.json(), {'error': 'Inventario no encontrado'})
+
+
+class StressMovimientosTest(TransactionTestCase):
+    """Corrida mínima de stress_movimientos: el stock cuadra con los detalles"""
+
+    def test_corrida_minima(self):
+        crear_usuario()
+        for producto in crear_productos(2):
+            Inventario.objects.create(producto=producto, cantidad=10)
+        salida = StringIO()
+        call_command('stress_movimientos', trabajadores=2, operaciones=5, productos=2, json=True, stdout=salida)
+        reporte = json.loads(salida.getvalue())
+        self.assertEqual(reporte['operaciones'], 10)
+        self.assertEqual(reporte['descuadres'], [])
+
+
+class SeedEcostockTest(TransactionTestCase):
+    """Corrida mínima de seed_ecostock: las filas crudas quedan consistentes"""
+
+    def test_carga_minima(self):
+        call_command(
+            'seed_ecostock', productos=20, proveedores=3, movimientos=200, categorias=2,
+            usuarios=2, dias=10, lote=50, stdout=StringIO()
+        )
+        self.assertEqual(Producto.objects.count(), 20)
+        self.assertEqual(MovimientoInventario.objects.count(), 200)
+        self.assertEqual(DetalleEntradaSalida.objects.count(), 200)
+        for inventario in Inventario.objects.all():
+            movimientos = MovimientoInventario.objects.filter(inventario_id=inventario)
+            entradas = sum(m.cantidad for m in movimientos if m.tipo_movimiento == 'ENTRADA')
+            salidas = sum(m.cantidad for m in movimientos if m.tipo_movimiento == 'SALIDA')
+            self.assertEqual(inventario.cantidad, entradas - salidas)
+        self.assertEqual(contadores.reconciliar(), {})
+
+
+class BenchmarkEndpointsTest(TestCase):
+    """Corrida mínima de benchmark_endpoints: guardar la línea base y compararse con ella"""
+
+    def test_guardar_y_comparar(self):
+        producto = crear_producto()
+        services.registrar_entrada(producto.pk, 5, crear_usuario().pk)
+        with tempfile.TemporaryDirectory() as directorio:
+            baseline = Path(directorio) / 'baseline.json'
+            call_command('benchmark_endpoints', baseline=str(baseline), guardar=True, repeticiones=1, stdout=StringIO())
+            guardado = json.loads(baseline.read_text())
+            self.assertTrue(all(datos['estado'] < 500 for datos in guardado['endpoints'].values()))
+
+            salida = StringIO()
+            call_command(
+                'benchmark_endpoints', baseline=str(baseline), repeticiones=1, tolerancia=1000000,
+                filtro='inventario', stdout=salida
+            )
+            self.assertIn('Sin regresiones', salida.getvalue())
+
+
+class ExplainConsultasTest(TestCase):
+    """Solo las tablas reales cuentan como escaneo completo en el plan de SQLite"""
+
+    def plan(self, sql):
+        with connection.cursor() as cursor:
+            return [(tabla, completo) for tabla, _, completo in explain_consultas.plan_sqlite(cursor, sql, ())]
+
+    def test_alias_se_resuelve_a_la_tabla(self):
+        plan = self.plan('SELECT * FROM "inventario" U0 WHERE U0."estado" IS NULL')
+        self.assertEqual(plan, [('inventario', True)])
+
+    def test_subconsulta_no_es_escaneo(self):
+        plan = self.plan(
+            'SELECT * FROM (SELECT "estado", COUNT(*) AS n FROM "inventario" '
+            'GROUP BY "estado") sub WHERE sub.n > 1'
+        )
+        self.assertIn(('inventario', True), plan)
+        self.assertNotIn(('sub', True), plan)
+        self.assertEqual(sum(completo for _, completo in plan), 1)
+
+
+@override_settings(STOCK_CACHE_POR_PROCESO=True)
+class CacheStockTest(TestCase):
+    """stock_actual / por_producto se leen de la caché y las escrituras la refrescan"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = crear_usuario()
+        cls.producto = crear_producto()
+
+    def setUp(self):
+        self.client = APIClient()
+        cache_stock.cache().clear()
+        cache_stock.metricas.reiniciar()
+
+    def stock(self):
+        respuesta = self.client.get('/inventory/inventario/stock_actual/', {'producto_id': self.producto.pk})
+        return respuesta.json()['stock_actual']
+
+    def registrar(self, ruta, cantidad):
+        with self.captureOnCommitCallbacks(execute=True):
+            respuesta = self.client.post(f'/inventory/movimientos/{ruta}/', {
+                'producto_id': self.producto.pk, 'cantidad': cantidad, 'usuario_id': self.usuario.pk
+            }, format='json')
+        self.assertEqual(respuesta.status_code, 201)
+
+    def test_lectura_repetida_no_consulta_la_base(self):
+        self.assertEqual(self.stock(), 0)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.stock(), 0)
+        resumen = cache_stock.metricas.resumen()
+        self.assertEqual((resumen['aciertos'], resumen['fallos']), (1, 1))
+
+    def test_escrituras_actualizan_la_cache(self):
+        self.assertEqual(self.stock(), 0)
+        self.registrar('registrar_entrada', 10)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.stock(), 10)
+        self.registrar('registrar_salida', 4)
+        self.assertEqual(self.stock(), 6)
+
+        inventario = Inventario.objects.get(producto=self.producto)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(f'/inventory/inventario/{inventario.pk}/actualizar_cantidad/', {'cantidad': 25}, format='json')
+        self.assertEqual(self.stock(), 25)
+
+    @override_settings(STOCK_CACHE_POR_PROCESO=False)
+    def test_locmem_sin_permiso_no_se_usa(self):
+        # Cada proceso tendría su propia copia: se lee siempre de la base
+        self.assertEqual([aviso.id for aviso in cache_stock.revisar_cache(None)], ['inventory.W001'])
+        self.assertEqual(self.stock(), 0)
+        with self.assertNumQueries(1):
+            self.assertEqual(self.stock(), 0)
+        self.assertEqual(cache_stock.metricas.resumen()['fallos'], 0)
+
+    def test_entrada_obsoleta_no_se_sirve(self):
+        self.assertEqual(self.stock(), 0)
+        # Una entrada escrita con una versión anterior queda invalidada por el incremento
+        cache_stock.incrementar(self.producto.pk)
+        Inventario.objects.create(producto=self.producto, cantidad=3, fecha_actualizacion=timezone.localdate())
+        self.assertEqual(self.stock(), 3)
+
+
+class StockLoteTest(TestCase):
+    """stock_lote: una consulta para varios productos, en el orden pedido y sin repetidos"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.producto = crear_producto()
+        Inventario.objects.create(producto=cls.producto, cantidad=7, fecha_actualizacion=timezone.localdate())
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_devuelve_ceros(self):
+        respuesta = self.client.post('/inventory/inventario/stock_lote/', {
+            'producto_ids': [self.producto.pk, 0, self.producto.pk]
+        }, format='json')
+        self.assertEqual(respuesta.json(), [
+            {'producto_id': self.producto.pk, 'stock_actual': 7},
+            {'producto_id': 0, 'stock_actual': 0},
+        ])
+
+    def test_get_con_lista_separada_por_comas(self):
+        respuesta = self.client.get('/inventory/inventario/stock_lote/', {'producto_ids': f'0,{self.producto.pk}'})
+        self.assertEqual(respuesta.json(), [
+            {'producto_id': 0, 'stock_actual': 0},
+            {'producto_id': self.producto.pk, 'stock_actual': 7},
+        ])
+
+    @override_settings(STOCK_LOTE_MAX_PRODUCTOS=2)
+    def test_limites(self):
+        for datos in ({}, {'producto_ids': 'x'}, {'producto_ids': [1, 2, 3]}, {'producto_ids': ['a']}):
+            respuesta = self.client.post('/inventory/inventario/stock_lote/', datos, format='json')
+            self.assertEqual(respuesta.status_code, 400, datos)
+
+
+class PerfiladoSQLTest(TestCase):
+    """Server-Timing y log estructurado solo en las peticiones perfiladas"""
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_sin_perfilado(self):
+        respuesta = self.client.get('/inventory/inventario/')
+        self.assertNotIn('Server-Timing', respuesta)
+
+    def test_desactivado_sale_de_la_cadena(self):
+        with self.assertRaises(MiddlewareNotUsed):
+            PerfiladoSQLMiddleware(lambda request: HttpResponse())
+
+    @override_settings(DEBUG=True)
+    def test_cabecera_sin_token_no_perfila(self):
+        respuesta = self.client.get('/inventory/inventario/', HTTP_X_PERFILAR_SQL='1')
+        self.assertNotIn('Server-Timing', respuesta)
+
+    @override_settings(PERFILADO_SQL_TOKEN='secreto')
+    def test_cabecera_con_token(self):
+        respuesta = self.client.get('/inventory/inventario/', HTTP_X_PERFILAR_SQL='otro')
+        self.assertNotIn('Server-Timing', respuesta)
+
+        with self.assertLogs('main_app.perfilado', 'INFO') as registros:
+            respuesta = self.client.get('/inventory/inventario/', HTTP_X_PERFILAR_SQL='secreto')
+        self.assertIn('sql;dur=', respuesta['Server-Timing'])
+        self.assertIn('desc="1 consultas"', respuesta['Server-Timing'])
+        self.assertEqual(registros.records[0].perfil_sql['consultas'], 1)
+        self.assertFalse(registros.records[0].perfil_sql['posible_n_mas_1'])
+
+    @override_settings(PERFILADO_SQL_ACTIVO=True)
+    def test_detecta_repetidas(self):
+        def vista_n_mas_1(request):
+            for producto_id in range(3):
+                list(Inventario.objects.filter(producto_id=producto_id))
+            return HttpResponse()
+
+        middleware = PerfiladoSQLMiddleware(vista_n_mas_1)
+        with self.assertLogs('main_app.perfilado', 'WARNING') as registros:
+            middleware(RequestFactory().get('/inventory/inventario/'))
+        perfil = registros.records[0].perfil_sql
+        self.assertTrue(perfil['posible_n_mas_1'])
+        self.assertEqual(perfil['consultas_repetidas'], 2)
+        self.assertEqual(perfil['repetidas'][0]['veces'], 3)
+
+
+class PerfiladorPeticionTest(TestCase):
+    """Perfil de una petición solo con el token, con retención de archivos"""
+
+    def setUp(self):
+        self.client = APIClient()
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        self.directorio = Path(directorio.name)
+
+    def test_perfil_bajo_demanda(self):
+        with override_settings(
+            PERFILADOR_TOKEN='secreto', PERFILADOR_DIRECTORIO=self.directorio,
+            PERFILADOR_MAXIMO_ARCHIVOS=2, PERFILADOR_MOTOR='cprofile'
+        ):
+            self.assertNotIn('X-Perfil', self.client.get('/inventory/dashboard/'))
+            self.assertNotIn('X-Perfil', self.client.get('/inventory/dashboard/?perfilar=otro'))
+            with self.assertLogs('main_app.perfilado', 'INFO'):
+                respuesta = self.client.get('/inventory/dashboard/?perfilar=secreto')
+                self.assertTrue((self.directorio / respuesta['X-Perfil']).exists())
+                for _ in range(2):
+                    self.client.get('/inventory/dashboard/', HTTP_X_PERFILAR='secreto')
+        self.assertEqual(len(list(self.directorio.glob('perfil-*.prof'))), 2)
+
+    def test_sin_token_no_perfila(self):
+        with override_settings(PERFILADOR_TOKEN='', PERFILADOR_DIRECTORIO=self.directorio):
+            respuesta = self.client.get('/inventory/dashboard/?perfilar=', HTTP_X_PERFILAR='')
+        self.assertNotIn('X-Perfil', respuesta)
+        self.assertEqual(list(self.directorio.iterdir()), [])
+
+
+class JSONRapidoTest(TestCase):
+    """El renderer y el parser rápidos producen lo mismo que los de DRF"""
+
+    datos = {
+        'fecha': timezone.now(),
+        'dia': timezone.localdate(),
+        'precio': Decimal('12.50'),
+        'id': uuid.UUID(int=7),
+        'nombre': 'Fertilizante ñ\u2028',
+        1: [None, True, 1.5],
+    }
+
+    def test_misma_salida_que_drf(self):
+        esperado = JSONRenderer().render(self.datos)
+        self.assertEqual(JSONRapidoRenderer().render(self.datos), esperado)
+        with mock.patch('main_app.json_rapido.orjson', None):
+            self.assertEqual(JSONRapidoRenderer().render(self.datos), esperado)
+        self.assertEqual(
+            JSONRapidoRenderer().render(self.datos, 'application/json; indent=2'),
+            JSONRenderer().render(self.datos, 'application/json; indent=2')
+        )
+
+    def test_parser(self):
+        self.assertEqual(JSONRapidoParser().parse(BytesIO('{"a": [1, "ñ"]}'.encode())), {'a': [1, 'ñ']})
+        for cuerpo in (b'{"a": NaN}', b'{"a":'):
+            with self.assertRaises(ParseError):
+                JSONRapidoParser().parse(BytesIO(cuerpo))
+
+
+class VistasAsyncTest(TransactionTestCase):
+    """Las vistas asíncronas responden lo mismo que las síncronas
+
+    TransactionTestCase: las consultas en paralelo usan conexiones de otros
+    hilos, que no ven los datos de una transacción sin confirmar.
+    """
+
+    def setUp(self):
+        hoy = timezone.localdate()
+        usuario = crear_usuario()
+        for i, producto in enumerate(crear_productos(3)):
+            services.registrar_entrada(producto.pk, i * 8, usuario.pk)
+            ProductosVencimiento.objects.create(producto_id=producto, fecha_vencimiento=hoy + timedelta(days=i))
+        self.client = APIClient()
+
+    def test_dashboard_async(self):
+        self.assertEqual(
+            self.client.get('/inventory/async/dashboard/').json(),
+            self.client.get('/inventory/dashboard/').json()
+        )
+
+    def test_reporte_async(self):
+        self.assertEqual(
+            self.client.get('/inventory/async/reportes/stock-actual/').json(),
+            self.client.get('/inventory/reportes/stock-actual/').json()
+        )
+        respuesta = self.client.get('/inventory/async/reportes/movimientos-periodo/')
+        self.assertEqual(respuesta.status_code, 400)
+
+    def test_mismos_permisos_que_drf(self):
+        with mock.patch.object(APIView, 'permission_classes', [IsAuthenticated]):
+            for ruta in ('/inventory/dashboard/', '/inventory/async/dashboard/',
+                         '/inventory/reportes/stock-actual/', '/inventory/async/reportes/stock-actual/'):
+                respuesta = self.client.get(ruta)
+                self.assertEqual(respuesta.status_code, 401, ruta)
+                self.assertIn('WWW-Authenticate', respuesta, ruta)
+
+    async def test_reporte_async_streaming(self):
+        respuesta = await AsyncClient().get('/inventory/async/reportes/stock-actual/', {'format': 'csv'})
+        contenido = b''.join([parte async for parte in respuesta.streaming_content]).decode()
+        self.assertEqual(len(contenido.strip().splitlines()), 4)
+
+
+class ContadoresDashboardTest(TestCase):
+    """Los contadores del dashboard siguen a las escrituras sin recorrer las tablas"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = crear_usuario()
+        cls.productos = crear_productos(4)
+
+    def assertCuadra(self):
+        """Los contadores coinciden con los valores calculados desde las tablas"""
+        self.assertEqual(contadores.reconciliar(), {})
+
+    def test_escrituras_mantienen_contadores(self):
+        hoy = timezone.localdate()
+        a, b, c, d = (producto.pk for producto in self.productos)
+        services.registrar_entrada(a, 30, self.usuario.pk)
+        services.registrar_entrada(a, 5, self.usuario.pk)
+        services.registrar_salida(a, 28, self.usuario.pk)
+        services.registrar_lote([
+            {'producto_id': b, 'tipo': 'ENTRADA', 'cantidad': 20},
+            {'producto_id': a, 'tipo': 'ENTRADA', 'cantidad': 1},
+            {'producto_id': b, 'tipo': 'SALIDA', 'cantidad': 15},
+        ], self.usuario.pk)
+        inventario_c = Inventario.objects.create(producto_id=c, cantidad=50, fecha_actualizacion=hoy)
+        services.actualizar_cantidad(inventario_c.pk, 3, self.usuario.pk)
+        vencimiento = ProductosVencimiento.objects.create(producto_id=self.productos[0], fecha_vencimiento=hoy)
+        vencimiento = ProductosVencimiento.objects.get(pk=vencimiento.pk)
+        vencimiento.fecha_vencimiento = hoy + timedelta(days=60)
+        vencimiento.save()
+        ProductosVencimiento.objects.create(producto_id=self.productos[1], fecha_vencimiento=hoy + timedelta(days=5))
+        Producto.objects.get(pk=d).delete()
+
+        self.assertEqual(contadores.leer(), {
+            'total_productos': 3,
+            'valor_inventario_total': 8 + 5 + 3,
+            'productos_criticos': 3,
+            'productos_por_vencer': 1,
+        })
+        self.assertCuadra()
+
+    def test_reconciliar_corrige_deriva(self):
+        # update() no dispara señales: el contador queda desfasado
+        Inventario.objects.create(producto=self.productos[0], cantidad=40, fecha_actualizacion=timezone.localdate())
+        Inventario.objects.update(cantidad=4)
+        self.assertEqual(contadores.leer()['valor_inventario_total'], 40)
+
+        derivas = contadores.reconciliar()
+        self.assertEqual(len(derivas), 2)
+        self.assertEqual(contadores.leer()['valor_inventario_total'], 4)
+        self.assertEqual(contadores.leer()['productos_criticos'], 1)
+        self.assertCuadra()
+
+
+class CierresStockTest(TestCase):
+    """Stock a una fecha desde el stock actual o desde el cierre más cercano"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = crear_usuario()
+        cls.producto = crear_producto()
+        # 5 unidades de stock inicial sin movimiento
+        cls.inventario = Inventario.objects.create(producto=cls.producto, cantidad=85)
+        cls.hoy = timezone.localdate()
+        for dias, tipo, cantidad in ((40, 'ENTRADA', 100), (20, 'SALIDA', 30), (5, 'ENTRADA', 10)):
+            services.crear_movimiento(cls.inventario.id, tipo, cantidad, cls.usuario.pk, cls.hoy - timedelta(days=dias))
+
+    def stock(self, dias):
+        fecha = (self.hoy - timedelta(days=dias)).isoformat()
+        datos = APIClient().get(
+            f'/inventory/inventario/stock_en_fecha/?fecha={fecha}&producto_ids={self.producto.pk}'
+        ).json()
+        return datos['base']['tipo'], datos['stock'][0]['stock']
+
+    def test_stock_en_fecha(self):
+        esperado = {50: 5, 30: 105, 10: 75, 1: 85}
+        for dias, stock in esperado.items():
+            self.assertEqual(self.stock(dias), ('actual', stock))
+
+        call_command('cerrar_stock', desde=self.hoy - timedelta(days=45), periodo='diario', stdout=StringIO())
+        self.assertEqual(self.stock(30), ('anterior', 105))
+        CierreStock.objects.exclude(fecha=self.hoy - timedelta(days=25)).delete()
+        for dias, stock in esperado.items():
+            self.assertEqual(self.stock(dias)[1], stock)
+        self.assertEqual(self.stock(30)[0], 'siguiente')
+
+    def test_movimiento_con_fecha_pasada_despues_del_cierre(self):
+        call_command('cerrar_stock', desde=self.hoy - timedelta(days=45), periodo='diario', stdout=StringIO())
+        cliente = APIClient()
+        movimiento = cliente.post('/inventory/movimientos/', {
+            'fecha': (self.hoy - timedelta(days=30)).isoformat(), 'tipo_movimiento': 'ENTRADA',
+            'idusuario': self.usuario.pk, 'inventario_id': self.inventario.pk
+        }, format='json').json()['idmovimientoinventario']
+        detalle = cliente.post('/inventory/detalles/', {
+            'cantidad': 7, 'identradainventario': movimiento
+        }, format='json').json()['iddetalleentrada']
+
+        # El stock actual no cambió: la entrada del día -30 baja el stock de los días anteriores
+        esperado = {50: -2, 35: 98, 30: 105, 10: 75, 1: 85}
+        self.assertEqual({dias: self.stock(dias) for dias in esperado}, {
+            50: ('siguiente', -2), 35: ('anterior', 98), 30: ('anterior', 105),
+            10: ('anterior', 75), 1: ('anterior', 85),
+        })
+
+        cliente.put(f'/inventory/detalles/{detalle}/', {'cantidad': 12}, format='json')
+        self.assertEqual([self.stock(dias)[1] for dias in (50, 35, 30)], [-7, 93, 105])
+        cliente.patch(f'/inventory/movimientos/{movimiento}/', {'tipo_movimiento': 'SALIDA'}, format='json')
+        self.assertEqual([self.stock(dias)[1] for dias in (50, 35, 30)], [17, 117, 105])
+
+        cliente.delete(f'/inventory/movimientos/{movimiento}/')
+        self.assertEqual([self.stock(dias)[1] for dias in (50, 35, 30)], [5, 105, 105])
+        # Mismos valores que construir() con los movimientos actuales
+        guardados = list(CierreStock.objects.order_by('fecha').values_list('fecha', 'cantidad'))
+        cierres.construir(fecha for fecha, _ in guardados)
+        self.assertEqual(list(CierreStock.objects.order_by('fecha').values_list('fecha', 'cantidad')), guardados)
+
+    def test_stock_cambiado_sin_movimiento(self):
+        cierres.construir([self.hoy - timedelta(days=60), self.hoy - timedelta(days=20)])
+        dias = (50, 25, 15, 5)
+        self.assertEqual([self.stock(dia) for dia in dias], [
+            ('anterior', 5), ('siguiente', 105), ('anterior', 75), ('actual', 85)
+        ])
+
+        # Ajuste sin usuario: no queda movimiento, todas las fechas cambian igual
+        services.actualizar_cantidad(self.inventario.id, 95)
+        self.assertEqual([self.stock(dia)[1] for dia in dias], [15, 115, 85, 95])
+        APIClient().patch(f'/inventory/inventario/{self.inventario.id}/', {'cantidad': 80}, format='json')
+        self.assertEqual([self.stock(dia)[1] for dia in dias], [0, 100, 70, 80])
+        # Con usuario el ajuste es un movimiento de hoy: los días pasados no cambian
+        services.actualizar_cantidad(self.inventario.id, 90, usuario_id=self.usuario.pk)
+        self.assertEqual([self.stock(dia)[1] for dia in dias], [0, 100, 70, 80])
+
+        guardados = list(CierreStock.objects.order_by('fecha').values_list('fecha', 'cantidad'))
+        cierres.construir(fecha for fecha, _ in guardados)
+        self.assertEqual(list(CierreStock.objects.order_by('fecha').values_list('fecha', 'cantidad')), guardados)
+
+
+class SerieMovimientosTest(TestCase):
+    """Totales por período agregados en la base de datos, con relleno de ceros"""
+
+    @classmethod
+    def setUpTestData(cls):
+        usuario = crear_usuario()
+        inventario = Inventario.objects.create(producto=crear_producto(), cantidad=80)
+        for fecha, tipo, cantidad in (('2026-01-05', 'ENTRADA', 100), ('2026-01-20', 'SALIDA', 30), ('2026-03-02', 'ENTRADA', 10)):
+            services.crear_movimiento(inventario.id, tipo, cantidad, usuario.pk, fecha)
+
+    def serie(self, consulta):
+        respuesta = APIClient().get(f'/inventory/movimientos/serie/?fecha_inicio=2026-01-01&fecha_fin=2026-03-31&{consulta}')
+        self.assertEqual(respuesta.status_code, 200)
+        return [(fila['periodo'], fila.get('tipo_movimiento'), fila['total']) for fila in respuesta.json()['datos']]
+
+    def test_por_mes(self):
+        self.assertEqual(self.serie('periodo=mes'), [
+            ('2026-01-01', 'ENTRADA', 100), ('2026-01-01', 'SALIDA', 30), ('2026-03-01', 'ENTRADA', 10)
+        ])
+        self.assertEqual(self.serie('periodo=mes&rellenar=1'), [
+            ('2026-01-01', 'ENTRADA', 100), ('2026-01-01', 'SALIDA', 30),
+            ('2026-02-01', 'ENTRADA', 0), ('2026-02-01', 'SALIDA', 0),
+            ('2026-03-01', 'ENTRADA', 10), ('2026-03-01', 'SALIDA', 0),
+        ])
+        self.assertEqual(self.serie('periodo=semana&agrupar=')[0], ('2026-01-05', None, 100))
+
+    def test_parametros_invalidos(self):
+        cliente = APIClient()
+        for consulta in ('', 'fecha_inicio=2026-01-01&fecha_fin=2026-03-31&periodo=anio',
+                         'fecha_inicio=2026-01-01&fecha_fin=2026-03-31&agrupar=usuario'):
+            self.assertEqual(cliente.get(f'/inventory/movimientos/serie/?{consulta}').status_code, 400)
+
+
+class CopiasMovimientoTest(TestCase):
+    """Cantidad y producto copiados en el movimiento por servicios, señales y relleno"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = crear_usuario()
+        cls.producto = crear_producto()
+        cls.inventario = Inventario.objects.create(producto=cls.producto, cantidad=0)
+
+    def copias(self, movimiento):
+        return MovimientoInventario.objects.values_list('cantidad', 'producto_id').get(pk=movimiento.pk)
+
+    def test_servicios_y_señales(self):
+        entrada, _ = services.registrar_entrada(self.producto.pk, 7, self.usuario.pk)
+        self.assertEqual(self.copias(entrada), (7, self.producto.pk))
+
+        # CRUD: el movimiento primero, los detalles después
+        movimiento = MovimientoInventario.objects.create(
+            tipo_movimiento='ENTRADA', idusuario=self.usuario, inventario_id=self.inventario
+        )
+        self.assertEqual(self.copias(movimiento), (None, self.producto.pk))
+        detalle = DetalleEntradaSalida.objects.create(cantidad=3, identradainventario=movimiento)
+        DetalleEntradaSalida.objects.create(cantidad=4, identradainventario=movimiento)
+        self.assertEqual(self.copias(movimiento), (7, self.producto.pk))
+        detalle.delete()
+        self.assertEqual(self.copias(movimiento), (4, self.producto.pk))
+
+    def test_detalle_cambia_de_movimiento(self):
+        origen, destino = [
+            MovimientoInventario.objects.create(
+                tipo_movimiento='ENTRADA', idusuario=self.usuario, inventario_id=self.inventario
+            )
+            for _ in range(2)
+        ]
+        DetalleEntradaSalida.objects.create(cantidad=5, identradainventario=origen)
+        detalle = DetalleEntradaSalida.objects.get()
+        detalle.identradainventario = destino
+        detalle.save()
+        self.assertEqual(self.copias(origen), (0, self.producto.pk))
+        self.assertEqual(self.copias(destino), (5, self.producto.pk))
+
+    def test_rellenar_por_rangos(self):
+        movimientos = [services.registrar_entrada(self.producto.pk, n, self.usuario.pk)[0] for n in (1, 2, 3)]
+        MovimientoInventario.objects.update(cantidad=None, producto=None)
+        avances = []
+        self.assertEqual(relleno.rellenar(tamano=2, al_avanzar=lambda *avance: avances.append(avance)), 3)
+        self.assertEqual(len(avances), 2)
+        self.assertEqual([self.copias(m) for m in movimientos], [(n, self.producto.pk) for n in (1, 2, 3)])
+        self.assertEqual(relleno.rellenar(), 0)
+
+
+class NotificarVencimientosTest(TestCase):
+    """Avisos de vencimiento en bloques: un correo y un UPDATE por bloque"""
+
+    @classmethod
+    def setUpTestData(cls):
+        hoy = timezone.localdate()
+        for i, producto in enumerate(crear_productos(6)):
+            # El último vence fuera de la ventana de 30 días
+            ProductosVencimiento.objects.create(producto_id=producto, fecha_vencimiento=hoy + timedelta(days=i * 10 - 10))
+
+    def test_notifica_por_bloques_y_reanuda(self):
+        call_command('notificar_vencimientos', bloque=2, destinatarios=['bodega@ecostock.test'], stdout=StringIO())
+        self.assertEqual(len(mail.outbox), 3)
+        self.assertEqual(ProductosVencimiento.objects.filter(notificado=False).count(), 1)
+
+        call_command('notificar_vencimientos', bloque=2, destinatarios=['bodega@ecostock.test'], stdout=StringIO())
+        self.assertEqual(len(mail.outbox), 3)
+
+    def test_envio_fuera_de_la_transaccion(self):
+        profundidad = len(connection.atomic_blocks)
+
+        def enviar(mensaje):
+            # Fuera del atomic del bloque: sus bloqueos ya se liberaron
+            self.assertEqual(len(connection.atomic_blocks), profundidad)
+            self.assertEqual(ProductosVencimiento.objects.filter(notificado=True).count(), 2)
+            raise ConnectionError('SMTP caído')
+
+        with mock.patch('inventory.notificaciones.EmailMessage.send', enviar):
+            with self.assertRaises(ConnectionError):
+                call_command('notificar_vencimientos', bloque=2, destinatarios=['bodega@ecostock.test'], stdout=StringIO())
+        self.assertEqual(ProductosVencimiento.objects.filter(notificado=False).count(), 6)
+
+    def test_simulacion_no_marca(self):
+        call_command('notificar_vencimientos', bloque=4, simular=True, stdout=StringIO())
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(ProductosVencimiento.objects.filter(notificado=False).count(), 6)
@@ -6,7 +6,9 @@ from .views import (
     DetalleEntradaSalidaViewSet,
     ProductosVencimientoViewSet,
     ReportesView,
-    DashboardView
+    DashboardView,
+    ReportesAsyncView,
+    DashboardAsyncView
 )
 
 router = DefaultRouter()
@@ -19,4 +21,6 @@ urlpatterns = [
     path('', include(router.urls)),
     path('reportes/<str:tipo_reporte>/', ReportesView.as_view(), name='reportes'),
     path('dashboard/', DashboardView.as_view(), name='dashboard'),
+    path('async/reportes/<str:tipo_reporte>/', ReportesAsyncView.as_view(), name='reportes-async'),
+    path('async/dashboard/', DashboardAsyncView.as_view(), name='dashboard-async'),
 ]
\ No newline at end of file
@@ -1,14 +1,37 @@
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
+from rest_framework.exceptions import APIException
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.views import APIView
+from main_app.campos import CamposDispersosMixin
+from main_app.json_rapido import dumps
+from django.conf import settings
 from django.db.models import Q
+from django.http import HttpResponse
 from django.utils import timezone
+from django.views import View
 from datetime import datetime, timedelta
+import time
+from users.models import Usuario
 from .models import Inventario, MovimientoInventario, DetalleEntradaSalida, ProductosVencimiento
 from .serializers import InventarioSerializer, MovimientoInventarioSerializer, DetalleEntradaSalidaSerializer, ProductosVencimientoSerializer
+from .pagination import MovimientoCursorPagination
+from .reportes import preparar_reporte
+from .renderers import CSVRenderer, NDJSONRenderer
+from .streaming import respuesta_streaming
+from .concurrencia import en_hilo, en_paralelo
+from . import cache_stock, cierres, contadores, series, services
+
+def usuario_existe(usuario_id):
+    """El movimiento no puede referirse a un usuario inexistente (IntegrityError al insertar)"""
+    try:
+        return Usuario.objects.filter(idusuario=int(usuario_id)).exists()
+    except (TypeError, ValueError):
+        return False
 
-class InventarioViewSet(viewsets.ModelViewSet):
-    queryset = Inventario.objects.all()
+class InventarioViewSet(CamposDispersosMixin, viewsets.ModelViewSet):
+    queryset = Inventario.objects.select_related('producto')
     serializer_class = InventarioSerializer
     
     def create(self, request):
@@ -25,30 +48,48 @@ class InventarioViewSet(viewsets.ModelViewSet):
         producto_id = request.query_params.get('producto_id')
         if producto_id:
             try:
-                inventario = Inventario.objects.get(producto_id=producto_id)
-                serializer = self.get_serializer(inventario)
-                return Response(serializer.data)
-            except Inventario.DoesNotExist:
+                inventario = cache_stock.obtener(producto_id)
+            except ValueError:
+                return Response({'error': 'ID de producto inválido'}, status=status.HTTP_400_BAD_REQUEST)
+            if inventario is None:
                 return Response({'error': 'Inventario no encontrado'}, status=status.HTTP_404_NOT_FOUND)
+            return Response(inventario)
         return Response({'error': 'ID de producto requerido'}, status=status.HTTP_400_BAD_REQUEST)
     
     @action(detail=True, methods=['patch'])
     def actualizar_cantidad(self, request, pk=None):
         """Actualizar cantidad en inventario"""
-        try:
-            inventario = self.get_object()
-            nueva_cantidad = request.data.get('cantidad')
-            
-            if nueva_cantidad is not None:
-                inventario.cantidad = nueva_cantidad
-                inventario.fecha_actualizacion = timezone.now()
-                inventario.save()
-                
-                serializer = self.get_serializer(inventario)
-                return Response(serializer.data)
+        nueva_cantidad = request.data.get('cantidad')
+        if nueva_cantidad is None:
             return Response({'error': 'Cantidad requerida'}, status=status.HTTP_400_BAD_REQUEST)
-        except Inventario.DoesNotExist:
+        
+        cantidad_esperada = request.data.get('cantidad_anterior')
+        try:
+            nueva_cantidad = int(nueva_cantidad)
+            if cantidad_esperada is not None:
+                cantidad_esperada = int(cantidad_esperada)
+        except (TypeError, ValueError):
+            return Response({'error': 'Cantidad debe ser un número'}, status=status.HTTP_400_BAD_REQUEST)
+        if nueva_cantidad < 0:
+            return Response({'error': 'Cantidad no puede ser negativa'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        usuario_id = request.data.get('usuario_id')
+        if usuario_id and not usuario_existe(usuario_id):
+            return Response({'error': 'Usuario no encontrado'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        try:
+            inventario = services.actualizar_cantidad(
+                pk, nueva_cantidad,
+                usuario_id=usuario_id,
+                cantidad_esperada=cantidad_esperada
+            )
+        except services.InventarioNoEncontrado:
             return Response({'error': 'Inventario no encontrado'}, status=status.HTTP_404_NOT_FOUND)
+        except services.ConflictoStock:
+            return Response({'error': 'La cantidad fue modificada por otra operación'}, status=status.HTTP_409_CONFLICT)
+        
+        serializer = self.get_serializer(inventario)
+        return Response(serializer.data)
     
     @action(detail=False, methods=['get'])
     def stock_actual(self, request):
@@ -56,17 +97,91 @@ class InventarioViewSet(viewsets.ModelViewSet):
         producto_id = request.query_params.get('producto_id')
         if producto_id:
             try:
-                inventario = Inventario.objects.get(producto_id=producto_id)
-                return Response({'producto_id': producto_id, 'stock_actual': inventario.cantidad})
-            except Inventario.DoesNotExist:
-                return Response({'producto_id': producto_id, 'stock_actual': 0})
+                inventario = cache_stock.obtener(producto_id)
+            except ValueError:
+                return Response({'error': 'ID de producto inválido'}, status=status.HTTP_400_BAD_REQUEST)
+            stock = inventario['cantidad'] if inventario is not None else 0
+            return Response({'producto_id': producto_id, 'stock_actual': stock})
         return Response({'error': 'ID de producto requerido'}, status=status.HTTP_400_BAD_REQUEST)
     
+    @action(detail=False, methods=['get', 'post'])
+    def stock_lote(self, request):
+        """Obtener el stock actual de varios productos con una sola consulta"""
+        if request.method == 'POST':
+            producto_ids = request.data.get('producto_ids')
+        else:
+            # ?producto_ids=1,2,3 o ?producto_ids=1&producto_ids=2
+            producto_ids = [
+                valor for parametro in request.query_params.getlist('producto_ids')
+                for valor in parametro.split(',') if valor.strip()
+            ]
+        if not producto_ids or not isinstance(producto_ids, list):
+            return Response({'error': 'Lista de IDs de producto requerida'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        maximo = getattr(settings, 'STOCK_LOTE_MAX_PRODUCTOS', 1000)
+        if len(producto_ids) > maximo:
+            return Response({'error': f'Máximo {maximo} productos por consulta'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            producto_ids = [int(producto_id) for producto_id in producto_ids]
+        except (TypeError, ValueError):
+            return Response({'error': 'Los IDs de producto deben ser números'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        stock = dict(Inventario.objects.filter(producto_id__in=set(producto_ids)).values_list('producto_id', 'cantidad'))
+        # Igual que stock_actual: los productos sin inventario tienen stock 0
+        return Response([
+            {'producto_id': producto_id, 'stock_actual': stock.get(producto_id, 0)}
+            for producto_id in dict.fromkeys(producto_ids)
+        ])
+    
+    @action(detail=False, methods=['get'])
+    def stock_en_fecha(self, request):
+        """Stock al final de un día, desde el cierre más cercano (inventory.cierres)
+
+        ?fecha=AAAA-MM-DD y opcionalmente ?producto_ids=1,2,3; sin producto_ids
+        se devuelven los productos con stock distinto de cero.
+        """
+        try:
+            fecha = datetime.strptime(request.query_params.get('fecha', ''), '%Y-%m-%d').date()
+        except ValueError:
+            return Response({'error': 'Fecha requerida (YYYY-MM-DD)'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        producto_ids = [
+            valor for parametro in request.query_params.getlist('producto_ids')
+            for valor in parametro.split(',') if valor.strip()
+        ]
+        maximo = getattr(settings, 'STOCK_LOTE_MAX_PRODUCTOS', 1000)
+        if len(producto_ids) > maximo:
+            return Response({'error': f'Máximo {maximo} productos por consulta'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            producto_ids = [int(producto_id) for producto_id in producto_ids]
+        except ValueError:
+            return Response({'error': 'Los IDs de producto deben ser números'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        stock, base = cierres.stock_en_fecha(fecha, set(producto_ids) if producto_ids else None)
+        if producto_ids:
+            filas = [(producto_id, stock.get(producto_id, 0)) for producto_id in dict.fromkeys(producto_ids)]
+        else:
+            filas = sorted((producto_id, cantidad) for producto_id, cantidad in stock.items() if cantidad)
+        return Response({
+            'fecha': fecha,
+            'base': base,
+            'stock': [{'producto_id': producto_id, 'stock': cantidad} for producto_id, cantidad in filas],
+        })
+    
     def list(self, request):
         """Listar inventario completo"""
         queryset = self.get_queryset()
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+        return Response(self.listar(queryset))
+    
+    @action(detail=False, methods=['get'])
+    def metricas_escritura(self, request):
+        """Rendimiento del camino de escritura de stock en este proceso"""
+        return Response(services.estadisticas.resumen())
+    
+    @action(detail=False, methods=['get'])
+    def metricas_cache(self, request):
+        """Aciertos y fallos de la caché de stock en este proceso"""
+        return Response(cache_stock.metricas.resumen())
     
     @action(detail=False, methods=['get'])
     def bajo_stock(self, request):
@@ -74,22 +189,27 @@ class InventarioViewSet(viewsets.ModelViewSet):
         limite = request.query_params.get('limite', 10)
         try:
             limite = int(limite)
-            inventarios = Inventario.objects.filter(cantidad__lte=limite)
-            serializer = self.get_serializer(inventarios, many=True)
-            return Response(serializer.data)
+            inventarios = self.get_queryset().filter(cantidad__lte=limite)
+            return Response(self.listar(inventarios))
         except ValueError:
             return Response({'error': 'Límite debe ser un número'}, status=status.HTTP_400_BAD_REQUEST)
     
     @action(detail=False, methods=['get'])
     def sin_stock(self, request):
         """Obtener productos sin stock"""
-        inventarios = Inventario.objects.filter(cantidad=0)
-        serializer = self.get_serializer(inventarios, many=True)
-        return Response(serializer.data)
+        inventarios = self.get_queryset().filter(cantidad=0)
+        return Response(self.listar(inventarios))
 
-class MovimientoInventarioViewSet(viewsets.ModelViewSet):
-    queryset = MovimientoInventario.objects.all()
+class MovimientoInventarioViewSet(CamposDispersosMixin, viewsets.ModelViewSet):
+    queryset = MovimientoInventario.objects.select_related('idusuario', 'inventario_id__producto')
     serializer_class = MovimientoInventarioSerializer
+    pagination_class = MovimientoCursorPagination
+    
+    def paginar(self, movimientos):
+        """Serializar una página de movimientos"""
+        pagina = self.paginate_queryset(movimientos)
+        serializer = self.get_serializer(pagina, many=True)
+        return self.get_paginated_response(serializer.data)
     
     @action(detail=False, methods=['post'])
     def registrar_entrada(self, request):
@@ -102,33 +222,18 @@ class MovimientoInventarioViewSet(viewsets.ModelViewSet):
             return Response({'error': 'Producto, cantidad y usuario son requeridos'}, status=status.HTTP_400_BAD_REQUEST)
         
         try:
-            # Obtener o crear inventario
-            inventario, created = Inventario.objects.get_or_create(
-                producto_id=producto_id,
-                defaults={'cantidad': 0}
-            )
-            
-            # Crear movimiento
-            movimiento = MovimientoInventario.objects.create(
-                tipo_movimiento='ENTRADA',
-                idusuario_id=usuario_id,
-                inventario_id=inventario
-            )
-            
-            # Actualizar cantidad en inventario
-            inventario.cantidad += int(cantidad)
-            inventario.fecha_actualizacion = timezone.now()
-            inventario.save()
-            
-            # Crear detalle
-            DetalleEntradaSalida.objects.create(
-                cantidad=cantidad,
-                identradainventario=movimiento
-            )
+            cantidad = int(cantidad)
+            if cantidad <= 0:
+                return Response({'error': 'Cantidad debe ser mayor a cero'}, status=status.HTTP_400_BAD_REQUEST)
             
+            movimiento, _ = services.registrar_entrada(producto_id, cantidad, usuario_id)
+            # Releer con las relaciones que usa el serializer
+            movimiento = self.get_queryset().get(pk=movimiento.pk)
             serializer = self.get_serializer(movimiento)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
             
+        except services.ProductoNoEncontrado:
+            return Response({'error': 'Producto no encontrado'}, status=status.HTTP_404_NOT_FOUND)
         except Exception as e:
             return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
     
@@ -143,38 +248,49 @@ class MovimientoInventarioViewSet(viewsets.ModelViewSet):
             return Response({'error': 'Producto, cantidad y usuario son requeridos'}, status=status.HTTP_400_BAD_REQUEST)
         
         try:
-            # Verificar inventario disponible
-            inventario = Inventario.objects.get(producto_id=producto_id)
-            
-            if inventario.cantidad < int(cantidad):
-                return Response({'error': 'Stock insuficiente'}, status=status.HTTP_400_BAD_REQUEST)
-            
-            # Crear movimiento
-            movimiento = MovimientoInventario.objects.create(
-                tipo_movimiento='SALIDA',
-                idusuario_id=usuario_id,
-                inventario_id=inventario
-            )
-            
-            # Actualizar cantidad en inventario
-            inventario.cantidad -= int(cantidad)
-            inventario.fecha_actualizacion = timezone.now()
-            inventario.save()
-            
-            # Crear detalle
-            DetalleEntradaSalida.objects.create(
-                cantidad=cantidad,
-                identradainventario=movimiento
-            )
+            cantidad = int(cantidad)
+            if cantidad <= 0:
+                return Response({'error': 'Cantidad debe ser mayor a cero'}, status=status.HTTP_400_BAD_REQUEST)
             
+            movimiento, _ = services.registrar_salida(producto_id, cantidad, usuario_id)
+            # Releer con las relaciones que usa el serializer
+            movimiento = self.get_queryset().get(pk=movimiento.pk)
             serializer = self.get_serializer(movimiento)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
             
-        except Inventario.DoesNotExist:
+        except services.StockInsuficiente:
+            return Response({'error': 'Stock insuficiente'}, status=status.HTTP_400_BAD_REQUEST)
+        except services.InventarioNoEncontrado:
             return Response({'error': 'Producto no encontrado en inventario'}, status=status.HTTP_404_NOT_FOUND)
         except Exception as e:
             return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
     
+    @action(detail=False, methods=['post'])
+    def registrar_lote(self, request):
+        """Registrar un lote de entradas y salidas en una sola transacción"""
+        lineas = request.data.get('lineas')
+        usuario_id = request.data.get('usuario_id')
+        estricto = str(request.data.get('estricto', False)).lower() in ('true', '1')
+        
+        if not usuario_id or not isinstance(lineas, list) or not lineas:
+            return Response({'error': 'Usuario y lista de líneas son requeridos'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        max_lote = getattr(settings, 'MOVIMIENTOS_MAX_LOTE', 1000)
+        if len(lineas) > max_lote:
+            return Response({'error': f'El lote no puede tener más de {max_lote} líneas'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        if not usuario_existe(usuario_id):
+            return Response({'error': 'Usuario no encontrado'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        resultados, errores = services.registrar_lote(lineas, usuario_id, estricto=estricto)
+        
+        return Response({
+            'procesadas': len(resultados),
+            'con_error': len(errores),
+            'movimientos': resultados,
+            'errores': errores
+        }, status=status.HTTP_201_CREATED if resultados else status.HTTP_400_BAD_REQUEST)
+    
     @action(detail=False, methods=['get'])
     def por_producto(self, request):
         """Obtener movimientos de un producto"""
@@ -182,9 +298,8 @@ class MovimientoInventarioViewSet(viewsets.ModelViewSet):
         if producto_id:
             try:
                 inventario = Inventario.objects.get(producto_id=producto_id)
-                movimientos = MovimientoInventario.objects.filter(inventario_id=inventario)
-                serializer = self.get_serializer(movimientos, many=True)
-                return Response(serializer.data)
+                movimientos = self.get_queryset().filter(inventario_id=inventario)
+                return self.paginar(movimientos)
             except Inventario.DoesNotExist:
                 return Response({'error': 'Producto no encontrado en inventario'}, status=status.HTTP_404_NOT_FOUND)
         return Response({'error': 'ID de producto requerido'}, status=status.HTTP_400_BAD_REQUEST)
@@ -200,33 +315,75 @@ class MovimientoInventarioViewSet(viewsets.ModelViewSet):
                 fecha_inicio = datetime.strptime(fecha_inicio, '%Y-%m-%d').date()
                 fecha_fin = datetime.strptime(fecha_fin, '%Y-%m-%d').date()
                 
-                movimientos = MovimientoInventario.objects.filter(
+                movimientos = self.get_queryset().filter(
                     fecha__range=[fecha_inicio, fecha_fin]
                 )
-                serializer = self.get_serializer(movimientos, many=True)
-                return Response(serializer.data)
+                return self.paginar(movimientos)
             except ValueError:
                 return Response({'error': 'Formato de fecha inválido (YYYY-MM-DD)'}, status=status.HTTP_400_BAD_REQUEST)
         return Response({'error': 'Fechas de inicio y fin requeridas'}, status=status.HTTP_400_BAD_REQUEST)
     
+    @action(detail=False, methods=['get'])
+    def serie(self, request):
+        """Totales de ENTRADA y SALIDA por día, semana o mes, agregados en la base de datos
+
+        ?fecha_inicio=&fecha_fin= (requeridas), ?periodo=dia|semana|mes,
+        ?agrupar=tipo,producto,categoria, ?producto_id=, ?categoria_id= y
+        ?rellenar=1 para incluir los períodos sin movimientos con total 0.
+        """
+        try:
+            fecha_inicio = datetime.strptime(request.query_params.get('fecha_inicio', ''), '%Y-%m-%d').date()
+            fecha_fin = datetime.strptime(request.query_params.get('fecha_fin', ''), '%Y-%m-%d').date()
+        except ValueError:
+            return Response({'error': 'Fechas de inicio y fin requeridas (YYYY-MM-DD)'}, status=status.HTTP_400_BAD_REQUEST)
+        if fecha_inicio > fecha_fin:
+            return Response({'error': 'La fecha de inicio es posterior a la final'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        periodo = request.query_params.get('periodo', 'mes')
+        if periodo not in series.PERIODOS:
+            return Response({'error': 'Periodo debe ser dia, semana o mes'}, status=status.HTTP_400_BAD_REQUEST)
+        agrupar = [clave.strip() for clave in request.query_params.get('agrupar', 'tipo').split(',') if clave.strip()]
+        if any(clave not in series.AGRUPACIONES for clave in agrupar) or len(set(agrupar)) != len(agrupar):
+            return Response({'error': 'Agrupar admite tipo, producto y categoria'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            producto_id = request.query_params.get('producto_id')
+            producto_id = int(producto_id) if producto_id else None
+            categoria_id = request.query_params.get('categoria_id')
+            categoria_id = int(categoria_id) if categoria_id else None
+        except ValueError:
+            return Response({'error': 'Los IDs deben ser números'}, status=status.HTTP_400_BAD_REQUEST)
+        rellenar = request.query_params.get('rellenar', '').lower() in ('1', 'true', 'si', 'sí')
+        
+        try:
+            datos = series.serie(
+                fecha_inicio, fecha_fin, periodo, agrupar,
+                producto_id=producto_id, categoria_id=categoria_id, rellenar=rellenar
+            )
+        except ValueError as error:
+            return Response({'error': str(error)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({
+            'periodo': periodo,
+            'fecha_inicio': fecha_inicio,
+            'fecha_fin': fecha_fin,
+            'agrupar': agrupar,
+            'datos': datos,
+        })
+    
     def list(self, request):
         """Obtener historial de movimientos"""
-        queryset = self.get_queryset().order_by('-fecha')
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+        return self.paginar(self.get_queryset())
     
     @action(detail=False, methods=['get'])
     def por_usuario(self, request):
         """Obtener movimientos por usuario"""
         usuario_id = request.query_params.get('usuario_id')
         if usuario_id:
-            movimientos = MovimientoInventario.objects.filter(idusuario_id=usuario_id)
-            serializer = self.get_serializer(movimientos, many=True)
-            return Response(serializer.data)
+            movimientos = self.get_queryset().filter(idusuario_id=usuario_id)
+            return self.paginar(movimientos)
         return Response({'error': 'ID de usuario requerido'}, status=status.HTTP_400_BAD_REQUEST)
 
-class DetalleEntradaSalidaViewSet(viewsets.ModelViewSet):
-    queryset = DetalleEntradaSalida.objects.all()
+class DetalleEntradaSalidaViewSet(CamposDispersosMixin, viewsets.ModelViewSet):
+    queryset = DetalleEntradaSalida.objects.select_related('identradainventario')
     serializer_class = DetalleEntradaSalidaSerializer
     
     def create(self, request):
@@ -242,9 +399,8 @@ class DetalleEntradaSalidaViewSet(viewsets.ModelViewSet):
         """Obtener detalles por movimiento"""
         movimiento_id = request.query_params.get('movimiento_id')
         if movimiento_id:
-            detalles = DetalleEntradaSalida.objects.filter(identradainventario_id=movimiento_id)
-            serializer = self.get_serializer(detalles, many=True)
-            return Response(serializer.data)
+            detalles = self.get_queryset().filter(identradainventario_id=movimiento_id)
+            return Response(self.listar(detalles))
         return Response({'error': 'ID de movimiento requerido'}, status=status.HTTP_400_BAD_REQUEST)
     
     def update(self, request, pk=None):
@@ -259,8 +415,8 @@ class DetalleEntradaSalidaViewSet(viewsets.ModelViewSet):
         except DetalleEntradaSalida.DoesNotExist:
             return Response({'error': 'Detalle no encontrado'}, status=status.HTTP_404_NOT_FOUND)
 
-class ProductosVencimientoViewSet(viewsets.ModelViewSet):
-    queryset = ProductosVencimiento.objects.all()
+class ProductosVencimientoViewSet(CamposDispersosMixin, viewsets.ModelViewSet):
+    queryset = ProductosVencimiento.objects.select_related('producto_id')
     serializer_class = ProductosVencimientoSerializer
     
     def create(self, request):
@@ -279,25 +435,23 @@ class ProductosVencimientoViewSet(viewsets.ModelViewSet):
             dias_adelante = int(dias_adelante)
             fecha_limite = timezone.now().date() + timedelta(days=dias_adelante)
             
-            productos = ProductosVencimiento.objects.filter(
+            productos = self.get_queryset().filter(
                 fecha_vencimiento__lte=fecha_limite,
                 fecha_vencimiento__gte=timezone.now().date()
             ).order_by('fecha_vencimiento')
             
-            serializer = self.get_serializer(productos, many=True)
-            return Response(serializer.data)
+            return Response(self.listar(productos))
         except ValueError:
             return Response({'error': 'Días debe ser un número'}, status=status.HTTP_400_BAD_REQUEST)
     
     @action(detail=False, methods=['get'])
     def vencidos(self, request):
         """Obtener productos vencidos"""
-        productos = ProductosVencimiento.objects.filter(
+        productos = self.get_queryset().filter(
             fecha_vencimiento__lt=timezone.now().date()
         ).order_by('fecha_vencimiento')
         
-        serializer = self.get_serializer(productos, many=True)
-        return Response(serializer.data)
+        return Response(self.listar(productos))
     
     @action(detail=True, methods=['patch'])
     def marcar_notificado(self, request, pk=None):
@@ -315,140 +469,124 @@ class ProductosVencimientoViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'])
     def no_notificados(self, request):
         """Obtener productos no notificados"""
-        productos = ProductosVencimiento.objects.filter(notificado=False)
-        serializer = self.get_serializer(productos, many=True)
-        return Response(serializer.data)
+        productos = self.get_queryset().filter(notificado=False)
+        return Response(self.listar(productos))
     
     @action(detail=False, methods=['get'])
     def por_producto(self, request):
         """Listar vencimientos por producto"""
         producto_id = request.query_params.get('producto_id')
         if producto_id:
-            vencimientos = ProductosVencimiento.objects.filter(producto_id=producto_id)
-            serializer = self.get_serializer(vencimientos, many=True)
-            return Response(serializer.data)
+            vencimientos = self.get_queryset().filter(producto_id=producto_id)
+            return Response(self.listar(vencimientos))
         return Response({'error': 'ID de producto requerido'}, status=status.HTTP_400_BAD_REQUEST)
 
 # Vistas para reportes y estadísticas
-from rest_framework.views import APIView
-
 class ReportesView(APIView):
+    renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES + [CSVRenderer, NDJSONRenderer]
     
     def get(self, request, tipo_reporte):
-        """Generar diferentes tipos de reportes"""
-        
-        if tipo_reporte == 'stock-actual':
-            inventarios = Inventario.objects.select_related('producto').all()
-            data = []
-            for inv in inventarios:
-                data.append({
-                    'producto_id': inv.producto.idproducto,
-                    'producto_nombre': inv.producto.nombre,
-                    'stock_actual': inv.cantidad,
-                    'fecha_actualizacion': inv.fecha_actualizacion
-                })
-            return Response({'reporte': 'Stock Actual', 'data': data})
-        
-        elif tipo_reporte == 'movimientos-periodo':
-            fecha_inicio = request.query_params.get('fecha_inicio')
-            fecha_fin = request.query_params.get('fecha_fin')
-            
-            if not fecha_inicio or not fecha_fin:
-                return Response({'error': 'Fechas de inicio y fin requeridas'}, status=status.HTTP_400_BAD_REQUEST)
-            
-            try:
-                fecha_inicio = datetime.strptime(fecha_inicio, '%Y-%m-%d').date()
-                fecha_fin = datetime.strptime(fecha_fin, '%Y-%m-%d').date()
-                
-                movimientos = MovimientoInventario.objects.filter(
-                    fecha__range=[fecha_inicio, fecha_fin]
-                ).select_related('idusuario', 'inventario_id__producto')
-                
-                data = []
-                for mov in movimientos:
-                    data.append({
-                        'fecha': mov.fecha,
-                        'tipo_movimiento': mov.tipo_movimiento,
-                        'producto': mov.inventario_id.producto.nombre,
-                        'usuario': mov.idusuario.nombre
-                    })
-                
-                return Response({
-                    'reporte': 'Movimientos por Período',
-                    'fecha_inicio': fecha_inicio,
-                    'fecha_fin': fecha_fin,
-                    'data': data
-                })
-            except ValueError:
-                return Response({'error': 'Formato de fecha inválido'}, status=status.HTTP_400_BAD_REQUEST)
-        
-        elif tipo_reporte == 'productos-vencimiento':
-            productos = ProductosVencimiento.objects.select_related('producto_id').all()
-            data = []
-            for prod in productos:
-                data.append({
-                    'producto_nombre': prod.producto_id.nombre,
-                    'fecha_vencimiento': prod.fecha_vencimiento,
-                    'notificado': prod.notificado
-                })
-            return Response({'reporte': 'Productos Vencimiento', 'data': data})
+        """Generar diferentes tipos de reportes
+
+        Con ?format=csv o ?format=ndjson el reporte se transmite fila por fila.
+        """
+        inicio = time.perf_counter()
+        try:
+            reporte, columnas, filas = preparar_reporte(tipo_reporte, request.query_params)
+        except ValueError as error:
+            return Response({'error': str(error)}, status=status.HTTP_400_BAD_REQUEST)
         
-        elif tipo_reporte == 'proveedores-activos':
-            from suppliers.models import Proveedor
-            proveedores = Proveedor.objects.filter(estado=True)
-            data = []
-            for prov in proveedores:
-                data.append({
-                    'id': prov.idproveedor,
-                    'nombre': prov.nombre,
-                    'tipo': prov.tipo,
-                    'correo': prov.correo,
-                    'telefono': prov.telefono
-                })
-            return Response({'reporte': 'Proveedores Activos', 'data': data})
+        formato = request.accepted_renderer.format
+        if formato in ('csv', 'ndjson'):
+            return respuesta_streaming(request, tipo_reporte, columnas, filas, formato, inicio)
         
-        else:
-            return Response({'error': 'Tipo de reporte no válido'}, status=status.HTTP_400_BAD_REQUEST)
+        reporte['data'] = [dict(zip(columnas, fila)) for fila in filas]
+        return Response(reporte)
+
+def movimientos_recientes():
+    """Últimos 10 movimientos para el dashboard"""
+    movimientos = MovimientoInventario.objects.select_related(
+        'idusuario', 'inventario_id__producto'
+    ).order_by('-fecha', '-idmovimientoinventario')[:10]
+    return [
+        {
+            'fecha': mov.fecha,
+            'tipo': mov.tipo_movimiento,
+            'producto': mov.inventario_id.producto.nombre,
+            'usuario': mov.idusuario.nombre
+        }
+        for mov in movimientos
+    ]
 
 class DashboardView(APIView):
     
     def get(self, request):
         """Obtener estadísticas para dashboard"""
-        from productos.models import Producto
-        from suppliers.models import Proveedor
-        
-        # Total productos
-        total_productos = Producto.objects.count()
-        
-        # Valor total inventario (asumiendo precio unitario promedio)
-        inventarios = Inventario.objects.all()
-        valor_total = sum(inv.cantidad for inv in inventarios)  # Simplificado
-        
-        # Productos críticos (bajo stock)
-        productos_criticos = Inventario.objects.filter(cantidad__lte=10).count()
-        
-        # Movimientos recientes
-        movimientos_recientes = MovimientoInventario.objects.order_by('-fecha')[:10]
-        movimientos_data = []
-        for mov in movimientos_recientes:
-            movimientos_data.append({
-                'fecha': mov.fecha,
-                'tipo': mov.tipo_movimiento,
-                'producto': mov.inventario_id.producto.nombre,
-                'usuario': mov.idusuario.nombre
-            })
+        # Contadores mantenidos por las escrituras (inventory.contadores): una consulta
+        datos = contadores.leer()
+        datos['movimientos_recientes'] = movimientos_recientes()
+        return Response(datos)
+
+# Vistas asíncronas (ASGI): las consultas independientes corren en paralelo
+def respuesta_json(datos, status=200):
+    # Mismo formato y serializador que las respuestas de DRF
+    return HttpResponse(dumps(datos), status=status, content_type='application/json')
+
+class PoliticasDRFMixin:
+    """Autenticación, permisos y límites de DRF en las vistas asíncronas
+
+    APIView despacha de forma síncrona, así que las vistas asíncronas heredan
+    de View de Django. Antes de atenderlas se aplican las mismas clases por
+    defecto que en APIView (autenticación, permisos y throttling de
+    REST_FRAMEWORK), con las mismas respuestas de error. La negociación de
+    contenido no: responden JSON, o CSV/NDJSON con ?format=.
+    """
+
+    def rechazo_drf(self, request):
+        """None si la petición pasa; si no, la respuesta de error de DRF"""
+        vista = APIView()
+        vista.headers = {}
+        vista.request = vista.initialize_request(request)
+        try:
+            vista.perform_authentication(vista.request)
+            vista.check_permissions(vista.request)
+            vista.check_throttles(vista.request)
+        except APIException as error:
+            error_drf = vista.handle_exception(error)
+            respuesta = respuesta_json(error_drf.data, status=error_drf.status_code)
+            for cabecera in ('WWW-Authenticate', 'Retry-After'):
+                if cabecera in error_drf:
+                    respuesta[cabecera] = error_drf[cabecera]
+            return respuesta
+        return None
+
+    async def dispatch(self, request, *args, **kwargs):
+        rechazo = await en_hilo(lambda: self.rechazo_drf(request))
+        if rechazo is not None:
+            return rechazo
+        return await super().dispatch(request, *args, **kwargs)
+
+class DashboardAsyncView(PoliticasDRFMixin, View):
+    
+    async def get(self, request):
+        """Dashboard con los contadores y los movimientos recientes consultados a la vez"""
+        datos, movimientos = await en_paralelo(contadores.leer, movimientos_recientes)
+        datos['movimientos_recientes'] = movimientos
+        return respuesta_json(datos)
+
+class ReportesAsyncView(PoliticasDRFMixin, View):
+    
+    async def get(self, request, tipo_reporte):
+        """Reportes sin bloquear el bucle de eventos; ?format=csv|ndjson transmite por bloques"""
+        inicio = time.perf_counter()
+        try:
+            reporte, columnas, filas = preparar_reporte(tipo_reporte, request.GET)
+        except ValueError as error:
+            return respuesta_json({'error': str(error)}, status=status.HTTP_400_BAD_REQUEST)
         
-        # Productos por vencer
-        fecha_limite = timezone.now().date() + timedelta(days=30)
-        productos_por_vencer = ProductosVencimiento.objects.filter(
-            fecha_vencimiento__lte=fecha_limite,
-            fecha_vencimiento__gte=timezone.now().date()
-        ).count()
+        formato = request.GET.get('format')
+        if formato in ('csv', 'ndjson'):
+            return respuesta_streaming(request, tipo_reporte, columnas, filas, formato, inicio, asincrono=True)
         
-        return Response({
-            'total_productos': total_productos,
-            'valor_inventario_total': valor_total,
-            'productos_criticos': productos_criticos,
-            'productos_por_vencer': productos_por_vencer,
-            'movimientos_recientes': movimientos_data
-        })
\ No newline at end of file
+        reporte['data'] = await en_hilo(lambda: [dict(zip(columnas, fila)) for fila in filas])
+        return respuesta_json(reporte)
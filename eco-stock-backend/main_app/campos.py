@@ -0,0 +1,179 @@
+"""Campos a pedido (?fields=) y listados de solo lectura sin instanciar modelos
+
+?fields=a,b,c limita la respuesta a esos campos del serializador, en list,
+retrieve y en las acciones de consulta. Los listados además pueden armarse
+directamente desde values_list(): para cada serializador se calcula una vez
+qué ruta del ORM corresponde a cada campo y cómo se representa su valor, y
+cada fila se construye con esa tabla, sin instancia de modelo ni llamada al
+serializador por fila. La salida es la misma que la del serializador.
+
+Un serializador solo usa el camino rápido si todos sus campos se pueden
+leer con values_list(): campos del modelo, claves foráneas (su id) y campos
+de solo lectura con source a través de claves foráneas obligatorias. Si
+tiene SerializerMethodField, serializadores anidados, relaciones múltiples
+o propiedades del modelo, se usa el serializador normal.
+"""
+from datetime import date
+
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import ISO_8601, serializers, status
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+
+# Campos cuya representación es el mismo valor que devuelve la base de datos
+SIN_CONVERSION = {
+    serializers.CharField.to_representation,
+    serializers.IntegerField.to_representation,
+    serializers.BooleanField.to_representation,
+}
+
+_mapeos = {}
+_legibles = {}
+
+
+class CamposInvalidos(Exception):
+    pass
+
+
+def nombres_pedidos(request):
+    """Campos de ?fields=a,b,c; None si no se pidió"""
+    valor = request.query_params.get('fields')
+    if valor is None:
+        return None
+    return [nombre.strip() for nombre in valor.split(',') if nombre.strip()]
+
+
+def legibles(serializer_class):
+    """Nombres de los campos que el serializador devuelve"""
+    if serializer_class not in _legibles:
+        _legibles[serializer_class] = [
+            nombre for nombre, campo in serializer_class().fields.items() if not campo.write_only
+        ]
+    return _legibles[serializer_class]
+
+
+def formato_iso(campo, por_defecto):
+    formato = getattr(campo, 'format', por_defecto)
+    return isinstance(formato, str) and formato.lower() == ISO_8601
+
+
+def ruta_orm(modelo, source):
+    """Ruta de values_list() para un source de DRF; None si no se puede leer así"""
+    partes = source.split('.')
+    for i, parte in enumerate(partes):
+        try:
+            campo = modelo._meta.get_field(parte)
+        except FieldDoesNotExist:
+            return None
+        if i == len(partes) - 1:
+            if campo.many_to_many or campo.one_to_many or (campo.one_to_one and not campo.concrete):
+                return None
+            return '__'.join(partes)
+        # Una relación opcional sin fila omitiría el campo en el serializador
+        if not campo.many_to_one or campo.null:
+            return None
+        modelo = campo.related_model
+    return None
+
+
+def mapear(serializer_class):
+    """[(nombre, ruta, convertir)] de los campos legibles; None si no admite values_list()"""
+    if serializer_class not in _mapeos:
+        modelo = serializer_class.Meta.model
+        mapeo = []
+        for nombre, campo in serializer_class().fields.items():
+            if campo.write_only:
+                continue
+            if isinstance(campo, (serializers.BaseSerializer, serializers.SerializerMethodField,
+                                  serializers.ManyRelatedField, serializers.HiddenField)) or (
+                isinstance(campo, serializers.RelatedField) and not isinstance(campo, serializers.PrimaryKeyRelatedField)
+            ):
+                mapeo = None
+                break
+            ruta = ruta_orm(modelo, campo.source) if campo.source != '*' else None
+            if ruta is None:
+                mapeo = None
+                break
+            if isinstance(campo, serializers.PrimaryKeyRelatedField):
+                # values_list() ya devuelve el id de la relación
+                convertir = None if campo.pk_field is None else campo.pk_field.to_representation
+            elif isinstance(campo, serializers.ModelField):
+                # Clave foránea usada como clave primaria: también es su id
+                if not campo.model_field.is_relation:
+                    mapeo = None
+                    break
+                convertir = None
+            elif type(campo).to_representation in SIN_CONVERSION:
+                convertir = None
+            elif type(campo) is serializers.DateField and formato_iso(campo, api_settings.DATE_FORMAT):
+                convertir = date.isoformat
+            else:
+                convertir = campo.to_representation
+            mapeo.append((nombre, ruta, convertir))
+        _mapeos[serializer_class] = mapeo
+    return _mapeos[serializer_class]
+
+
+def filas(queryset, mapeo):
+    """Diccionarios de salida desde values_list() con el mapeo precalculado"""
+    nombres = [nombre for nombre, _, _ in mapeo]
+    conversiones = [(i, convertir) for i, (_, _, convertir) in enumerate(mapeo) if convertir is not None]
+    resultado = []
+    for fila in queryset.values_list(*(ruta for _, ruta, _ in mapeo)).iterator(chunk_size=2000):
+        if conversiones:
+            fila = list(fila)
+            for i, convertir in conversiones:
+                if fila[i] is not None:
+                    fila[i] = convertir(fila[i])
+        resultado.append(dict(zip(nombres, fila)))
+    return resultado
+
+
+class CamposDispersosMixin:
+    """?fields= en las lecturas de un ViewSet y listados rápidos con listar()
+
+    Va antes de ModelViewSet en las bases. Las vistas de listado llaman a
+    self.listar(queryset) en lugar de serializar con many=True.
+    """
+    lista_rapida = True
+
+    def campos_pedidos(self):
+        """Campos de ?fields= validados contra el serializador; None si no se pidió"""
+        if self.request.method not in ('GET', 'HEAD'):
+            return None
+        pedidos = nombres_pedidos(self.request)
+        if pedidos is None:
+            return None
+        disponibles = legibles(self.get_serializer_class())
+        invalidos = [nombre for nombre in pedidos if nombre not in disponibles]
+        if invalidos:
+            raise CamposInvalidos(f"Campos no válidos: {', '.join(invalidos)}")
+        return pedidos
+
+    def get_serializer(self, *args, **kwargs):
+        serializer = super().get_serializer(*args, **kwargs)
+        pedidos = self.campos_pedidos()
+        if pedidos:
+            destino = getattr(serializer, 'child', serializer)
+            for nombre in list(destino.fields):
+                if nombre not in pedidos:
+                    destino.fields.pop(nombre)
+        return serializer
+
+    def listar(self, queryset):
+        """Datos del listado: values_list() si el serializador lo admite, si no el serializador"""
+        mapeo = mapear(self.get_serializer_class()) if self.lista_rapida else None
+        if mapeo is None:
+            return self.get_serializer(queryset, many=True).data
+        pedidos = self.campos_pedidos()
+        if pedidos:
+            mapeo = [campo for campo in mapeo if campo[0] in pedidos]
+        return filas(queryset, mapeo)
+
+    def list(self, request, *args, **kwargs):
+        return Response(self.listar(self.filter_queryset(self.get_queryset())))
+
+    def handle_exception(self, exc):
+        if isinstance(exc, CamposInvalidos):
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        return super().handle_exception(exc)
@@ -0,0 +1,138 @@
+"""Respuestas condicionales (ETag / If-None-Match) para los catálogos
+
+Cada catálogo tiene una versión en VersionCatalogo que se incrementa en la
+misma transacción que cualquier escritura: señales post_save/post_delete y,
+para update() y bulk_*() que no las disparan, la señal escritura_masiva que
+envía EscriturasMasivasQuerySet. El ETag de una respuesta se
+deriva de esa versión y de la URL y el formato pedidos, así que comprobar
+If-None-Match cuesta una lectura por clave primaria: sin la consulta del
+listado ni el serializador.
+
+La versión se lee antes que los datos: un ETag nunca acompaña a datos más
+antiguos que su versión.
+"""
+import hashlib
+import time
+
+from django.db import IntegrityError, models, transaction
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import Signal
+from django.utils.cache import patch_cache_control
+from django.utils.http import parse_etags
+from rest_framework import status
+from rest_framework.response import Response
+
+
+# Enviada (sender=modelo) después de un update() o bulk_*() de ese modelo
+escritura_masiva = Signal()
+
+
+class EscriturasMasivasQuerySet(models.QuerySet):
+    """Envía escritura_masiva después de update() y bulk_*(), que no disparan post_save"""
+
+    def bulk_create(self, objs, *args, **kwargs):
+        creados = super().bulk_create(objs, *args, **kwargs)
+        escritura_masiva.send(sender=self.model)
+        return creados
+
+    def bulk_update(self, objs, fields, *args, **kwargs):
+        filas = super().bulk_update(objs, fields, *args, **kwargs)
+        escritura_masiva.send(sender=self.model)
+        return filas
+
+    def update(self, **kwargs):
+        # Después de escribir: un ETag nuevo nunca va con datos viejos
+        filas = super().update(**kwargs)
+        escritura_masiva.send(sender=self.model)
+        return filas
+
+
+def etiqueta(modelo):
+    return modelo._meta.label_lower
+
+
+def incrementar(modelo):
+    """Nueva versión del catálogo; crea la fila si no existe"""
+    from productos.models import VersionCatalogo
+
+    version = VersionCatalogo.objects.filter(modelo=etiqueta(modelo))
+    if version.update(version=F('version') + 1):
+        return
+    try:
+        with transaction.atomic():
+            # Un valor inicial único evita repetir ETags después de recrear la fila
+            VersionCatalogo.objects.create(modelo=etiqueta(modelo), version=time.time_ns())
+        return
+    except IntegrityError:
+        pass
+    version.update(version=F('version') + 1)
+
+
+def version(modelo):
+    from productos.models import VersionCatalogo
+
+    actual = VersionCatalogo.objects.filter(modelo=etiqueta(modelo)).values_list('version', flat=True).first()
+    if actual is None:
+        incrementar(modelo)
+        actual = VersionCatalogo.objects.filter(modelo=etiqueta(modelo)).values_list('version', flat=True).first()
+    return actual
+
+
+def al_escribir(sender, **kwargs):
+    incrementar(sender)
+
+
+def versionar(*modelos):
+    """Incrementar la versión del catálogo en cada escritura de los modelos"""
+    for modelo in modelos:
+        post_save.connect(al_escribir, sender=modelo, dispatch_uid=f'versionar_{etiqueta(modelo)}')
+        post_delete.connect(al_escribir, sender=modelo, dispatch_uid=f'versionar_{etiqueta(modelo)}')
+        escritura_masiva.connect(al_escribir, sender=modelo, dispatch_uid=f'versionar_{etiqueta(modelo)}')
+
+
+def calcular_etag(version_actual, request):
+    variante = f'{request.get_full_path()}|{request.accepted_media_type}'
+    return f'"{version_actual}-{hashlib.md5(variante.encode(), usedforsecurity=False).hexdigest()[:16]}"'
+
+
+def coincide(if_none_match, etag):
+    if not if_none_match:
+        return False
+    etags = parse_etags(if_none_match)
+    # If-None-Match usa comparación débil: W/"x" equivale a "x"
+    return '*' in etags or etag in (e.removeprefix('W/') for e in etags)
+
+
+class NoModificado(Exception):
+    pass
+
+
+class RespuestaCondicionalMixin:
+    """ETag en list y retrieve de un ViewSet, y 304 si el cliente ya tiene esa versión
+
+    Va antes de ModelViewSet en las bases; no depende de cómo estén escritos
+    list() y retrieve().
+    """
+    acciones_condicionales = ('list', 'retrieve')
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        self.etag = None
+        if request.method in ('GET', 'HEAD') and self.action in self.acciones_condicionales:
+            self.etag = calcular_etag(version(self.queryset.model), request)
+            if coincide(request.META.get('HTTP_IF_NONE_MATCH'), self.etag):
+                raise NoModificado
+
+    def handle_exception(self, exc):
+        if isinstance(exc, NoModificado):
+            return Response(status=status.HTTP_304_NOT_MODIFIED)
+        return super().handle_exception(exc)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if getattr(self, 'etag', None) and response.status_code in (200, 304):
+            response['ETag'] = self.etag
+            # El navegador guarda la respuesta pero revalida siempre con If-None-Match
+            patch_cache_control(response, private=True, no_cache=True)
+        return response
@@ -0,0 +1,72 @@
+"""Renderer y parser JSON rápidos, con orjson si está instalado
+
+La salida es la misma que la del JSONRenderer de DRF (UTF-8 sin escapar,
+compacta, fechas y horas con milisegundos y 'Z', Decimal como número, UUID
+como texto): orjson serializa nativamente dict, list, str, números, date y
+UUID, y lo que no conoce (datetime, time, Decimal, QuerySet, textos
+traducibles...) pasa por el mismo encoder de DRF. Sin orjson, o cuando la
+respuesta pide sangría (application/json; indent=4) o el valor no cabe en
+orjson (enteros de más de 64 bits), se usa el camino estándar de DRF.
+
+Diferencia conocida: orjson escribe NaN e infinito como null, mientras que
+DRF (STRICT_JSON) los rechaza; los serializadores del proyecto no los generan.
+"""
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Separadores de línea que JavaScript no acepta dentro de un texto
+SEPARADORES_JS = ((b'\xe2\x80\xa8', b'\\u2028'), (b'\xe2\x80\xa9', b'\\u2029'))
+
+if orjson is not None:
+    # Las fechas con hora pasan por el encoder de DRF para conservar su formato
+    OPCIONES = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+
+
+def disponible():
+    return orjson is not None
+
+
+class JSONRapidoRenderer(JSONRenderer):
+    """JSONRenderer de DRF con orjson como serializador"""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or data is None or not self.compact or self.ensure_ascii:
+            return super().render(data, accepted_media_type, renderer_context)
+        if self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            ret = orjson.dumps(data, default=self.encoder_class().default, option=OPCIONES)
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        for separador, escapado in SEPARADORES_JS:
+            if separador in ret:
+                ret = ret.replace(separador, escapado)
+        return ret
+
+
+class JSONRapidoParser(JSONParser):
+    """JSONParser de DRF con orjson para los cuerpos en UTF-8"""
+    renderer_class = JSONRapidoRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        if orjson is None or encoding.lower().replace('_', '-') not in ('utf-8', 'utf8'):
+            return super().parse(stream, media_type, parser_context)
+        try:
+            # orjson rechaza NaN e infinito, como el modo estricto de DRF
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError('JSON parse error - %s' % str(exc))
+
+
+def dumps(datos):
+    """Serializar fuera de DRF (vistas Django puras) con el mismo formato"""
+    return JSONRapidoRenderer().render(datos)
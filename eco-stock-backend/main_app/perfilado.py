@@ -0,0 +1,376 @@
+"""Perfilado por petición (opcional)
+
+PerfiladoSQLMiddleware mide, para las peticiones elegidas, el número de
+consultas SQL y su tiempo, las consultas repetidas (la firma de un N+1), el
+tiempo en serializadores, la vista y el render. Lo publica en la cabecera
+Server-Timing y en una línea JSON del logger 'main_app.perfilado'.
+
+Una petición se perfila si su ruta empieza por uno de PERFILADO_SQL_PREFIJOS y:
+- PERFILADO_SQL_ACTIVO es True, o
+- cae en la fracción aleatoria PERFILADO_SQL_MUESTREO, o
+- trae la cabecera X-Perfilar-SQL con el valor de PERFILADO_SQL_TOKEN.
+
+Sin ninguna de las tres opciones el middleware se descarta al arrancar y los
+serializadores de DRF quedan sin instrumentar. Las peticiones no elegidas
+solo pagan la comprobación de la ruta (y cada consulta, la lectura de una
+variable de contexto). El perfil activo viaja en una ContextVar, así que
+también se cuentan las consultas que las vistas asíncronas lanzan en otros
+hilos. El tiempo SQL es el de ejecución de cada sentencia: la lectura de las
+filas (fetch) ocurre después y queda dentro del tiempo de la vista o de los
+serializadores.
+
+PerfiladorPeticionMiddleware ejecuta una sola petición bajo un perfilador
+(pyinstrument si está instalado, si no cProfile) cuando trae la cabecera
+X-Perfilar o el parámetro ?perfilar= con el valor de PERFILADOR_TOKEN. El
+perfil se guarda en PERFILADOR_DIRECTORIO (se conservan los
+PERFILADOR_MAXIMO_ARCHIVOS más recientes) y su nombre vuelve en la cabecera
+X-Perfil. Sin PERFILADOR_TOKEN el middleware se descarta al arrancar.
+"""
+import contextvars
+import cProfile
+import hmac
+import json
+import logging
+import random
+import re
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.utils import timezone
+from rest_framework import serializers
+
+try:
+    import pyinstrument
+    from pyinstrument.renderers import SpeedscopeRenderer
+except ImportError:
+    pyinstrument = None
+
+logger = logging.getLogger(__name__)
+
+CABECERA = 'HTTP_X_PERFILAR_SQL'
+
+_perfil_actual = contextvars.ContextVar('perfil_sql', default=None)
+
+
+class Perfil:
+    """Mediciones de una petición"""
+
+    def __init__(self):
+        self.inicio = time.perf_counter()
+        self.consultas = Counter()
+        self.total_consultas = 0
+        self.tiempo_sql = 0.0
+        self.serializacion = 0.0
+        self.serializando = False
+        self.inicio_vista = None
+        self.fin_vista = None
+        # Las vistas asíncronas pueden consultar desde varios hilos a la vez
+        self.lock = threading.Lock()
+
+    def registrar_consulta(self, execute, sql, params, many, context):
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duracion = time.perf_counter() - inicio
+            with self.lock:
+                self.tiempo_sql += duracion
+                self.total_consultas += 1
+                # Misma sentencia con distintos parámetros = misma clave
+                self.consultas[sql] += 1
+
+    def repetidas(self, umbral):
+        """[(sql, veces)] de las sentencias ejecutadas al menos umbral veces"""
+        return [(sql, veces) for sql, veces in self.consultas.most_common() if veces >= umbral]
+
+    def resumen(self, request, response, umbral):
+        fin = time.perf_counter()
+        fin_vista = self.fin_vista or fin
+        repetidas = self.repetidas(umbral)
+        return {
+            'metodo': request.method,
+            'ruta': request.path,
+            'estado': response.status_code,
+            'consultas': self.total_consultas,
+            'consultas_repetidas': sum(veces - 1 for veces in self.consultas.values()),
+            'posible_n_mas_1': bool(repetidas),
+            'sql_ms': round(self.tiempo_sql * 1000, 2),
+            'serializacion_ms': round(self.serializacion * 1000, 2),
+            'vista_ms': round((fin_vista - (self.inicio_vista or self.inicio)) * 1000, 2),
+            'render_ms': round((fin - fin_vista) * 1000, 2),
+            'total_ms': round((fin - self.inicio) * 1000, 2),
+            'repetidas': [{'sql': sql[:300], 'veces': veces} for sql, veces in repetidas[:5]],
+        }
+
+
+def token_valido(valor, token):
+    """Comparar en tiempo constante el valor recibido con el token configurado"""
+    if not token or valor is None:
+        return False
+    return hmac.compare_digest(valor.encode(), token.encode())
+
+
+def server_timing(datos):
+    """Valor de la cabecera Server-Timing a partir del resumen"""
+    return ', '.join([
+        f'sql;dur={datos["sql_ms"]};desc="{datos["consultas"]} consultas"',
+        f'sql-rep;desc="{datos["consultas_repetidas"]} repetidas"',
+        f'ser;dur={datos["serializacion_ms"]};desc="serializadores"',
+        f'vista;dur={datos["vista_ms"]}',
+        f'render;dur={datos["render_ms"]}',
+        f'total;dur={datos["total_ms"]}',
+    ])
+
+
+def registrar_consulta(execute, sql, params, many, context):
+    """Envoltura de ejecución instalada en todas las conexiones"""
+    perfil = _perfil_actual.get()
+    if perfil is None:
+        return execute(sql, params, many, context)
+    return perfil.registrar_consulta(execute, sql, params, many, context)
+
+
+def instrumentar_conexion(sender=None, connection=None, **kwargs):
+    if registrar_consulta not in connection.execute_wrappers:
+        connection.execute_wrappers.append(registrar_consulta)
+
+
+def _medir_data(propiedad):
+    """Envolver la propiedad .data de un serializador para acumular su tiempo"""
+    obtener = propiedad.fget
+
+    def data(self):
+        perfil = _perfil_actual.get()
+        if perfil is None or perfil.serializando:
+            # Sin perfil, o un serializador anidado ya medido por el exterior
+            return obtener(self)
+        perfil.serializando = True
+        inicio = time.perf_counter()
+        try:
+            return obtener(self)
+        finally:
+            perfil.serializacion += time.perf_counter() - inicio
+            perfil.serializando = False
+
+    data.perfilado = True
+    return property(data, doc=propiedad.__doc__)
+
+
+def instrumentar_serializadores():
+    """Medir Serializer.data y ListSerializer.data sin tocar cada vista"""
+    for clase in (serializers.BaseSerializer, serializers.Serializer, serializers.ListSerializer):
+        propiedad = clase.__dict__.get('data')
+        if propiedad is not None and not getattr(propiedad.fget, 'perfilado', False):
+            setattr(clase, 'data', _medir_data(propiedad))
+
+
+class PerfiladoSQLMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not (
+            getattr(settings, 'PERFILADO_SQL_ACTIVO', False)
+            or getattr(settings, 'PERFILADO_SQL_MUESTREO', 0.0) > 0
+            or getattr(settings, 'PERFILADO_SQL_TOKEN', '')
+        ):
+            # Nada puede elegir una petición: fuera de la cadena y sin tocar DRF
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.prefijos = tuple(getattr(settings, 'PERFILADO_SQL_PREFIJOS', ()))
+        self.umbral = getattr(settings, 'PERFILADO_SQL_UMBRAL_REPETIDAS', 3)
+        instrumentar_serializadores()
+        connection_created.connect(instrumentar_conexion, dispatch_uid='perfilado_sql')
+        for conexion in connections.all(initialized_only=True):
+            instrumentar_conexion(connection=conexion)
+        if iscoroutinefunction(get_response):
+            # Cadena asíncrona: ganchos async para no saltar al hilo síncrono
+            markcoroutinefunction(self)
+            self.process_view = self.aprocess_view
+            self.process_template_response = self.aprocess_template_response
+
+    def perfilar(self, request):
+        """Decidir si la petición se perfila"""
+        if not request.path.startswith(self.prefijos):
+            return False
+        if getattr(settings, 'PERFILADO_SQL_ACTIVO', False):
+            return True
+        if token_valido(request.META.get(CABECERA), getattr(settings, 'PERFILADO_SQL_TOKEN', '')):
+            return True
+        muestreo = getattr(settings, 'PERFILADO_SQL_MUESTREO', 0.0)
+        return muestreo > 0 and random.random() < muestreo
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not self.perfilar(request):
+            return self.get_response(request)
+
+        perfil = Perfil()
+        request.perfil_sql = perfil
+        marca = _perfil_actual.set(perfil)
+        try:
+            response = self.get_response(request)
+        finally:
+            _perfil_actual.reset(marca)
+        return self.publicar(request, response, perfil)
+
+    async def __acall__(self, request):
+        if not self.perfilar(request):
+            return await self.get_response(request)
+
+        perfil = Perfil()
+        request.perfil_sql = perfil
+        marca = _perfil_actual.set(perfil)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _perfil_actual.reset(marca)
+        return self.publicar(request, response, perfil)
+
+    def publicar(self, request, response, perfil):
+        datos = perfil.resumen(request, response, self.umbral)
+        response['Server-Timing'] = server_timing(datos)
+        nivel = logging.WARNING if datos['posible_n_mas_1'] else logging.INFO
+        logger.log(nivel, json.dumps(datos, ensure_ascii=False), extra={'perfil_sql': datos})
+        return response
+
+    def marcar_inicio_vista(self, request):
+        perfil = getattr(request, 'perfil_sql', None)
+        if perfil is not None:
+            perfil.inicio_vista = time.perf_counter()
+
+    def marcar_fin_vista(self, request):
+        # Las respuestas de DRF se renderizan después de process_template_response
+        perfil = getattr(request, 'perfil_sql', None)
+        if perfil is not None:
+            perfil.fin_vista = time.perf_counter()
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        self.marcar_inicio_vista(request)
+
+    def process_template_response(self, request, response):
+        self.marcar_fin_vista(request)
+        return response
+
+    async def aprocess_view(self, request, view_func, view_args, view_kwargs):
+        self.marcar_inicio_vista(request)
+
+    async def aprocess_template_response(self, request, response):
+        self.marcar_fin_vista(request)
+        return response
+
+
+class PerfiladorPeticionMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.token = getattr(settings, 'PERFILADOR_TOKEN', '')
+        if not self.token:
+            # Sin token nadie puede pedir un perfil: fuera de la cadena
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.directorio = Path(getattr(settings, 'PERFILADOR_DIRECTORIO', 'perfiles'))
+        self.maximo = getattr(settings, 'PERFILADOR_MAXIMO_ARCHIVOS', 50)
+        motor = getattr(settings, 'PERFILADOR_MOTOR', 'auto')
+        self.motor = ('pyinstrument' if pyinstrument else 'cprofile') if motor == 'auto' else motor
+        if self.motor == 'pyinstrument' and pyinstrument is None:
+            raise ImportError('PERFILADOR_MOTOR = "pyinstrument" requiere instalar pyinstrument')
+        self.intervalo = getattr(settings, 'PERFILADOR_INTERVALO', 0.001)
+        # cProfile y pyinstrument no admiten dos perfiles activos a la vez en el proceso
+        self.lock = threading.Lock()
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def solicitado(self, request):
+        if token_valido(request.META.get('HTTP_X_PERFILAR'), self.token):
+            return True
+        # Mirar la cadena cruda evita construir request.GET en las demás peticiones
+        return 'perfilar=' in request.META.get('QUERY_STRING', '') and token_valido(request.GET.get('perfilar'), self.token)
+
+    def iniciar(self):
+        if self.motor == 'pyinstrument':
+            # async_mode: en vistas asíncronas se atribuye el tiempo en await a la tarea
+            perfilador = pyinstrument.Profiler(interval=self.intervalo, async_mode='enabled')
+            perfilador.start()
+        else:
+            # cProfile solo ve el hilo actual (en ASGI, el del bucle de eventos)
+            perfilador = cProfile.Profile()
+            perfilador.enable()
+        return perfilador, time.perf_counter()
+
+    def detener(self, perfilador):
+        if self.motor == 'pyinstrument':
+            perfilador.stop()
+        else:
+            perfilador.disable()
+
+    def publicar(self, request, response, perfilador, inicio):
+        duracion = time.perf_counter() - inicio
+        archivo = self.guardar(perfilador, request, duracion)
+        response['X-Perfil'] = archivo.name
+        logger.info('Perfil de %s %s (%.0f ms): %s', request.method, request.path, duracion * 1000, archivo)
+        return response
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not self.solicitado(request):
+            return self.get_response(request)
+        if not self.lock.acquire(blocking=False):
+            response = self.get_response(request)
+            response['X-Perfil'] = 'ocupado'
+            return response
+        try:
+            perfilador, inicio = self.iniciar()
+            try:
+                response = self.get_response(request)
+            finally:
+                self.detener(perfilador)
+            return self.publicar(request, response, perfilador, inicio)
+        finally:
+            self.lock.release()
+
+    async def __acall__(self, request):
+        if not self.solicitado(request):
+            return await self.get_response(request)
+        if not self.lock.acquire(blocking=False):
+            response = await self.get_response(request)
+            response['X-Perfil'] = 'ocupado'
+            return response
+        try:
+            perfilador, inicio = self.iniciar()
+            try:
+                response = await self.get_response(request)
+            finally:
+                self.detener(perfilador)
+            return self.publicar(request, response, perfilador, inicio)
+        finally:
+            self.lock.release()
+
+    def guardar(self, perfilador, request, duracion):
+        """Escribir el perfil y aplicar la retención"""
+        self.directorio.mkdir(parents=True, exist_ok=True)
+        ruta = re.sub(r'[^A-Za-z0-9]+', '-', request.path).strip('-')[:60] or 'raiz'
+        base = f'perfil-{timezone.now():%Y%m%d-%H%M%S-%f}-{request.method}-{ruta}-{duracion * 1000:.0f}ms'
+        if self.motor == 'pyinstrument':
+            # Formato de speedscope.app (flamegraph)
+            archivo = self.directorio / f'{base}.speedscope.json'
+            archivo.write_text(perfilador.output(renderer=SpeedscopeRenderer()), encoding='utf-8')
+        else:
+            # pstats: snakeviz, flameprof o gprof2dot
+            archivo = self.directorio / f'{base}.prof'
+            perfilador.dump_stats(archivo)
+
+        perfiles = sorted(self.directorio.glob('perfil-*'), key=lambda p: p.stat().st_mtime, reverse=True)
+        for viejo in perfiles[self.maximo:]:
+            viejo.unlink(missing_ok=True)
+        return archivo
@@ -0,0 +1,37 @@
+"""Datos y aserciones compartidos por las pruebas de las apps"""
+from productos.models import Categoria, Producto, UnidadesMedida
+from users.models import Rol, Usuario
+
+
+class ConsultasMixin:
+    """El número de consultas de cada endpoint no debe crecer con las filas"""
+
+    def assertConsultas(self, cantidad, url):
+        with self.assertNumQueries(cantidad):
+            respuesta = self.client.get(url)
+        self.assertEqual(respuesta.status_code, 200, url)
+
+
+def crear_usuario(nombre='Ana', rol='Administrador'):
+    return Usuario.objects.create(nombre=nombre, contraseña='x', idrol=Rol.objects.get_or_create(nombre=rol)[0])
+
+
+def catalogo():
+    """(categoría, unidad de medida) comunes a todos los productos de prueba"""
+    categoria, _ = Categoria.objects.get_or_create(
+        nombre='Fertilizantes', defaults={'descripcion': 'd', 'tipo': 't', 'vida_util': '1 año', 'presentacion': 'saco'}
+    )
+    unidad, _ = UnidadesMedida.objects.get_or_create(nombre='Kilogramo', defaults={'abreviatura': 'kg'})
+    return categoria, unidad
+
+
+def crear_producto(nombre='Urea', lote='L1', descripcion='d'):
+    categoria, unidad = catalogo()
+    return Producto.objects.create(
+        nombre=nombre, descripcion=descripcion, lote=lote, idcategoria=categoria, unidad_medida_id=unidad
+    )
+
+
+def crear_productos(cantidad, nombre='Producto'):
+    """'<nombre> 0', '<nombre> 1'... con lotes L0, L1..."""
+    return [crear_producto(f'{nombre} {i}', f'L{i}') for i in range(cantidad)]
@@ -51,6 +51,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'main_app.perfilado.PerfiladorPeticionMiddleware',
+    'main_app.perfilado.PerfiladoSQLMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
@@ -96,14 +98,110 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.AllowAny',
     ],
+    # orjson si está instalado; si no, el JSON estándar de DRF
     'DEFAULT_RENDERER_CLASSES': [
-        'rest_framework.renderers.JSONRenderer',
+        'main_app.json_rapido.JSONRapidoRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'main_app.json_rapido.JSONRapidoParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
     ],
     'DEFAULT_AUTHENTICATION_CLASSES': [
         'rest_framework_simplejwt.authentication.JWTAuthentication',
     ]
 }
 
+# Paginación por cursor del historial de movimientos
+MOVIMIENTOS_PAGE_SIZE = 50
+MOVIMIENTOS_MAX_PAGE_SIZE = 500
+
+# Máximo de líneas aceptadas por registrar_lote
+MOVIMIENTOS_MAX_LOTE = 1000
+
+# Máximo de productos por consulta de stock_lote
+STOCK_LOTE_MAX_PRODUCTOS = 1000
+
+# Máximo de filas de /movimientos/serie/ con ?rellenar=1 (períodos x series)
+SERIES_MAX_PUNTOS = 100000
+
+# Paginación de la búsqueda de productos
+BUSQUEDA_PAGE_SIZE = 20
+BUSQUEDA_MAX_PAGE_SIZE = 100
+
+# Caché de stock (stock_actual / por_producto). Debe ser un backend compartido
+# por todos los procesos, p. ej. 'django.core.cache.backends.redis.RedisCache'
+# con LOCATION 'redis://...'. Con LocMem (por proceso) la caché solo se usa con
+# DEBUG o STOCK_CACHE_POR_PROCESO = True (un solo proceso); si no, se lee de la
+# base de datos y `manage.py check` avisa (inventory.W001)
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'stock': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'ecostock-stock',
+        'OPTIONS': {'MAX_ENTRIES': 100000},
+    },
+}
+STOCK_CACHE_ALIAS = 'stock'
+STOCK_CACHE_TIMEOUT = 300
+STOCK_CACHE_POR_PROCESO = False
+
+# Correo: consola en local; en producción configurar SMTP (EMAIL_HOST, ...)
+EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
+DEFAULT_FROM_EMAIL = 'EcoStock <no-reply@ecostock.local>'
+# Destinatarios de los avisos de vencimiento; vacío = usuarios administradores
+VENCIMIENTOS_DESTINATARIOS = []
+
+# Contadores del dashboard (inventory.contadores). Después de cambiar las
+# ranuras o el umbral hay que ejecutar reconciliar_contadores --reconstruir
+DASHBOARD_RANURAS = 16
+DASHBOARD_UMBRAL_CRITICO = 10
+DASHBOARD_DIAS_VENCIMIENTO = 30
+
+# Cierres de stock para consultar el stock a una fecha (inventory.cierres):
+# 'mensual' o 'diario'. cerrar_stock guarda el último período terminado
+CIERRES_PERIODO = 'mensual'
+
+# Perfilado SQL por petición (main_app.perfilado): Server-Timing y log JSON.
+# Desactivado salvo ACTIVO, muestreo o cabecera X-Perfilar-SQL con el token
+# (obligatorio también con DEBUG); sin ninguno el middleware se descarta al arrancar
+PERFILADO_SQL_ACTIVO = False
+PERFILADO_SQL_MUESTREO = 0.0
+PERFILADO_SQL_TOKEN = ''
+PERFILADO_SQL_PREFIJOS = ['/inventory/', '/productos/', '/suppliers/', '/api/']
+# Veces que debe repetirse una sentencia para señalar un posible N+1
+PERFILADO_SQL_UMBRAL_REPETIDAS = 3
+
+# Perfil de una sola petición bajo demanda (cabecera X-Perfilar o ?perfilar=
+# con este token). Vacío = desactivado, sin costo para ninguna petición
+PERFILADOR_TOKEN = ''
+PERFILADOR_DIRECTORIO = BASE_DIR / 'perfiles'
+PERFILADOR_MAXIMO_ARCHIVOS = 50
+# 'auto' usa pyinstrument si está instalado (salida speedscope) y si no cProfile (.prof)
+PERFILADOR_MOTOR = 'auto'
+PERFILADOR_INTERVALO = 0.001
+
+# Reportes en segundo plano (reports.trabajos): hilos por proceso, trabajos
+# en curso por usuario y resultados comprimidos en disco. Tiempos en segundos
+REPORTES_TRABAJADORES = 2
+REPORTES_MAXIMO_POR_USUARIO = 2
+REPORTES_DIRECTORIO = BASE_DIR / 'reportes_generados'
+REPORTES_TIEMPO_MAXIMO = 30 * 60
+REPORTES_RETENCION = 24 * 60 * 60
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'main_app.perfilado': {'handlers': ['console'], 'level': 'INFO', 'propagate': False},
+    },
+}
+
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=60),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=7),
@@ -0,0 +1,152 @@
+"""Búsqueda de texto completo sobre producto
+
+En MySQL se usa el índice FULLTEXT producto_busqueda_ft (nombre, descripcion,
+lote) en modo booleano. En los demás motores se usa un índice invertido propio
+(TerminoProducto): un término normalizado por fila con su peso en el producto.
+En ambos casos cada palabra de la consulta debe aparecer, al menos como prefijo,
+y los resultados se ordenan por relevancia.
+"""
+import re
+import unicodedata
+from collections import Counter
+from itertools import islice
+
+from django.db import connection, transaction
+from django.db.models import Case, Count, F, IntegerField, Q, Sum, When
+from django.db.models.expressions import RawSQL
+
+# Peso de cada campo en la relevancia del índice invertido
+PESOS = {'nombre': 3, 'lote': 2, 'descripcion': 1}
+# Un término exacto pesa más que la misma palabra encontrada como prefijo
+BONO_EXACTO = 2
+
+
+def usa_fulltext():
+    return connection.vendor == 'mysql'
+
+
+def normalizar(texto):
+    """Minúsculas y sin tildes, para que 'Fungicída' y 'fungicida' coincidan"""
+    texto = unicodedata.normalize('NFKD', texto or '')
+    return ''.join(c for c in texto if not unicodedata.combining(c)).lower()
+
+
+def tokenizar(texto):
+    return re.findall(r'\w+', normalizar(texto))
+
+
+def terminos_producto(nombre, descripcion, lote):
+    """Términos del producto con su peso acumulado por campo y frecuencia"""
+    pesos = Counter()
+    for campo, valor in (('nombre', nombre), ('descripcion', descripcion), ('lote', lote)):
+        for termino in tokenizar(valor):
+            pesos[termino[:64]] += PESOS[campo]
+    return pesos
+
+
+def indexar(productos):
+    """Reemplazar los términos de los productos dados en el índice invertido"""
+    from .models import TerminoProducto
+
+    if usa_fulltext():
+        return
+    productos = list(productos)
+    TerminoProducto.objects.filter(producto__in=productos).delete()
+    TerminoProducto.objects.bulk_create([
+        TerminoProducto(termino=termino, producto=producto, peso=peso)
+        for producto in productos
+        for termino, peso in terminos_producto(producto.nombre, producto.descripcion, producto.lote).items()
+    ])
+
+
+def filas_indice(productos):
+    """Tuplas (termino, producto_id, peso) de un iterable de (id, nombre, descripcion, lote)"""
+    for producto_id, nombre, descripcion, lote in productos:
+        for termino, peso in terminos_producto(nombre, descripcion, lote).items():
+            yield termino, producto_id, peso
+
+
+def reconstruir(tamano_lote=5000):
+    """Reconstruir el índice invertido completo con INSERT en lotes
+
+    Para cargas masivas que no pasan por Producto.save() (seed_ecostock,
+    importaciones). Devuelve el número de términos insertados.
+    """
+    from .models import Producto, TerminoProducto
+
+    if usa_fulltext():
+        return 0
+    opts = TerminoProducto._meta
+    columnas = ', '.join(connection.ops.quote_name(opts.get_field(campo).column) for campo in ('termino', 'producto', 'peso'))
+    sql = f'INSERT INTO {connection.ops.quote_name(opts.db_table)} ({columnas}) VALUES (%s, %s, %s)'
+
+    total = 0
+    with transaction.atomic():
+        TerminoProducto.objects.all().delete()
+        productos = Producto.objects.order_by('idproducto').values_list('idproducto', 'nombre', 'descripcion', 'lote')
+        filas = filas_indice(productos.iterator(chunk_size=tamano_lote))
+        with connection.cursor() as cursor:
+            while True:
+                lote = list(islice(filas, tamano_lote))
+                if not lote:
+                    break
+                cursor.executemany(sql, lote)
+                total += len(lote)
+    return total
+
+
+def _rango(termino):
+    # Rango en lugar de startswith: LIKE no usa el índice en SQLite
+    return Q(termino__gte=termino, termino__lt=termino + '\uffff')
+
+
+def buscar(termino):
+    """QuerySet de (producto_id, relevancia) ordenado por relevancia
+
+    Devuelve None si el término no contiene palabras buscables.
+    """
+    from .models import Producto, TerminoProducto
+
+    palabras = list(dict.fromkeys(tokenizar(termino)))[:10]
+    if not palabras:
+        return None
+
+    if usa_fulltext():
+        # +palabra* : obligatoria y como prefijo (búsqueda mientras se escribe)
+        consulta = ' '.join(f'+{palabra}*' for palabra in palabras)
+        relevancia = RawSQL(
+            'MATCH (`producto`.`nombre`, `producto`.`descripcion`, `producto`.`lote`) AGAINST (%s IN BOOLEAN MODE)',
+            [consulta]
+        )
+        return Producto.objects.annotate(relevancia=relevancia).filter(
+            relevancia__gt=0
+        ).order_by('-relevancia', 'idproducto').values_list('idproducto', 'relevancia')
+
+    relevancia = Sum(Case(
+        When(termino__in=palabras, then=F('peso') * BONO_EXACTO),
+        default=F('peso'),
+        output_field=IntegerField()
+    ))
+    if len(palabras) == 1:
+        coincidencias = TerminoProducto.objects.filter(_rango(palabras[0])).values('producto_id').annotate(
+            relevancia=relevancia
+        )
+    else:
+        # Partir de la palabra más selectiva: las demás solo se evalúan
+        # sobre sus productos y no sobre todo el rango de cada prefijo
+        frecuencias = {palabra: TerminoProducto.objects.filter(_rango(palabra)).count() for palabra in palabras}
+        rara = min(palabras, key=frecuencias.get)
+        candidatos = TerminoProducto.objects.filter(_rango(rara)).values('producto_id')
+        coincide = Q()
+        for palabra in palabras:
+            coincide |= _rango(palabra)
+        # Palabras distintas de la consulta que encontró cada producto
+        encontradas = Count(
+            Case(*(When(_rango(palabra), then=i) for i, palabra in enumerate(palabras)), output_field=IntegerField()),
+            distinct=True
+        )
+        coincidencias = TerminoProducto.objects.filter(coincide, producto_id__in=candidatos).values('producto_id').annotate(
+            encontradas=encontradas,
+            relevancia=relevancia
+        ).filter(encontradas=len(palabras))
+    return coincidencias.order_by('-relevancia', 'producto_id').values_list('producto_id', 'relevancia')
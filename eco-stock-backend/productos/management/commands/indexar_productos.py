@@ -0,0 +1,22 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from productos import busqueda
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye el índice invertido de búsqueda de productos (no aplica en MySQL, que usa FULLTEXT)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=5000, help='Filas por INSERT')
+
+    def handle(self, *args, **opciones):
+        if busqueda.usa_fulltext():
+            self.stdout.write('MySQL usa el índice FULLTEXT producto_busqueda_ft; no hay nada que reconstruir')
+            return
+        inicio = time.perf_counter()
+        total = busqueda.reconstruir(opciones['lote'])
+        self.stdout.write(self.style.SUCCESS(
+            f'{total} términos indexados en {time.perf_counter() - inicio:.1f} s'
+        ))
@@ -0,0 +1,86 @@
+# Generated by Django 5.2 on 2026-10-18 09:12
+
+import re
+import unicodedata
+from collections import Counter
+from itertools import islice
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# Copia congelada de productos.busqueda al momento de esta migración: los
+# cambios posteriores del módulo no deben alterar lo que la migración escribe
+PESOS = {'nombre': 3, 'lote': 2, 'descripcion': 1}
+
+
+def normalizar(texto):
+    texto = unicodedata.normalize('NFKD', texto or '')
+    return ''.join(c for c in texto if not unicodedata.combining(c)).lower()
+
+
+def filas_indice(productos):
+    """Tuplas (termino, producto_id, peso) de un iterable de (id, nombre, descripcion, lote)"""
+    for producto_id, nombre, descripcion, lote in productos:
+        pesos = Counter()
+        for campo, valor in (('nombre', nombre), ('descripcion', descripcion), ('lote', lote)):
+            for termino in re.findall(r'\w+', normalizar(valor)):
+                pesos[termino[:64]] += PESOS[campo]
+        for termino, peso in pesos.items():
+            yield termino, producto_id, peso
+
+
+def crear_fulltext(apps, schema_editor):
+    if schema_editor.connection.vendor == 'mysql':
+        schema_editor.execute(
+            'ALTER TABLE producto ADD FULLTEXT INDEX producto_busqueda_ft (nombre, descripcion, lote)'
+        )
+
+
+def eliminar_fulltext(apps, schema_editor):
+    if schema_editor.connection.vendor == 'mysql':
+        schema_editor.execute('ALTER TABLE producto DROP INDEX producto_busqueda_ft')
+
+
+def poblar_indice(apps, schema_editor):
+    """Indexar los productos existentes en motores sin FULLTEXT"""
+    if schema_editor.connection.vendor == 'mysql':
+        return
+    Producto = apps.get_model('productos', 'Producto')
+    TerminoProducto = apps.get_model('productos', 'TerminoProducto')
+    productos = Producto.objects.order_by('idproducto').values_list('idproducto', 'nombre', 'descripcion', 'lote')
+    filas = filas_indice(productos.iterator(chunk_size=2000))
+    while True:
+        lote = [
+            TerminoProducto(termino=termino, producto_id=producto_id, peso=peso)
+            for termino, producto_id, peso in islice(filas, 5000)
+        ]
+        if not lote:
+            break
+        TerminoProducto.objects.bulk_create(lote)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('productos', '0002_producto_lote_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TerminoProducto',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('termino', models.CharField(max_length=64)),
+                ('peso', models.IntegerField(default=1)),
+                ('producto', models.ForeignKey(db_column='producto_id', on_delete=django.db.models.deletion.CASCADE, related_name='terminos', to='productos.producto')),
+            ],
+            options={
+                'verbose_name': 'Término de Producto',
+                'verbose_name_plural': 'Términos de Productos',
+                'db_table': 'producto_termino',
+                'indexes': [models.Index(fields=['termino', 'producto', 'peso'], name='termino_busqueda_idx')],
+            },
+        ),
+        migrations.RunPython(crear_fulltext, eliminar_fulltext),
+        migrations.RunPython(poblar_indice, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2 on 2026-10-18 09:32
+
+import time
+
+from django.db import migrations, models
+
+CATALOGOS = ['productos.categoria', 'productos.unidadesmedida', 'users.rol', 'suppliers.proveedor']
+
+
+def crear_versiones(apps, schema_editor):
+    """Versión inicial única de cada catálogo"""
+    VersionCatalogo = apps.get_model('productos', 'VersionCatalogo')
+    VersionCatalogo.objects.bulk_create([
+        VersionCatalogo(modelo=modelo, version=time.time_ns()) for modelo in CATALOGOS
+    ], ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('productos', '0003_busqueda_productos'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VersionCatalogo',
+            fields=[
+                ('modelo', models.CharField(max_length=100, primary_key=True, serialize=False)),
+                ('version', models.BigIntegerField()),
+            ],
+            options={
+                'verbose_name': 'Versión de Catálogo',
+                'verbose_name_plural': 'Versiones de Catálogos',
+                'db_table': 'version_catalogo',
+            },
+        ),
+        migrations.RunPython(crear_versiones, migrations.RunPython.noop),
+    ]
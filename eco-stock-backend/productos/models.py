@@ -44,10 +44,53 @@ class Producto(models.Model):
         db_table = 'producto'
         verbose_name = 'Producto'
         verbose_name_plural = 'Productos'
+        indexes = [
+            models.Index(fields=['lote'], name='producto_lote_idx'),
+        ]
     
     def __str__(self):
         return self.nombre
 
+class TerminoProducto(models.Model):
+    """Índice invertido de la búsqueda de productos en motores sin FULLTEXT"""
+    id = models.BigAutoField(primary_key=True)
+    termino = models.CharField(max_length=64)
+    producto = models.ForeignKey(
+        Producto,
+        on_delete=models.CASCADE,
+        db_column='producto_id',
+        related_name='terminos'
+    )
+    peso = models.IntegerField(default=1)
+    
+    class Meta:
+        db_table = 'producto_termino'
+        verbose_name = 'Término de Producto'
+        verbose_name_plural = 'Términos de Productos'
+        indexes = [
+            # Cubre la búsqueda por rango de prefijo sin leer la tabla
+            models.Index(fields=['termino', 'producto', 'peso'], name='termino_busqueda_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.termino} -> {self.producto_id}"
+
+class VersionCatalogo(models.Model):
+    """Versión de cada catálogo ('app.modelo'), incrementada en cada escritura
+
+    Es la base de los ETag de las respuestas condicionales (main_app.condicional).
+    """
+    modelo = models.CharField(max_length=100, primary_key=True)
+    version = models.BigIntegerField()
+    
+    class Meta:
+        db_table = 'version_catalogo'
+        verbose_name = 'Versión de Catálogo'
+        verbose_name_plural = 'Versiones de Catálogos'
+    
+    def __str__(self):
+        return f"{self.modelo} v{self.version}"
+
 class ProductoProveedor(models.Model):
     id = models.BigAutoField(primary_key=True)
     producto = models.ForeignKey(
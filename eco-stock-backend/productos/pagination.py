@@ -0,0 +1,17 @@
+from django.conf import settings
+from rest_framework.pagination import PageNumberPagination
+
+
+class BusquedaPagination(PageNumberPagination):
+    """Paginación por número de página para los resultados de búsqueda
+
+    Los resultados se ordenan por relevancia, así que solo interesan las
+    primeras páginas y el OFFSET no llega a ser costoso.
+    """
+    page_size_query_param = 'page_size'
+
+    def get_page_size(self, request):
+        # Se leen en cada petición, no al importar el módulo
+        self.page_size = getattr(settings, 'BUSQUEDA_PAGE_SIZE', 20)
+        self.max_page_size = getattr(settings, 'BUSQUEDA_MAX_PAGE_SIZE', 100)
+        return super().get_page_size(request)
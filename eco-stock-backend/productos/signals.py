@@ -0,0 +1,21 @@
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from main_app.condicional import versionar
+
+from . import busqueda
+from .models import Categoria, Producto, UnidadesMedida
+
+CAMPOS_BUSCABLES = {'nombre', 'descripcion', 'lote'}
+
+
+@receiver(post_save, sender=Producto)
+def indexar_producto(sender, instance, update_fields=None, **kwargs):
+    """Mantener el índice invertido al crear o editar un producto"""
+    if update_fields is not None and not CAMPOS_BUSCABLES & set(update_fields):
+        return
+    busqueda.indexar([instance])
+
+
+# ETags de los catálogos (main_app.condicional)
+versionar(Categoria, UnidadesMedida)
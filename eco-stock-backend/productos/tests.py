@@ -1,3 +1,147 @@
 from django.test import TestCase
+from rest_framework.test import APIClient
 
-# Create your tests here.
+from main_app.campos import mapear
+from main_app.pruebas import ConsultasMixin, catalogo, crear_producto, crear_productos
+from suppliers.models import Proveedor
+
+from .models import Producto, ProductoProveedor, UnidadesMedida
+from .serializers import ProductoSerializer
+
+
+class ConsultasPorEndpointTest(ConsultasMixin, TestCase):
+    """El número de consultas de cada endpoint no debe crecer con las filas"""
+
+    @classmethod
+    def setUpTestData(cls):
+        proveedores = [Proveedor.objects.create(nombre=f'Agro {i}') for i in range(3)]
+        for producto in crear_productos(5, nombre='Urea'):
+            for proveedor in proveedores:
+                ProductoProveedor.objects.create(producto=producto, proveedor=proveedor)
+        cls.categoria = catalogo()[0]
+        cls.producto = producto
+        cls.proveedor = proveedores[0]
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_productos(self):
+        self.assertConsultas(1, '/productos/productos/')
+        # Conteo, página de ids y carga de los productos de la página
+        self.assertConsultas(3, '/productos/productos/buscar/?q=Urea')
+        self.assertConsultas(1, f'/productos/productos/por_categoria/?categoria_id={self.categoria.pk}')
+        self.assertConsultas(1, f'/productos/productos/por_lote/?lote={self.producto.lote}')
+
+    def test_producto_proveedor(self):
+        self.assertConsultas(1, '/productos/producto-proveedor/')
+        self.assertConsultas(1, f'/productos/producto-proveedor/proveedores_producto/?producto_id={self.producto.pk}')
+        self.assertConsultas(1, f'/productos/producto-proveedor/productos_proveedor/?proveedor_id={self.proveedor.pk}')
+
+
+class RespuestaCondicionalTest(TestCase):
+    """ETag en los catálogos: 304 sin consultar el listado, nueva versión al escribir"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.categoria = catalogo()[0]
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_no_modificado(self):
+        respuesta = self.client.get('/productos/categorias/')
+        etag = respuesta['ETag']
+        self.assertIn('no-cache', respuesta['Cache-Control'])
+
+        # Solo se lee la versión del catálogo
+        with self.assertNumQueries(1):
+            respuesta = self.client.get('/productos/categorias/', HTTP_IF_NONE_MATCH=f'"otro", W/{etag}')
+        self.assertEqual(respuesta.status_code, 304)
+        self.assertEqual(respuesta.content, b'')
+        self.assertEqual(respuesta['ETag'], etag)
+
+        # Otra URL (detalle) tiene su propio ETag
+        detalle = self.client.get(f'/productos/categorias/{self.categoria.pk}/')
+        self.assertNotEqual(detalle['ETag'], etag)
+        self.assertEqual(
+            self.client.get(f'/productos/categorias/{self.categoria.pk}/', HTTP_IF_NONE_MATCH=detalle['ETag']).status_code,
+            304
+        )
+
+    def test_escritura_invalida(self):
+        etag = self.client.get('/productos/unidades-medida/')['ETag']
+        UnidadesMedida.objects.create(nombre='Litro', abreviatura='L')
+        respuesta = self.client.get('/productos/unidades-medida/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(respuesta.status_code, 200)
+        # Kilogramo (del catálogo de prueba) y Litro
+        self.assertEqual(len(respuesta.json()), 2)
+
+
+class BusquedaProductosTest(TestCase):
+    """Búsqueda por relevancia con el índice invertido (motores sin FULLTEXT)"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.urea = crear_producto('Urea granulada', 'U-100', 'Fertilizante nitrogenado')
+        cls.mezcla = crear_producto('Abono triple', 'A-200', 'Mezcla con urea')
+        cls.fungicida = crear_producto('Fungicída cúprico', 'F-300', 'Polvo mojable')
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def buscar(self, termino, **parametros):
+        respuesta = self.client.get('/productos/productos/buscar/', {'q': termino, **parametros})
+        self.assertEqual(respuesta.status_code, 200)
+        return respuesta.json()
+
+    def test_ordena_por_relevancia(self):
+        datos = self.buscar('urea')
+        self.assertEqual([p['idproducto'] for p in datos['results']], [self.urea.pk, self.mezcla.pk])
+
+    def test_prefijos_y_todas_las_palabras(self):
+        self.assertEqual(self.buscar('gran ur')['count'], 1)
+        self.assertEqual(self.buscar('fungicida cupr')['results'][0]['idproducto'], self.fungicida.pk)
+        self.assertEqual(self.buscar('urea polvo')['count'], 0)
+
+    def test_indice_sigue_las_ediciones(self):
+        self.fungicida.nombre = 'Herbicida selectivo'
+        self.fungicida.save()
+        self.assertEqual(self.buscar('fungicida')['count'], 0)
+        self.assertEqual(self.buscar('herbi')['count'], 1)
+
+    def test_paginacion(self):
+        datos = self.buscar('f', page_size=1)
+        self.assertEqual(len(datos['results']), 1)
+        self.assertIsNotNone(datos['next'])
+
+    def test_paginacion_desde_la_configuracion(self):
+        with self.settings(BUSQUEDA_PAGE_SIZE=1, BUSQUEDA_MAX_PAGE_SIZE=2):
+            self.assertEqual(len(self.buscar('f')['results']), 1)
+            self.assertEqual(len(self.buscar('f', page_size=5)['results']), 2)
+
+
+class CamposDispersosTest(TestCase):
+    """?fields= y listados armados desde values_list() con la salida del serializador"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.producto = crear_producto()
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_listado_igual_al_serializador(self):
+        esperado = [dict(fila) for fila in ProductoSerializer(Producto.objects.all(), many=True).data]
+        self.assertIsNotNone(mapear(ProductoSerializer))
+        self.assertEqual(self.client.get('/productos/productos/').json(), esperado)
+
+    def test_campos_pedidos(self):
+        respuesta = self.client.get('/productos/productos/?fields=nombre,categoria_nombre')
+        self.assertEqual(respuesta.json(), [{'categoria_nombre': 'Fertilizantes', 'nombre': 'Urea'}])
+        respuesta = self.client.get(f'/productos/productos/{self.producto.pk}/?fields=lote')
+        self.assertEqual(respuesta.json(), {'lote': 'L1'})
+
+    def test_campo_invalido(self):
+        respuesta = self.client.get('/productos/productos/?fields=nombre,precio')
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertEqual(respuesta.json(), {'error': 'Campos no válidos: precio'})
@@ -1,11 +1,14 @@
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from django.db.models import Q
+from main_app.campos import CamposDispersosMixin
+from main_app.condicional import RespuestaCondicionalMixin
 from .models import Categoria, UnidadesMedida, Producto, ProductoProveedor
 from .serializers import CategoriaSerializer, UnidadesMedidaSerializer, ProductoSerializer, ProductoProveedorSerializer
+from .pagination import BusquedaPagination
+from . import busqueda
 
-class CategoriaViewSet(viewsets.ModelViewSet):
+class CategoriaViewSet(RespuestaCondicionalMixin, CamposDispersosMixin, viewsets.ModelViewSet):
     queryset = Categoria.objects.all()
     serializer_class = CategoriaSerializer
     
@@ -20,8 +23,7 @@ class CategoriaViewSet(viewsets.ModelViewSet):
     def list(self, request):
         """Listar categorías"""
         queryset = self.get_queryset()
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+        return Response(self.listar(queryset))
     
     def retrieve(self, request, pk=None):
         """Obtener categoría por ID"""
@@ -53,7 +55,7 @@ class CategoriaViewSet(viewsets.ModelViewSet):
         except Categoria.DoesNotExist:
             return Response({'error': 'Categoría no encontrada'}, status=status.HTTP_404_NOT_FOUND)
 
-class UnidadesMedidaViewSet(viewsets.ModelViewSet):
+class UnidadesMedidaViewSet(RespuestaCondicionalMixin, CamposDispersosMixin, viewsets.ModelViewSet):
     queryset = UnidadesMedida.objects.all()
     serializer_class = UnidadesMedidaSerializer
     
@@ -68,8 +70,7 @@ class UnidadesMedidaViewSet(viewsets.ModelViewSet):
     def list(self, request):
         """Listar unidades de medida"""
         queryset = self.get_queryset()
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+        return Response(self.listar(queryset))
     
     def retrieve(self, request, pk=None):
         """Obtener unidad de medida por ID"""
@@ -101,8 +102,8 @@ class UnidadesMedidaViewSet(viewsets.ModelViewSet):
         except UnidadesMedida.DoesNotExist:
             return Response({'error': 'Unidad de medida no encontrada'}, status=status.HTTP_404_NOT_FOUND)
 
-class ProductoViewSet(viewsets.ModelViewSet):
-    queryset = Producto.objects.all()
+class ProductoViewSet(CamposDispersosMixin, viewsets.ModelViewSet):
+    queryset = Producto.objects.select_related('idcategoria', 'unidad_medida_id')
     serializer_class = ProductoSerializer
     
     def create(self, request):
@@ -116,8 +117,7 @@ class ProductoViewSet(viewsets.ModelViewSet):
     def list(self, request):
         """Listar productos"""
         queryset = self.get_queryset()
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+        return Response(self.listar(queryset))
     
     def retrieve(self, request, pk=None):
         """Obtener producto por ID"""
@@ -151,16 +151,23 @@ class ProductoViewSet(viewsets.ModelViewSet):
     
     @action(detail=False, methods=['get'])
     def buscar(self, request):
-        """Buscar productos"""
+        """Buscar productos por relevancia (prefijos de nombre, descripción y lote)"""
         termino = request.query_params.get('q', '')
         if termino:
-            productos = Producto.objects.filter(
-                Q(nombre__icontains=termino) |
-                Q(descripcion__icontains=termino) |
-                Q(lote__icontains=termino)
-            )
-            serializer = self.get_serializer(productos, many=True)
-            return Response(serializer.data)
+            coincidencias = busqueda.buscar(termino)
+            if coincidencias is None:
+                return Response({'error': 'Término de búsqueda inválido'}, status=status.HTTP_400_BAD_REQUEST)
+            
+            paginador = BusquedaPagination()
+            pagina = paginador.paginate_queryset(coincidencias, request, view=self)
+            productos = self.get_queryset().in_bulk([producto_id for producto_id, _ in pagina])
+            resultados = []
+            for producto_id, relevancia in pagina:
+                if producto_id in productos:
+                    datos = self.get_serializer(productos[producto_id]).data
+                    datos['relevancia'] = relevancia
+                    resultados.append(datos)
+            return paginador.get_paginated_response(resultados)
         return Response({'error': 'Término de búsqueda requerido'}, status=status.HTTP_400_BAD_REQUEST)
     
     @action(detail=False, methods=['get'])
@@ -168,9 +175,8 @@ class ProductoViewSet(viewsets.ModelViewSet):
         """Obtener productos por categoría"""
         categoria_id = request.query_params.get('categoria_id')
         if categoria_id:
-            productos = Producto.objects.filter(idcategoria=categoria_id)
-            serializer = self.get_serializer(productos, many=True)
-            return Response(serializer.data)
+            productos = self.get_queryset().filter(idcategoria=categoria_id)
+            return Response(self.listar(productos))
         return Response({'error': 'ID de categoría requerido'}, status=status.HTTP_400_BAD_REQUEST)
     
     @action(detail=False, methods=['get'])
@@ -178,13 +184,12 @@ class ProductoViewSet(viewsets.ModelViewSet):
         """Obtener productos por lote"""
         lote = request.query_params.get('lote')
         if lote:
-            productos = Producto.objects.filter(lote=lote)
-            serializer = self.get_serializer(productos, many=True)
-            return Response(serializer.data)
+            productos = self.get_queryset().filter(lote=lote)
+            return Response(self.listar(productos))
         return Response({'error': 'Lote requerido'}, status=status.HTTP_400_BAD_REQUEST)
 
-class ProductoProveedorViewSet(viewsets.ModelViewSet):
-    queryset = ProductoProveedor.objects.all()
+class ProductoProveedorViewSet(CamposDispersosMixin, viewsets.ModelViewSet):
+    queryset = ProductoProveedor.objects.select_related('producto', 'proveedor')
     serializer_class = ProductoProveedorSerializer
     
     @action(detail=False, methods=['post'])
@@ -201,9 +206,8 @@ class ProductoProveedorViewSet(viewsets.ModelViewSet):
         """Obtener proveedores de un producto"""
         producto_id = request.query_params.get('producto_id')
         if producto_id:
-            asignaciones = ProductoProveedor.objects.filter(producto_id=producto_id)
-            serializer = self.get_serializer(asignaciones, many=True)
-            return Response(serializer.data)
+            asignaciones = self.get_queryset().filter(producto_id=producto_id)
+            return Response(self.listar(asignaciones))
         return Response({'error': 'ID de producto requerido'}, status=status.HTTP_400_BAD_REQUEST)
     
     @action(detail=False, methods=['get'])
@@ -211,9 +215,8 @@ class ProductoProveedorViewSet(viewsets.ModelViewSet):
         """Obtener productos de un proveedor"""
         proveedor_id = request.query_params.get('proveedor_id')
         if proveedor_id:
-            asignaciones = ProductoProveedor.objects.filter(proveedor_id=proveedor_id)
-            serializer = self.get_serializer(asignaciones, many=True)
-            return Response(serializer.data)
+            asignaciones = self.get_queryset().filter(proveedor_id=proveedor_id)
+            return Response(self.listar(asignaciones))
         return Response({'error': 'ID de proveedor requerido'}, status=status.HTTP_400_BAD_REQUEST)
     
     @action(detail=False, methods=['delete'])
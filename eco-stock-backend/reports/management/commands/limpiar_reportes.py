@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from reports.trabajos import liberar_abandonados, limpiar
+
+
+class Command(BaseCommand):
+    help = (
+        'Borra los trabajos de reportes terminados y sus archivos después de REPORTES_RETENCION, '
+        'y marca como error los que siguen en curso después de REPORTES_TIEMPO_MAXIMO. '
+        'Se puede programar con cron'
+    )
+
+    def handle(self, *args, **opciones):
+        abandonados = liberar_abandonados()
+        borrados = limpiar()
+        self.stdout.write(self.style.SUCCESS(
+            f'{borrados} trabajo(s) borrado(s), {abandonados} abandonado(s) marcado(s) como error'
+        ))
@@ -1,3 +1,56 @@
+import uuid
+
 from django.db import models
 
+from users.models import Usuario
+
 # Create your models here.
+
+class TrabajoReporte(models.Model):
+    """Reporte generado en segundo plano (reports.trabajos)
+
+    clave identifica el reporte pedido (tipo, formato y parámetros). Mientras
+    el trabajo está pendiente o en proceso también se guarda en clave_activa,
+    que es única: dos pedidos iguales a la vez comparten el mismo trabajo,
+    incluso desde procesos distintos. Al terminar vuelve a NULL.
+    """
+    PENDIENTE = 'pendiente'
+    EN_PROCESO = 'en_proceso'
+    COMPLETADO = 'completado'
+    ERROR = 'error'
+    ESTADOS = [
+        (PENDIENTE, 'Pendiente'),
+        (EN_PROCESO, 'En proceso'),
+        (COMPLETADO, 'Completado'),
+        (ERROR, 'Error'),
+    ]
+    ACTIVOS = (PENDIENTE, EN_PROCESO)
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    tipo = models.CharField(max_length=50)
+    formato = models.CharField(max_length=10, default='json')
+    parametros = models.JSONField(default=dict)
+    clave = models.CharField(max_length=64)
+    clave_activa = models.CharField(max_length=64, null=True, blank=True, unique=True)
+    # 'usuario:<id>' o 'ip:<dirección>', para el límite de trabajos en curso
+    solicitante = models.CharField(max_length=100)
+    usuario = models.ForeignKey(Usuario, on_delete=models.SET_NULL, null=True, blank=True)
+    estado = models.CharField(max_length=20, choices=ESTADOS, default=PENDIENTE)
+    filas = models.IntegerField(null=True, blank=True)
+    tamano = models.BigIntegerField(null=True, blank=True)
+    error = models.TextField(blank=True, null=True)
+    fecha_creacion = models.DateTimeField(auto_now_add=True)
+    fecha_inicio = models.DateTimeField(null=True, blank=True)
+    fecha_fin = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'trabajo_reporte'
+        verbose_name = 'Trabajo de Reporte'
+        verbose_name_plural = 'Trabajos de Reportes'
+        indexes = [
+            models.Index(fields=['solicitante', 'estado'], name='trabajo_solicitante_idx'),
+            models.Index(fields=['estado', 'fecha_creacion'], name='trabajo_estado_fecha_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.tipo}.{self.formato} ({self.estado})"
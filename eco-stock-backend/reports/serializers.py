@@ -0,0 +1,18 @@
+from django.urls import reverse
+from rest_framework import serializers
+from .models import TrabajoReporte
+
+class TrabajoReporteSerializer(serializers.ModelSerializer):
+    descarga = serializers.SerializerMethodField()
+    
+    class Meta:
+        model = TrabajoReporte
+        fields = [
+            'id', 'tipo', 'formato', 'parametros', 'estado', 'filas', 'tamano', 'error',
+            'fecha_creacion', 'fecha_inicio', 'fecha_fin', 'descarga'
+        ]
+    
+    def get_descarga(self, trabajo):
+        if trabajo.estado != TrabajoReporte.COMPLETADO:
+            return None
+        return reverse('trabajo-reporte-descarga', args=[trabajo.pk])
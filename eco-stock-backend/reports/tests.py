@@ -1,3 +1,120 @@
-from django.test import TestCase
+import gzip
+import json
+import tempfile
+import time
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.test import TransactionTestCase, override_settings
+from rest_framework.test import APIClient
+
+from inventory.models import Inventario
+from main_app.pruebas import crear_productos, crear_usuario
+
+from . import trabajos, views
+from .models import TrabajoReporte
+
+
+class TrabajosReporteTest(TransactionTestCase):
+    """Reportes en el pool de hilos: resultado comprimido, deduplicación y límite por usuario"""
+
+    def setUp(self):
+        for i, producto in enumerate(crear_productos(3, nombre='Urea')):
+            Inventario.objects.create(producto=producto, cantidad=10 * i)
+        self.usuario = crear_usuario()
+        self.client = APIClient()
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        configuracion = override_settings(REPORTES_DIRECTORIO=directorio.name, REPORTES_MAXIMO_POR_USUARIO=1)
+        configuracion.enable()
+        self.addCleanup(configuracion.disable)
+
+    def pedir(self, **datos):
+        return self.client.post('/reports/trabajos/', {'usuario_id': self.usuario.pk, **datos}, format='json')
+
+    def esperar(self, trabajo_id):
+        for _ in range(200):
+            datos = self.client.get(f'/reports/trabajos/{trabajo_id}/').json()
+            if datos['estado'] not in TrabajoReporte.ACTIVOS:
+                return datos
+            time.sleep(0.02)
+        self.fail('El trabajo no terminó')
+
+    def test_generar_y_descargar(self):
+        respuesta = self.pedir(tipo='stock-actual', formato='csv')
+        self.assertEqual(respuesta.status_code, 202)
+        datos = self.esperar(respuesta.json()['id'])
+        self.assertEqual((datos['estado'], datos['filas']), ('completado', 3))
+
+        comprimido = self.client.get(datos['descarga'], HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(comprimido['Content-Encoding'], 'gzip')
+        texto = gzip.decompress(b''.join(comprimido.streaming_content)).decode()
+        self.assertEqual(texto.splitlines()[0], 'producto_id,producto_nombre,stock_actual,fecha_actualizacion')
+        plano = self.client.get(datos['descarga'])
+        self.assertEqual(b''.join(plano.streaming_content).decode(), texto)
+
+        datos = self.esperar(self.pedir(tipo='stock-actual').json()['id'])
+        contenido = json.loads(b''.join(self.client.get(datos['descarga']).streaming_content))
+        self.assertEqual(len(contenido['data']), 3)
+
+    def test_resultado_borrado(self):
+        datos = self.esperar(self.pedir(tipo='stock-actual').json()['id'])
+        lecturas = []
+        original = views.LecturaArchivo
+
+        def lectura(*args):
+            lecturas.append(original(*args))
+            return lecturas[-1]
+
+        with mock.patch('reports.views.LecturaArchivo', side_effect=lectura):
+            respuesta = self.client.get(datos['descarga'], HTTP_ACCEPT_ENCODING='gzip')
+        # Cerrar la respuesta sin leerla cierra el archivo
+        respuesta.close()
+        self.assertTrue(lecturas[0].archivo.closed)
+
+        trabajos.ruta_resultado(TrabajoReporte.objects.get(pk=datos['id'])).unlink()
+        self.assertEqual(self.client.get(datos['descarga']).status_code, 410)
+
+    def test_deduplicar_y_limitar(self):
+        # Sin ejecutar los trabajos: quedan pendientes
+        with mock.patch('reports.trabajos.pool'):
+            primero = self.pedir(tipo='stock-actual')
+            repetido = self.pedir(tipo='stock-actual')
+            self.assertEqual((primero.status_code, repetido.status_code), (202, 200))
+            self.assertEqual(primero.json()['id'], repetido.json()['id'])
+            self.assertEqual(self.client.get(f"/reports/trabajos/{primero.json()['id']}/descarga/").status_code, 409)
+
+            otro = self.pedir(tipo='productos-vencimiento')
+            self.assertEqual(otro.status_code, 429)
+            self.assertEqual(TrabajoReporte.objects.count(), 1)
+
+    def test_limite_por_usuario_autenticado(self):
+        self.client.force_authenticate(User.objects.create_user('ana'))
+        with mock.patch('reports.trabajos.pool'):
+            self.assertEqual(self.pedir(tipo='stock-actual').status_code, 202)
+            # Otro usuario_id en el cuerpo no da otro cupo
+            otro = self.client.post(
+                '/reports/trabajos/', {'usuario_id': crear_usuario('Luis').pk, 'tipo': 'productos-vencimiento'}, format='json'
+            )
+            self.assertEqual(otro.status_code, 429)
+
+    def test_limite_excedido_despues_de_crear(self):
+        crear = TrabajoReporte.objects.create
+
+        def crear_con_pedido_simultaneo(**campos):
+            # Otro pedido del mismo usuario se crea entre el conteo y el INSERT
+            crear(**{**campos, 'tipo': 'productos-vencimiento', 'clave': 'otro', 'clave_activa': 'otro'})
+            return crear(**campos)
+
+        with mock.patch('reports.trabajos.pool'), \
+                mock.patch.object(TrabajoReporte.objects, 'create', crear_con_pedido_simultaneo):
+            self.assertEqual(self.pedir(tipo='stock-actual').status_code, 429)
+        # El trabajo pudo llegar a un pedido igual: queda como error en lugar de borrarse
+        trabajo = TrabajoReporte.objects.get(tipo='stock-actual')
+        self.assertEqual((trabajo.estado, trabajo.clave_activa), (TrabajoReporte.ERROR, None))
+
+    def test_pedido_invalido(self):
+        self.assertEqual(self.pedir(tipo='inexistente').status_code, 400)
+        self.assertEqual(self.pedir(tipo='movimientos-periodo').status_code, 400)
+        self.assertEqual(self.pedir(tipo='stock-actual', formato='xml').status_code, 400)
+        self.assertEqual(TrabajoReporte.objects.count(), 0)
@@ -0,0 +1,216 @@
+"""Cola de reportes en segundo plano
+
+Un pedido crea un TrabajoReporte y devuelve su id; el reporte se genera en un
+pool acotado de hilos del proceso (REPORTES_TRABAJADORES) y el resultado se
+escribe comprimido con gzip en REPORTES_DIRECTORIO, de donde se descarga.
+Los hilos bastan: el trabajo es casi todo espera de la base de datos y
+compresión, que liberan el GIL, y comparten la configuración de Django.
+
+- Pedidos iguales en curso (mismo tipo, formato y parámetros) devuelven el
+  trabajo existente en lugar de generar el reporte dos veces.
+- Cada solicitante puede tener como máximo REPORTES_MAXIMO_POR_USUARIO
+  trabajos en curso. El solicitante es el usuario autenticado con el token;
+  sin token, el usuario_id del pedido o la IP, que el cliente puede cambiar,
+  así que en ese caso el límite es solo orientativo.
+- Un trabajo en curso desde hace más de REPORTES_TIEMPO_MAXIMO segundos (el
+  proceso se reinició, por ejemplo) se marca como error y libera su clave.
+- limpiar() borra los resultados con más de REPORTES_RETENCION segundos.
+"""
+import gzip
+import hashlib
+import json
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, transaction
+from django.utils import timezone
+
+from inventory.streaming import en_bloques, lineas_csv, lineas_ndjson, por_llave
+from inventory.reportes import preparar_reporte
+from main_app.json_rapido import dumps
+
+from .models import TrabajoReporte
+
+logger = logging.getLogger(__name__)
+
+FORMATOS = {
+    'json': 'application/json',
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson; charset=utf-8',
+}
+# Parámetros que preparar_reporte() lee; el resto no cambia el reporte
+PARAMETROS = ('fecha_inicio', 'fecha_fin')
+
+_pool = None
+_bloqueo_pool = threading.Lock()
+
+
+class LimiteExcedido(Exception):
+    pass
+
+
+def trabajadores():
+    return getattr(settings, 'REPORTES_TRABAJADORES', 2)
+
+
+def maximo_por_usuario():
+    return getattr(settings, 'REPORTES_MAXIMO_POR_USUARIO', 2)
+
+
+def directorio():
+    return Path(getattr(settings, 'REPORTES_DIRECTORIO', 'reportes_generados'))
+
+
+def pool():
+    """Pool de hilos del proceso, creado con el primer trabajo"""
+    global _pool
+    with _bloqueo_pool:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=trabajadores(), thread_name_prefix='reportes')
+    return _pool
+
+
+def calcular_clave(tipo, formato, parametros):
+    texto = json.dumps([tipo, formato, parametros], sort_keys=True)
+    return hashlib.sha256(texto.encode()).hexdigest()
+
+
+def ruta_resultado(trabajo):
+    return directorio() / f'{trabajo.pk}.{trabajo.formato}.gz'
+
+
+def liberar_abandonados():
+    """Marcar como error los trabajos en curso desde hace más del tiempo máximo"""
+    limite = timezone.now() - timedelta(seconds=getattr(settings, 'REPORTES_TIEMPO_MAXIMO', 30 * 60))
+    return TrabajoReporte.objects.filter(
+        estado__in=TrabajoReporte.ACTIVOS, fecha_creacion__lt=limite
+    ).update(
+        estado=TrabajoReporte.ERROR, error='Tiempo máximo excedido', clave_activa=None, fecha_fin=timezone.now()
+    )
+
+
+def encolar(tipo, formato, parametros, solicitante, usuario=None):
+    """Pedir un reporte; devuelve (trabajo, creado)
+
+    Lanza ValueError si el reporte pedido no es válido y LimiteExcedido si el
+    solicitante ya tiene el máximo de trabajos en curso.
+    """
+    if formato not in FORMATOS:
+        raise ValueError('Formato no válido')
+    parametros = {nombre: str(parametros[nombre]) for nombre in PARAMETROS if parametros.get(nombre)}
+    # Solo valida: el values_list() no se evalúa
+    preparar_reporte(tipo, parametros)
+    clave = calcular_clave(tipo, formato, parametros)
+    liberar_abandonados()
+    maximo = maximo_por_usuario()
+    activos = TrabajoReporte.objects.filter(solicitante=solicitante, estado__in=TrabajoReporte.ACTIVOS)
+
+    for _ in range(2):
+        existente = TrabajoReporte.objects.filter(clave_activa=clave).first()
+        if existente is not None:
+            return existente, False
+        if activos.count() >= maximo:
+            raise LimiteExcedido(f'Máximo {maximo} reportes en curso por usuario')
+        try:
+            with transaction.atomic():
+                trabajo = TrabajoReporte.objects.create(
+                    tipo=tipo, formato=formato, parametros=parametros, clave=clave, clave_activa=clave,
+                    solicitante=solicitante, usuario=usuario
+                )
+            break
+        except IntegrityError:
+            # Otro pedido igual se creó entre la consulta y el INSERT
+            continue
+    else:
+        raise IntegrityError('No se pudo crear ni encontrar el trabajo')
+
+    # Volver a contar después de crear: dos pedidos simultáneos no pueden pasar
+    # ambos el límite. El trabajo ya es visible y otro pedido igual puede haberlo
+    # recibido, así que no se borra: se cierra como error y libera su clave
+    if activos.count() > maximo:
+        mensaje = f'Máximo {maximo} reportes en curso por usuario'
+        TrabajoReporte.objects.filter(pk=trabajo.pk).update(
+            estado=TrabajoReporte.ERROR, error=mensaje, clave_activa=None, fecha_fin=timezone.now()
+        )
+        raise LimiteExcedido(mensaje)
+
+    transaction.on_commit(lambda: pool().submit(ejecutar, trabajo.pk))
+    return trabajo, True
+
+
+def contar(filas, contador):
+    for fila in filas:
+        contador[0] += 1
+        yield fila
+
+
+def generar(trabajo):
+    """Escribir el reporte comprimido; devuelve (filas, bytes del archivo)"""
+    reporte, columnas, filas = preparar_reporte(trabajo.tipo, trabajo.parametros)
+    ruta = ruta_resultado(trabajo)
+    ruta.parent.mkdir(parents=True, exist_ok=True)
+    temporal = ruta.with_name(ruta.name + '.tmp')
+    contador = [0]
+    filas = contar(por_llave(filas), contador)
+    try:
+        with gzip.open(temporal, 'wb', compresslevel=6) as archivo:
+            if trabajo.formato == 'json':
+                # Mismo contenido que ReportesView con format=json
+                reporte['data'] = [dict(zip(columnas, fila)) for fila in filas]
+                archivo.write(dumps(reporte))
+            else:
+                lineas = lineas_csv(columnas, filas) if trabajo.formato == 'csv' else lineas_ndjson(columnas, filas)
+                for bloque in en_bloques(lineas):
+                    archivo.write(bloque)
+        # El archivo solo aparece completo
+        os.replace(temporal, ruta)
+    finally:
+        if temporal.exists():
+            temporal.unlink()
+    return contador[0], ruta.stat().st_size
+
+
+def ejecutar(trabajo_id):
+    """Generar un trabajo pendiente (en un hilo del pool)"""
+    close_old_connections()
+    try:
+        if not TrabajoReporte.objects.filter(pk=trabajo_id, estado=TrabajoReporte.PENDIENTE).update(
+            estado=TrabajoReporte.EN_PROCESO, fecha_inicio=timezone.now()
+        ):
+            return
+        trabajo = TrabajoReporte.objects.get(pk=trabajo_id)
+        en_proceso = TrabajoReporte.objects.filter(pk=trabajo_id, estado=TrabajoReporte.EN_PROCESO)
+        try:
+            filas, tamano = generar(trabajo)
+        except Exception as exc:
+            logger.exception('Error al generar el reporte %s', trabajo_id)
+            en_proceso.update(
+                estado=TrabajoReporte.ERROR, error=str(exc)[:1000], clave_activa=None, fecha_fin=timezone.now()
+            )
+            return
+        if not en_proceso.update(
+            estado=TrabajoReporte.COMPLETADO, filas=filas, tamano=tamano, clave_activa=None, fecha_fin=timezone.now()
+        ):
+            # Se dio por abandonado mientras tanto: el resultado no se usará
+            ruta_resultado(trabajo).unlink(missing_ok=True)
+    finally:
+        close_old_connections()
+
+
+def limpiar():
+    """Borrar los trabajos terminados (y sus archivos) más antiguos que la retención"""
+    limite = timezone.now() - timedelta(seconds=getattr(settings, 'REPORTES_RETENCION', 24 * 60 * 60))
+    viejos = TrabajoReporte.objects.filter(
+        estado__in=(TrabajoReporte.COMPLETADO, TrabajoReporte.ERROR), fecha_creacion__lt=limite
+    )
+    borrados = 0
+    for trabajo in viejos.only('pk', 'formato').iterator():
+        ruta_resultado(trabajo).unlink(missing_ok=True)
+        borrados += 1
+    viejos.delete()
+    return borrados
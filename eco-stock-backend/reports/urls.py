@@ -1,3 +1,8 @@
+from django.urls import path
+from .views import TrabajosReporteView, TrabajoReporteView, DescargaReporteView
+
 urlpatterns = [
- 
-]
\ No newline at end of file
+    path('trabajos/', TrabajosReporteView.as_view(), name='trabajos-reporte'),
+    path('trabajos/<uuid:trabajo_id>/', TrabajoReporteView.as_view(), name='trabajo-reporte'),
+    path('trabajos/<uuid:trabajo_id>/descarga/', DescargaReporteView.as_view(), name='trabajo-reporte-descarga'),
+]
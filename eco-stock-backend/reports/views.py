@@ -1,3 +1,110 @@
-from django.shortcuts import render
+import gzip
+import os
+
+from django.http import StreamingHttpResponse
+from django.utils.cache import patch_vary_headers
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from inventory.streaming import acepta_gzip
+from users.models import Usuario
+from .models import TrabajoReporte
+from .serializers import TrabajoReporteSerializer
+from . import trabajos
 
 # Create your views here.
+
+class LecturaArchivo:
+    """Contenido de la respuesta en bloques; Django llama a close() al cerrarla
+
+    Así el archivo se cierra aunque el cliente corte la descarga o nunca se
+    llegue a leer.
+    """
+
+    def __init__(self, archivo, tamano=64 * 1024):
+        self.archivo = archivo
+        self.tamano = tamano
+
+    def __iter__(self):
+        while bloque := self.archivo.read(self.tamano):
+            yield bloque
+
+    def close(self):
+        self.archivo.close()
+
+class TrabajosReporteView(APIView):
+    
+    def post(self, request):
+        """Pedir un reporte en segundo plano; devuelve el trabajo para consultar su estado
+
+        Un pedido igual a otro que sigue en curso devuelve ese mismo trabajo (200).
+        """
+        tipo = request.data.get('tipo')
+        if not tipo:
+            return Response({'error': 'Tipo de reporte requerido'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        usuario = None
+        usuario_id = request.data.get('usuario_id')
+        if usuario_id:
+            try:
+                usuario = Usuario.objects.get(pk=usuario_id)
+            except (Usuario.DoesNotExist, ValueError, TypeError):
+                return Response({'error': 'Usuario no encontrado'}, status=status.HTTP_400_BAD_REQUEST)
+        # usuario_id no está autenticado: sin token el límite es orientativo
+        if request.user and request.user.is_authenticated:
+            solicitante = f'auth:{request.user.pk}'
+        elif usuario:
+            solicitante = f'usuario:{usuario.pk}'
+        else:
+            solicitante = f"ip:{request.META.get('REMOTE_ADDR', '')}"
+        
+        try:
+            trabajo, creado = trabajos.encolar(
+                tipo, request.data.get('formato', 'json'), request.data, solicitante, usuario
+            )
+        except ValueError as error:
+            return Response({'error': str(error)}, status=status.HTTP_400_BAD_REQUEST)
+        except trabajos.LimiteExcedido as error:
+            return Response({'error': str(error)}, status=status.HTTP_429_TOO_MANY_REQUESTS)
+        
+        return Response(
+            TrabajoReporteSerializer(trabajo).data,
+            status=status.HTTP_202_ACCEPTED if creado else status.HTTP_200_OK
+        )
+
+class TrabajoReporteView(APIView):
+    
+    def get(self, request, trabajo_id):
+        """Estado de un trabajo; cuando está completado incluye la URL de descarga"""
+        try:
+            trabajo = TrabajoReporte.objects.get(pk=trabajo_id)
+        except TrabajoReporte.DoesNotExist:
+            return Response({'error': 'Trabajo no encontrado'}, status=status.HTTP_404_NOT_FOUND)
+        return Response(TrabajoReporteSerializer(trabajo).data)
+
+class DescargaReporteView(APIView):
+    
+    def get(self, request, trabajo_id):
+        """Descargar el resultado; comprimido tal cual si el cliente acepta gzip"""
+        try:
+            trabajo = TrabajoReporte.objects.get(pk=trabajo_id)
+        except TrabajoReporte.DoesNotExist:
+            return Response({'error': 'Trabajo no encontrado'}, status=status.HTTP_404_NOT_FOUND)
+        if trabajo.estado != TrabajoReporte.COMPLETADO:
+            return Response({'error': 'El reporte no está listo', 'estado': trabajo.estado}, status=status.HTTP_409_CONFLICT)
+        
+        ruta = trabajos.ruta_resultado(trabajo)
+        usar_gzip = acepta_gzip(request)
+        try:
+            archivo = open(ruta, 'rb') if usar_gzip else gzip.open(ruta, 'rb')
+        except FileNotFoundError:
+            # Borrado por limpiar_reportes (también entre la consulta y la apertura)
+            return Response({'error': 'El resultado ya no está disponible'}, status=status.HTTP_410_GONE)
+        response = StreamingHttpResponse(LecturaArchivo(archivo), content_type=trabajos.FORMATOS[trabajo.formato])
+        response['Content-Disposition'] = f'attachment; filename="{trabajo.tipo}.{trabajo.formato}"'
+        if usar_gzip:
+            response['Content-Encoding'] = 'gzip'
+            # Del archivo abierto: la ruta pudo borrarse después de abrirlo
+            response['Content-Length'] = os.fstat(archivo.fileno()).st_size
+        patch_vary_headers(response, ('Accept-Encoding',))
+        return response
@@ -0,0 +1,76 @@
+"""Claves normalizadas para buscar proveedores por índice
+
+Cada proveedor guarda una copia normalizada de nombre, correo y teléfono
+(columnas *_busqueda, indexadas). La búsqueda compara prefijos o valores
+exactos sobre esas columnas en lugar de LIKE '%x%' sobre los originales.
+"""
+import re
+
+from django.db import connection
+from django.db.models import Q
+
+from productos.busqueda import normalizar as normalizar_texto
+
+# Campo original -> columna con su clave normalizada
+CLAVES = {
+    'nombre': 'nombre_busqueda',
+    'correo': 'correo_busqueda',
+    'telefono': 'telefono_busqueda',
+}
+# Dígitos mínimos para considerar que el término es un teléfono
+MIN_DIGITOS_TELEFONO = 3
+
+
+def clave_nombre(valor):
+    """Minúsculas, sin tildes y con espacios simples"""
+    return ' '.join(normalizar_texto(valor).split())[:255]
+
+
+def clave_correo(valor):
+    return (valor or '').strip().lower()[:254]
+
+
+def clave_telefono(valor):
+    return re.sub(r'\D', '', valor or '')[:20]
+
+
+NORMALIZADORES = {
+    'nombre': clave_nombre,
+    'correo': clave_correo,
+    'telefono': clave_telefono,
+}
+
+
+def claves(nombre, correo, telefono):
+    """Valores de (nombre_busqueda, correo_busqueda, telefono_busqueda)"""
+    return clave_nombre(nombre), clave_correo(correo), clave_telefono(telefono)
+
+
+def normalizar(proveedor):
+    """Asignar las claves de búsqueda a partir de los campos originales"""
+    for campo, clave in CLAVES.items():
+        setattr(proveedor, clave, NORMALIZADORES[campo](getattr(proveedor, campo)))
+
+
+def prefijo(campo, valor):
+    """Condición de prefijo que puede usar el índice de la columna
+
+    En MySQL LIKE 'x%' usa el índice con la colación *_ci (las claves ya están
+    en minúsculas). SQLite no usa índices con LIKE, así que se compara por rango.
+    """
+    if connection.vendor == 'mysql':
+        return Q(**{f'{campo}__istartswith': valor})
+    return Q(**{f'{campo}__gte': valor, f'{campo}__lt': valor + '\uffff'})
+
+
+def condicion(termino):
+    """Q que busca el término por prefijo de nombre, correo o teléfono; None si no hay nada que buscar"""
+    nombre = clave_nombre(termino)
+    if not nombre:
+        return None
+    resultado = prefijo('nombre_busqueda', nombre) | prefijo('correo_busqueda', clave_correo(termino))
+    digitos = clave_telefono(termino)
+    # Solo si el término es esencialmente un número (admite espacios, guiones, paréntesis y +)
+    if len(digitos) >= MIN_DIGITOS_TELEFONO and not re.search(r'[^\d\s()+.-]', termino):
+        resultado |= prefijo('telefono_busqueda', digitos)
+    return resultado
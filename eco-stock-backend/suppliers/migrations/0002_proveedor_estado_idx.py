@@ -0,0 +1,17 @@
+# Generated by Django 5.2 on 2026-10-18 09:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('suppliers', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='proveedor',
+            index=models.Index(fields=['estado'], name='proveedor_estado_idx'),
+        ),
+    ]
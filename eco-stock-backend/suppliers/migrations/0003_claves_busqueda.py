@@ -0,0 +1,58 @@
+# Generated by Django 5.2 on 2026-10-18 09:15
+
+import re
+import unicodedata
+
+from django.db import migrations, models
+
+
+def claves(nombre, correo, telefono):
+    """Claves de búsqueda tal como las calculaba suppliers.busqueda en esta versión"""
+    nombre = unicodedata.normalize('NFKD', nombre or '')
+    nombre = ''.join(c for c in nombre if not unicodedata.combining(c)).lower()
+    return (
+        ' '.join(nombre.split())[:255],
+        (correo or '').strip().lower()[:254],
+        re.sub(r'\D', '', telefono or '')[:20],
+    )
+
+
+def poblar_claves(apps, schema_editor):
+    """Calcular las claves de búsqueda de los proveedores existentes"""
+    Proveedor = apps.get_model('suppliers', 'Proveedor')
+    proveedores = []
+    for proveedor in Proveedor.objects.only('nombre', 'correo', 'telefono').iterator(chunk_size=1000):
+        proveedor.nombre_busqueda, proveedor.correo_busqueda, proveedor.telefono_busqueda = claves(
+            proveedor.nombre, proveedor.correo, proveedor.telefono
+        )
+        proveedores.append(proveedor)
+        if len(proveedores) == 1000:
+            Proveedor.objects.bulk_update(proveedores, ['nombre_busqueda', 'correo_busqueda', 'telefono_busqueda'])
+            proveedores = []
+    Proveedor.objects.bulk_update(proveedores, ['nombre_busqueda', 'correo_busqueda', 'telefono_busqueda'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('suppliers', '0002_proveedor_estado_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='proveedor',
+            name='correo_busqueda',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=254),
+        ),
+        migrations.AddField(
+            model_name='proveedor',
+            name='nombre_busqueda',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='proveedor',
+            name='telefono_busqueda',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=20),
+        ),
+        migrations.RunPython(poblar_claves, migrations.RunPython.noop),
+    ]
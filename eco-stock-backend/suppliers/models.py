@@ -1,7 +1,52 @@
 from django.db import models
 
+from main_app import condicional
+
+from . import busqueda
+
 # Create your models here.
 
+class ProveedorQuerySet(condicional.EscriturasMasivasQuerySet):
+    """Mantiene las claves de búsqueda también en las escrituras masivas"""
+    
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = list(objs)
+        for proveedor in objs:
+            busqueda.normalizar(proveedor)
+        return super().bulk_create(objs, *args, **kwargs)
+    
+    def bulk_update(self, objs, fields, *args, **kwargs):
+        objs = list(objs)
+        claves = [busqueda.CLAVES[campo] for campo in busqueda.CLAVES if campo in fields]
+        for proveedor in objs:
+            busqueda.normalizar(proveedor)
+        return super().bulk_update(objs, list(fields) + claves, *args, **kwargs)
+    
+    def update(self, **kwargs):
+        expresiones = []
+        for campo, clave in busqueda.CLAVES.items():
+            if campo not in kwargs:
+                continue
+            if isinstance(kwargs[campo], (str, type(None))):
+                kwargs[clave] = busqueda.NORMALIZADORES[campo](kwargs[campo])
+            else:
+                # F(), Concat(), ... solo se conocen después de ejecutar el UPDATE
+                expresiones.append(campo)
+        if not expresiones:
+            return super().update(**kwargs)
+        ids = list(self.values_list('pk', flat=True))
+        filas = super().update(**kwargs)
+        self.model.objects.filter(pk__in=ids).refrescar_claves()
+        return filas
+    
+    def refrescar_claves(self):
+        """Recalcular las claves de búsqueda a partir de los valores guardados"""
+        proveedores = list(self.only('pk', *busqueda.CLAVES))
+        for proveedor in proveedores:
+            busqueda.normalizar(proveedor)
+        super().bulk_update(proveedores, list(busqueda.CLAVES.values()), batch_size=1000)
+        return len(proveedores)
+
 class Proveedor(models.Model):
     idproveedor = models.BigAutoField(primary_key=True)  # ✅ CORREGIDO: BigAutoField
     tipo = models.TextField(blank=True, null=True)
@@ -10,11 +55,29 @@ class Proveedor(models.Model):
     estado = models.BooleanField(default=True)
     correo = models.EmailField(blank=True, null=True)
     telefono = models.CharField(max_length=20, blank=True, null=True)
+    # Claves normalizadas para la búsqueda (ver suppliers/busqueda.py)
+    nombre_busqueda = models.CharField(max_length=255, default='', editable=False, db_index=True)
+    correo_busqueda = models.CharField(max_length=254, default='', editable=False, db_index=True)
+    telefono_busqueda = models.CharField(max_length=20, default='', editable=False, db_index=True)
+    
+    objects = ProveedorQuerySet.as_manager()
     
     class Meta:
         db_table = 'proveedor'
         verbose_name = 'Proveedor'
         verbose_name_plural = 'Proveedores'
+        indexes = [
+            models.Index(fields=['estado'], name='proveedor_estado_idx'),
+        ]
+    
+    def save(self, *args, **kwargs):
+        busqueda.normalizar(self)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = set(update_fields) | {
+                busqueda.CLAVES[campo] for campo in busqueda.CLAVES if campo in update_fields
+            }
+        super().save(*args, **kwargs)
     
     def __str__(self):
         return self.nombre or f"Proveedor {self.idproveedor}"
\ No newline at end of file
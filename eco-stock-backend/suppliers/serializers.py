@@ -4,4 +4,4 @@ from .models import Proveedor
 class ProveedorSerializer(serializers.ModelSerializer):
     class Meta:
         model = Proveedor
-        fields = '__all__'
\ No newline at end of file
+        exclude = ['nombre_busqueda', 'correo_busqueda', 'telefono_busqueda']
\ No newline at end of file
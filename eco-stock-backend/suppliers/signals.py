@@ -0,0 +1,6 @@
+from main_app.condicional import versionar
+
+from .models import Proveedor
+
+# ETags del catálogo (main_app.condicional); ProveedorQuerySet avisa de las escrituras masivas
+versionar(Proveedor)
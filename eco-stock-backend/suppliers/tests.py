@@ -1,3 +1,80 @@
 from django.test import TestCase
+from rest_framework.test import APIClient
 
-# Create your tests here.
+from main_app.pruebas import ConsultasMixin
+
+from .models import Proveedor
+
+
+class ConsultasPorEndpointTest(ConsultasMixin, TestCase):
+    """El número de consultas de cada endpoint no debe crecer con las filas"""
+
+    @classmethod
+    def setUpTestData(cls):
+        for i in range(5):
+            Proveedor.objects.create(nombre=f'Agro {i}', estado=i % 2 == 0)
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_proveedores(self):
+        # Versión del catálogo (ETag) y listado
+        self.assertConsultas(2, '/suppliers/proveedores/')
+        self.assertConsultas(1, '/suppliers/proveedores/activos/')
+        self.assertConsultas(1, '/suppliers/proveedores/buscar/?q=Agro')
+
+
+class RespuestaCondicionalTest(TestCase):
+    """Las escrituras masivas también invalidan el ETag del catálogo"""
+
+    def test_update_cambia_etag(self):
+        Proveedor.objects.create(nombre='Agro')
+        client = APIClient()
+        etag = client.get('/suppliers/proveedores/')['ETag']
+        self.assertEqual(client.get('/suppliers/proveedores/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        Proveedor.objects.update(estado=False)
+        respuesta = client.get('/suppliers/proveedores/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertNotEqual(respuesta['ETag'], etag)
+
+    def test_bulk_cambia_etag(self):
+        client = APIClient()
+        etag = client.get('/suppliers/proveedores/')['ETag']
+        proveedor, = Proveedor.objects.bulk_create([Proveedor(nombre='Agro')])
+        siguiente = client.get('/suppliers/proveedores/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(siguiente.status_code, 200)
+
+        proveedor.telefono = '555'
+        Proveedor.objects.bulk_update([proveedor], ['telefono'])
+        self.assertEqual(client.get('/suppliers/proveedores/', HTTP_IF_NONE_MATCH=siguiente['ETag']).status_code, 200)
+
+
+class ClavesBusquedaTest(TestCase):
+    """Las claves normalizadas se mantienen en save, update y bulk_update"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.proveedor = Proveedor.objects.create(
+            nombre='  Agrícola  Ñandú ', correo='Ventas@Nandu.COM', telefono='(300) 123-4567'
+        )
+
+    def claves(self):
+        return Proveedor.objects.values_list('nombre_busqueda', 'correo_busqueda', 'telefono_busqueda').get(
+            pk=self.proveedor.pk
+        )
+
+    def test_save_normaliza(self):
+        self.assertEqual(self.claves(), ('agricola nandu', 'ventas@nandu.com', '3001234567'))
+
+    def test_escrituras_masivas(self):
+        Proveedor.objects.filter(pk=self.proveedor.pk).update(correo='Compras@Nandu.com')
+        self.assertEqual(self.claves()[1], 'compras@nandu.com')
+        self.proveedor.telefono = '311 000 0000'
+        Proveedor.objects.bulk_update([self.proveedor], ['telefono'])
+        self.assertEqual(self.claves()[2], '3110000000')
+
+    def test_buscar_por_prefijo(self):
+        for termino in ('agricola', 'AGRÍ', 'ventas@', '300-123'):
+            respuesta = self.client.get('/suppliers/proveedores/buscar/', {'q': termino})
+            self.assertEqual([p['idproveedor'] for p in respuesta.json()], [self.proveedor.pk], termino)
@@ -1,11 +1,12 @@
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from django.db.models import Q
+from main_app.condicional import RespuestaCondicionalMixin
 from .models import Proveedor
 from .serializers import ProveedorSerializer
+from . import busqueda
 
-class ProveedorViewSet(viewsets.ModelViewSet):
+class ProveedorViewSet(RespuestaCondicionalMixin, viewsets.ModelViewSet):
     queryset = Proveedor.objects.all()
     serializer_class = ProveedorSerializer
     
@@ -78,20 +79,19 @@ class ProveedorViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'])
     def activos(self, request):
         """Obtener proveedores activos"""
-        proveedores = Proveedor.objects.filter(estado=True)
+        proveedores = self.get_queryset().filter(estado=True)
         serializer = self.get_serializer(proveedores, many=True)
         return Response(serializer.data)
     
     @action(detail=False, methods=['get'])
     def buscar(self, request):
-        """Buscar proveedores"""
+        """Buscar proveedores por prefijo de nombre, correo o teléfono"""
         termino = request.query_params.get('q', '')
         if termino:
-            proveedores = Proveedor.objects.filter(
-                Q(nombre__icontains=termino) |
-                Q(correo__icontains=termino) |
-                Q(telefono__icontains=termino)
-            )
+            condicion = busqueda.condicion(termino)
+            if condicion is None:
+                return Response({'error': 'Término de búsqueda inválido'}, status=status.HTTP_400_BAD_REQUEST)
+            proveedores = self.get_queryset().filter(condicion).order_by('nombre_busqueda')
             serializer = self.get_serializer(proveedores, many=True)
             return Response(serializer.data)
         return Response({'error': 'Término de búsqueda requerido'}, status=status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,6 @@
+from main_app.condicional import versionar
+
+from .models import Rol
+
+# ETags del catálogo (main_app.condicional)
+versionar(Rol)
@@ -1,3 +1,28 @@
 from django.test import TestCase
+from rest_framework.test import APIClient
 
-# Create your tests here.
+from main_app.pruebas import ConsultasMixin
+
+from .models import Rol, Usuario
+
+
+class ConsultasPorEndpointTest(ConsultasMixin, TestCase):
+    """El número de consultas de cada endpoint no debe crecer con las filas"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.rol = Rol.objects.create(nombre='Administrador')
+        otro = Rol.objects.create(nombre='Operario')
+        for i in range(5):
+            Usuario.objects.create(nombre=f'Usuario {i}', contraseña='x', idrol=cls.rol if i % 2 else otro)
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_usuarios(self):
+        self.assertConsultas(1, '/api/usuarios/')
+        self.assertConsultas(1, f'/api/usuarios/por_rol/?rol_id={self.rol.pk}')
+
+    def test_roles(self):
+        # Versión del catálogo (ETag) y listado
+        self.assertConsultas(2, '/api/roles/')
@@ -4,13 +4,14 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from django.contrib.auth.hashers import make_password, check_password
 from rest_framework_simplejwt.tokens import RefreshToken
+from main_app.condicional import RespuestaCondicionalMixin
 from .models import Rol, Usuario
 from .serializers import RolSerializer, UsuarioSerializer, UsuarioCreateSerializer
 import logging
 
 logger = logging.getLogger(__name__)
 
-class RolViewSet(viewsets.ModelViewSet):
+class RolViewSet(RespuestaCondicionalMixin, viewsets.ModelViewSet):
     queryset = Rol.objects.all()
     serializer_class = RolSerializer
     
@@ -60,7 +61,7 @@ class RolViewSet(viewsets.ModelViewSet):
 
 
 class UsuarioViewSet(viewsets.ModelViewSet):
-    queryset = Usuario.objects.all()
+    queryset = Usuario.objects.select_related('idrol')
     
     def get_serializer_class(self):
         if self.action == 'create' or self.action == 'register':
@@ -225,7 +226,7 @@ class UsuarioViewSet(viewsets.ModelViewSet):
                 }, status=status.HTTP_400_BAD_REQUEST)
             
             try:
-                usuario = Usuario.objects.get(correo_electronico=correo)
+                usuario = Usuario.objects.select_related('idrol').get(correo_electronico=correo)
                 logger.info(f"Usuario encontrado: {usuario.nombre}")
             except Usuario.DoesNotExist:
                 return Response({
@@ -293,7 +294,7 @@ class UsuarioViewSet(viewsets.ModelViewSet):
         """Obtener usuarios por rol"""
         rol_id = request.query_params.get('rol_id')
         if rol_id:
-            usuarios = Usuario.objects.filter(idrol=rol_id)
+            usuarios = self.get_queryset().filter(idrol=rol_id)
             serializer = self.get_serializer(usuarios, many=True)
             return Response(serializer.data)
         return Response({'error': 'ID de rol requerido'}, status=status.HTTP_400_BAD_REQUEST)
\ No newline at end of file